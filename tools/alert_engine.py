@@ -0,0 +1,293 @@
+"""
+Alert Engine for OCIP/CCIP Tools
+================================
+Declarative alert rules shared by data-sync.py and compliance-reporter.py.
+
+A rule set is data: deadline rules map days-until-due onto ordered levels,
+threshold rules map a numeric field onto ordered levels behind optional
+preconditions. AlertEngine evaluates a rule set over program or payroll
+report rows, parsing each distinct due date once, and keeps the earliest
+date on which a deadline alert moves to its next level, so callers know
+when the alert picture changes without any write to the database.
+
+AlertLog remembers the alerts a consumer has already emitted (the
+alert_state table from migrations.py, version 6). record() compares a run
+against that state by fingerprint - rule, priority and due date, not the
+message text whose day count moves daily - and returns only the alerts
+that are new or changed, plus the ones that resolved.
+"""
+
+import operator
+import string
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from instrumentation import metrics
+from wrapup_db import WrapupDatabase
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+@dataclass(frozen=True)
+class Level:
+    """One step of a rule: the first level whose limit the value is within wins.
+
+    For deadline rules the limit is the last days-until-due value in the
+    level (None for no bound); for threshold rules the value must be below it.
+    """
+    limit: Optional[float]
+    priority: str
+    message: str
+
+
+@dataclass(frozen=True)
+class DeadlineRule:
+    """Alert on a due date field, escalating as the date approaches."""
+    name: str
+    alert_type: str
+    date_field: str
+    levels: Tuple[Level, ...]
+    include_due: bool = False  # add due_date and days_until to the alert
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    """Alert when a numeric field is below a level's limit and every precondition holds."""
+    name: str
+    alert_type: str
+    value_field: str
+    levels: Tuple[Level, ...]
+    require: Tuple[Tuple[str, str, float], ...] = ()
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Rules applied to every row, in order; rows are keyed by key_field."""
+    name: str
+    rules: Tuple
+    key_field: str = 'id'
+    program_field: str = 'id'
+
+
+class Alert(NamedTuple):
+    key: str
+    fingerprint: str
+    type: str
+    priority: str
+    message: str
+    program_id: str
+    details: Optional[Dict] = None
+
+    def as_dict(self) -> Dict:
+        """The alert as published in wrapup-status.json and reporter output."""
+        return {
+            "type": self.type,
+            "priority": self.priority,
+            "message": self.message,
+            "program_id": self.program_id,
+            **(self.details or {}),
+        }
+
+
+# data-sync.py: next open deadline, compliance score and high-value programs
+DASHBOARD_RULES = RuleSet(
+    name="data-sync",
+    rules=(
+        DeadlineRule("payroll_due", "deadline", "payroll_due", (
+            Level(-1, "high", "{project_name} payroll report is {overdue_days} days overdue"),
+            Level(3, "high", "{project_name} payroll report due in {days} day(s) ({due:%B %d})"),
+            Level(7, "medium", "{project_name} payroll report due in {days} days ({due:%B %d})"),
+        )),
+        ThresholdRule("compliance", "compliance", "compliance_score", (
+            Level(40, "high", "{project_name} compliance score below 40% - missing enrollment docs"),
+            Level(60, "medium", "{project_name} compliance score below 60% - missing enrollment docs"),
+        )),
+        ThresholdRule("high_value", "financial", "compliance_score", (
+            Level(80, "medium", "{project_name} is high-value (${contract_value:,.0f}) "
+                                "with suboptimal compliance ({compliance_score}%)"),
+        ), require=(("contract_value", ">", 3000000),)),
+    ),
+)
+
+# compliance-reporter.py: every open payroll report in the deadline window
+DEADLINE_RULES = RuleSet(
+    name="compliance-reporter",
+    rules=(
+        DeadlineRule("payroll_report", "deadline", "due_date", (
+            Level(-1, "critical", "OVERDUE: {project_name} payroll report was due {overdue_days} days ago"),
+            Level(2, "high", "URGENT: {project_name} payroll report due in {days} day(s)"),
+            Level(7, "medium", "Upcoming: {project_name} payroll report due in {days} days"),
+            Level(None, "low", "Scheduled: {project_name} payroll report due in {days} days"),
+        ), include_due=True),
+    ),
+    program_field='program_id',
+)
+
+
+@lru_cache(maxsize=65536)
+def due_ordinal(value: str) -> Optional[int]:
+    """Parse an ISO date once; None for blank or invalid dates."""
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def _message_fields(message: str) -> Tuple[str, ...]:
+    """Names of the fields a message template uses."""
+    return tuple(name for _, name, _, _ in string.Formatter().parse(message) if name)
+
+
+def _deadline_level(levels: Tuple[Level, ...], days: int) -> int:
+    """Index of the level days falls in, or len(levels) when it is beyond them all."""
+    for index, level in enumerate(levels):
+        if level.limit is None or days <= level.limit:
+            return index
+    return len(levels)
+
+
+def _threshold_level(levels: Tuple[Level, ...], value: float) -> Optional[Level]:
+    """The first level whose limit value is below, or None."""
+    for level in levels:
+        if value < level.limit:
+            return level
+    return None
+
+
+def _requirements_met(require: Tuple[Tuple[str, str, float], ...], row: Dict) -> bool:
+    for name, op, value in require:
+        if not OPERATORS[op](row.get(name) or 0, value):
+            return False
+    return True
+
+
+class AlertEngine:
+    """Evaluates a rule set and tracks the next deadline level change."""
+
+    def __init__(self, rule_set: RuleSet):
+        self.rule_set = rule_set
+        self.today: Optional[date] = None
+        self._next_transition: Optional[int] = None
+
+    def evaluate(self, rows: Iterable[Dict], today: Optional[date] = None) -> List[Alert]:
+        """Return the alerts for rows (row order, then rule order) as of today."""
+        self.today = today or date.today()
+        today_ordinal = self.today.toordinal()
+        rule_set = self.rule_set
+        alerts = []
+        next_transition = None
+
+        # Resolve rule kinds once rather than per row
+        rules = [(rule, isinstance(rule, DeadlineRule)) for rule in rule_set.rules]
+
+        for row in rows:
+            row_key = row[rule_set.key_field]
+            program_id = row[rule_set.program_field]
+            for rule, is_deadline in rules:
+                if is_deadline:
+                    due_text = row.get(rule.date_field)
+                    due = due_ordinal(due_text)
+                    if due is None:
+                        continue
+                    days = due - today_ordinal
+                    index = _deadline_level(rule.levels, days)
+                    key = f"{rule.name}:{row_key}"
+                    if index:
+                        # The alert moves up a level once days reaches the previous limit
+                        change = due - rule.levels[index - 1].limit
+                        if next_transition is None or change < next_transition:
+                            next_transition = change
+                    if index == len(rule.levels):
+                        continue
+                    level = rule.levels[index]
+                    computed = {"days": days, "overdue_days": abs(days), "due": date.fromordinal(due)}
+                    message = level.message.format_map({
+                        name: computed[name] if name in computed else row[name]
+                        for name in _message_fields(level.message)
+                    })
+                    details = {"due_date": due_text, "days_until": days} if rule.include_due else None
+                    fingerprint = f"{rule.name}|{level.priority}|{index}|{due_text}"
+                else:
+                    value = row.get(rule.value_field) or 0
+                    level = _threshold_level(rule.levels, value)
+                    if level is None or not _requirements_met(rule.require, row):
+                        continue
+                    key = f"{rule.name}:{row_key}"
+                    message = level.message.format_map(row)
+                    details = None
+                    fingerprint = f"{rule.name}|{level.priority}|{level.limit}"
+
+                alerts.append(Alert(key, fingerprint, rule.alert_type, level.priority, message, program_id, details))
+
+        self._next_transition = next_transition
+        return alerts
+
+    def next_transition(self) -> Optional[date]:
+        """The next date on which a deadline alert appears or escalates."""
+        return date.fromordinal(self._next_transition) if self._next_transition is not None else None
+
+
+@dataclass
+class AlertChanges:
+    emitted: List[Alert]  # new and changed alerts, in evaluation order
+    new: int
+    changed: int
+    unchanged: int
+    resolved: List[Dict]
+
+
+class AlertLog:
+    """Per-consumer memory of emitted alerts, stored in alert_state."""
+
+    def __init__(self, db: WrapupDatabase, consumer: str):
+        self.db = db
+        self.consumer = consumer
+
+    @metrics.timed("alerts.record")
+    def record(self, alerts: List[Alert]) -> AlertChanges:
+        """Store this run's alerts and return what changed since the previous run."""
+        now = datetime.utcnow().isoformat() + 'Z'
+        with self.db.transaction() as conn:
+            previous = {
+                row[0]: (row[1], row[2])
+                for row in conn.execute(
+                    "SELECT alert_key, fingerprint, message FROM alert_state WHERE consumer = ?",
+                    (self.consumer,))
+            }
+
+            emitted = []
+            new = 0
+            for alert in alerts:
+                seen = previous.pop(alert.key, None)
+                if seen is None:
+                    new += 1
+                    emitted.append(alert)
+                elif seen[0] != alert.fingerprint:
+                    emitted.append(alert)
+
+            conn.executemany("""
+                INSERT INTO alert_state (consumer, alert_key, fingerprint, priority, program_id, message,
+                                         first_seen, last_changed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(consumer, alert_key) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    priority = excluded.priority,
+                    message = excluded.message,
+                    last_changed = excluded.last_changed
+            """, [(self.consumer, alert.key, alert.fingerprint, alert.priority, alert.program_id, alert.message,
+                   now, now) for alert in emitted])
+            conn.executemany("DELETE FROM alert_state WHERE consumer = ? AND alert_key = ?",
+                             [(self.consumer, key) for key in previous])
+
+        resolved = [{"key": key, "message": message} for key, (_, message) in sorted(previous.items())]
+        return AlertChanges(emitted, new, len(emitted) - new, len(alerts) - len(emitted), resolved)
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+API Server for the OCIP/CCIP Web Portal
+=======================================
+Serves the portal's api/ JSON straight from the wrap-up manager database.
+
+Features:
+- The same documents dashboard.html reads from api/, computed on demand
+- Filtered, sorted and paginated program lists (/api/programs.json)
+- The pending bonds pages and counts (bonds.py), plus filtered, searchable bond pages (/api/bonds.json)
+- In-memory cache keyed on the database change version (PRAGMA data_version),
+  rebuilt when a compliance score or alert boundary passes
+- ETag / If-None-Match with 304 responses, gzip for clients that accept it
+- Static files from the web root, so the portal pages work unchanged; api/ paths
+  not computed from the database (rates.json, trends.json) are served from web_root/api/
+- asyncio and the standard library only
+
+Endpoints:
+    /api/wrapup-status.json
+    /api/dashboard/index.json, /api/dashboard/<shard>/page-<n>.json
+    /api/programs/<id>.json
+    /api/programs.json?status=active&band=low&type=OCIP&q=metro&sort=-contract_value&page=2&page_size=50
+    /api/bonds/index.json, /api/bonds/<view>/page-<n>.json
+    /api/bonds.json?status=Pending&type=Bid+Bond&q=tower&page=2&page_size=50
+
+Usage:
+    python3 api-server.py
+    python3 api-server.py --port 8080 --db-path /tmp/wrapup_demo.db
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import importlib.util
+import json
+import math
+import mimetypes
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.append(str(Path(__file__).parent))
+
+from bonds import BondStore, publish_bonds
+from migrations import SchemaOutOfDate
+from sync_pipeline import PAGE_SIZE, DashboardPager, compliance_band
+from wrapup_db import WrapupDatabase
+
+MAX_PAGE_SIZE = 500
+QUERY_CACHE_SIZE = 256         # Filtered list responses kept per database version
+GZIP_MIN_BYTES = 1024
+MAX_HEADER_BYTES = 16384
+KEEPALIVE_TIMEOUT = 15         # seconds an idle connection stays open
+SORT_FIELDS = {'project_name', 'compliance_score', 'contract_value', 'estimated_savings', 'payroll_due'}
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+def load_data_sync():
+    """Import DataSync from data-sync.py, whose hyphenated name is not importable."""
+    spec = importlib.util.spec_from_file_location("data_sync", Path(__file__).parent / "data-sync.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.DataSync
+
+
+class CachedResponse:
+    """A response body with its ETag and a lazily built gzip copy."""
+
+    __slots__ = ('body', 'content_type', 'etag', '_gzipped')
+
+    def __init__(self, body: bytes, content_type: str = 'application/json'):
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._gzipped = None
+
+    @classmethod
+    def from_json(cls, data, minify: bool = False) -> 'CachedResponse':
+        if minify:
+            return cls(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        return cls(json.dumps(data, indent=2).encode('utf-8'))
+
+    @property
+    def compressible(self) -> bool:
+        return len(self.body) >= GZIP_MIN_BYTES and self.content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+class _MemoryPublisher:
+    """Collects what DashboardPager would publish, keyed by api/ relative path."""
+
+    def __init__(self, api_dir: Path):
+        self.api_dir = api_dir
+        self.documents: Dict[str, Dict] = {}
+
+    def publish(self, path: Path, data):
+        self.documents[Path(path).relative_to(self.api_dir).as_posix()] = data
+
+
+class ApiSnapshot:
+    """Every api/ document for one database version, rendered once.
+
+    Program detail and filtered list responses are added on first request.
+    """
+
+    def __init__(self, sync, version: int, minify: bool = False):
+        self.sync = sync
+        self.version = version
+        self.minify = minify
+
+        programs_data = sync.get_programs_data()
+        # Scores and alerts also change on their own at the next boundary
+        self.valid_until = sync.next_boundary()
+        alerts = sync.generate_alerts(programs_data)
+        summary = sync.calculate_summary(programs_data)
+        last_sync = datetime.utcnow().isoformat() + 'Z'
+
+        self.programs = programs_data
+        self.by_id = {program['id']: program for program in programs_data}
+        self.responses: Dict[str, CachedResponse] = {
+            "wrapup-status.json": CachedResponse.from_json({
+                "programs": programs_data,
+                "summary": summary,
+                "alerts": alerts,
+                "last_sync": last_sync
+            }, minify)
+        }
+
+        # Same shards and pages DataSync writes to api/dashboard/
+        memory = _MemoryPublisher(sync.api_dir)
+        pager = DashboardPager(memory, sync.api_dir, prune=False)
+        for program in programs_data:
+            pager.add(program)
+        pager.add_alerts(alerts)
+        pager.finish(summary, last_sync)
+        # Same views and pages bonds.py writes to api/bonds/
+        self.bonds = BondStore(sync.db)
+        publish_bonds(self.bonds, memory, sync.api_dir, prune=False)
+        for path, data in memory.documents.items():
+            self.responses[path] = CachedResponse.from_json(data, minify)
+
+        self.details: Dict[str, Optional[CachedResponse]] = {}
+        self.queries: OrderedDict = OrderedDict()
+
+    def detail(self, program_id: str) -> Optional[CachedResponse]:
+        """Render api/programs/<id>.json (runs on the build thread)."""
+        if program_id not in self.details:
+            detail_data = self.sync.generate_program_detail(program_id)
+            self.details[program_id] = CachedResponse.from_json(detail_data, self.minify) if detail_data else None
+        return self.details[program_id]
+
+    def bond_query(self, params: Dict[str, str]) -> CachedResponse:
+        """Filter, search and page the bonds; raises ValueError on bad parameters."""
+        key = ('bonds',) + tuple(sorted(params.items()))
+        cached = self.queries.get(key)
+        if cached is not None:
+            self.queries.move_to_end(key)
+            return cached
+
+        unknown = set(params) - {'status', 'type', 'q', 'page', 'page_size'}
+        if unknown:
+            raise ValueError(f"unknown parameter: {', '.join(sorted(unknown))}")
+        try:
+            page = int(params.get('page', 1))
+            page_size = int(params.get('page_size', PAGE_SIZE))
+        except ValueError:
+            raise ValueError("page and page_size must be integers")
+
+        cached = CachedResponse.from_json(
+            self.bonds.query(params.get('status'), params.get('type'), params.get('q'), page, page_size), self.minify)
+        self.queries[key] = cached
+        if len(self.queries) > QUERY_CACHE_SIZE:
+            self.queries.popitem(last=False)
+        return cached
+
+    def query(self, params: Dict[str, str]) -> CachedResponse:
+        """Filter, sort and page the program list; raises ValueError on bad parameters."""
+        key = tuple(sorted(params.items()))
+        cached = self.queries.get(key)
+        if cached is not None:
+            self.queries.move_to_end(key)
+            return cached
+
+        unknown = set(params) - {'status', 'band', 'type', 'q', 'sort', 'page', 'page_size'}
+        if unknown:
+            raise ValueError(f"unknown parameter: {', '.join(sorted(unknown))}")
+
+        programs = self.programs
+        if params.get('status'):
+            statuses = set(params['status'].split(','))
+            programs = [p for p in programs if p['status'] in statuses]
+        if params.get('band'):
+            bands = set(params['band'].split(','))
+            programs = [p for p in programs if compliance_band(p['compliance_score']) in bands]
+        if params.get('type'):
+            types = set(params['type'].upper().split(','))
+            programs = [p for p in programs if (p['program_type'] or '').upper() in types]
+        if params.get('q'):
+            needle = params['q'].lower()
+            programs = [p for p in programs
+                        if needle in p['project_name'].lower()
+                        or needle in p['id'].lower()
+                        or needle in (p['project_address'] or '').lower()]
+
+        sort = params.get('sort', 'project_name')
+        field = sort.lstrip('-')
+        if field not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(sorted(SORT_FIELDS))}")
+        if field != 'project_name' or sort.startswith('-'):
+            # Missing values sort last either way; the list order breaks ties
+            present = [p for p in programs if p.get(field) is not None]
+            missing = [p for p in programs if p.get(field) is None]
+            programs = sorted(present, key=lambda p: p[field], reverse=sort.startswith('-')) + missing
+
+        try:
+            page = int(params.get('page', 1))
+            page_size = int(params.get('page_size', PAGE_SIZE))
+        except ValueError:
+            raise ValueError("page and page_size must be integers")
+        if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page must be >= 1 and page_size between 1 and {MAX_PAGE_SIZE}")
+
+        start = (page - 1) * page_size
+        cached = CachedResponse.from_json({
+            "programs": programs[start:start + page_size],
+            "total": len(programs),
+            "page": page,
+            "page_size": page_size,
+            "pages": math.ceil(len(programs) / page_size),
+            "filters": {name: value for name, value in sorted(params.items()) if name not in ('page', 'page_size')}
+        }, self.minify)
+
+        self.queries[key] = cached
+        if len(self.queries) > QUERY_CACHE_SIZE:
+            self.queries.popitem(last=False)
+        return cached
+
+
+class ApiServer:
+    """asyncio HTTP/1.1 server for the portal API and static pages."""
+
+    def __init__(self, sync, web_root: Path, minify: bool = False):
+        self.sync = sync
+        self.web_root = Path(web_root).resolve()
+        self.minify = minify
+        # Change probe for the event loop thread; never writes
+        self.probe = WrapupDatabase(sync.db_path, readonly=True)
+        # One build thread: snapshots and details are rendered off the event loop, one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-build")
+        self.snapshot: Optional[ApiSnapshot] = None
+        self.static: Dict[Path, Tuple[Tuple, CachedResponse]] = {}
+        self.stats = {'requests': 0, 'not_modified': 0, 'rebuilds': 0}
+        self._build_lock = None
+
+    def _version(self) -> int:
+        """Database change version (PRAGMA data_version of the probe connection)."""
+        return self.probe.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _is_current(self, version: int) -> bool:
+        """The snapshot matches the database and no score or alert boundary has passed since it was built."""
+        return (self.snapshot is not None and self.snapshot.version == version
+                and datetime.now(timezone.utc) < self.snapshot.valid_until)
+
+    async def get_snapshot(self) -> ApiSnapshot:
+        """Return the snapshot for the current version, rebuilding it at most once per change."""
+        version = self._version()
+        if not self._is_current(version):
+            async with self._build_lock:
+                if not self._is_current(version):
+                    loop = asyncio.get_running_loop()
+                    self.snapshot = await loop.run_in_executor(
+                        self.executor, ApiSnapshot, self.sync, version, self.minify)
+                    self.stats['rebuilds'] += 1
+        return self.snapshot
+
+    async def route(self, path: str, query: str) -> Tuple[int, CachedResponse]:
+        """Map a request path to a status code and response."""
+        if path.startswith('/api/'):
+            name = path[len('/api/'):]
+            snapshot = await self.get_snapshot()
+
+            if name in ('programs.json', 'bonds.json'):
+                params = {key: values[-1] for key, values in parse_qs(query).items()}
+                try:
+                    if name == 'bonds.json':
+                        loop = asyncio.get_running_loop()
+                        return 200, await loop.run_in_executor(self.executor, snapshot.bond_query, params)
+                    return 200, snapshot.query(params)
+                except ValueError as e:
+                    return 400, CachedResponse.from_json({"error": str(e)})
+
+            if name.startswith('programs/') and name.endswith('.json'):
+                program_id = name[len('programs/'):-len('.json')]
+                if program_id in snapshot.by_id:
+                    cached = snapshot.details.get(program_id)
+                    if cached is None:
+                        loop = asyncio.get_running_loop()
+                        cached = await loop.run_in_executor(self.executor, snapshot.detail, program_id)
+                    if cached is not None:
+                        return 200, cached
+
+            cached = snapshot.responses.get(name)
+            if cached is not None:
+                return 200, cached
+
+            # Files other tools publish under web_root/api/ (rates.json, trends.json)
+            status, cached = self._static(path)
+            if status == 200:
+                return status, cached
+            return 404, CachedResponse.from_json({"error": f"not found: {path}"})
+
+        return self._static(path)
+
+    def _static(self, path: str) -> Tuple[int, CachedResponse]:
+        """Serve a file from the web root (dotfiles and paths outside it are hidden)."""
+        not_found = (404, CachedResponse(b'Not found\n', 'text/plain; charset=utf-8'))
+        relative = path.strip('/') or 'index.html'
+        if any(part.startswith('.') for part in relative.split('/')):
+            return not_found
+
+        file_path = (self.web_root / relative).resolve()
+        if self.web_root not in file_path.parents or not file_path.is_file():
+            return not_found
+
+        stat = file_path.stat()
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        entry = self.static.get(file_path)
+        if entry is None or entry[0] != stat_key:
+            content_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+            if content_type.startswith('text/'):
+                content_type += '; charset=utf-8'
+            entry = self.static[file_path] = (stat_key, CachedResponse(file_path.read_bytes(), content_type))
+        return 200, entry[1]
+
+    def render(self, method: str, status: int, cached: CachedResponse, headers: Dict[str, str]) -> bytes:
+        """Build the raw response, answering 304 or gzip where the request allows."""
+        response_headers = {
+            'Content-Type': cached.content_type,
+            'Cache-Control': 'no-cache',
+        }
+        body = cached.body
+
+        if status == 200:
+            response_headers['ETag'] = cached.etag
+            if_none_match = headers.get('if-none-match', '')
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            if cached.etag in tags or '*' in tags:
+                self.stats['not_modified'] += 1
+                status, body = 304, b''
+                del response_headers['Content-Type']
+
+        if cached.compressible:
+            response_headers['Vary'] = 'Accept-Encoding'
+            if status != 304 and 'gzip' in headers.get('accept-encoding', ''):
+                response_headers['Content-Encoding'] = 'gzip'
+                body = cached.gzipped()
+
+        if status != 304:
+            response_headers['Content-Length'] = str(len(body))
+        head = f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in response_headers.items())
+        return (head + "\r\n").encode('latin-1') + (b'' if method == 'HEAD' else body)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one keep-alive connection."""
+        try:
+            while True:
+                try:
+                    raw = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(self.render('GET', 431, CachedResponse(b'', 'text/plain'), {}))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+
+                lines = raw.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    writer.write(self.render('GET', 400, CachedResponse(b'Bad request\n', 'text/plain'), {}))
+                    break
+
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                if method not in ('GET', 'HEAD'):
+                    writer.write(self.render('GET', 405, CachedResponse(b'Method not allowed\n', 'text/plain'), {}))
+                    break
+                if headers.get('content-length', '0') != '0':
+                    await reader.readexactly(int(headers['content-length']))
+
+                self.stats['requests'] += 1
+                url = urlsplit(target)
+                try:
+                    status, cached = await self.route(unquote(url.path), url.query)
+                except Exception as e:
+                    print(f"❌ {method} {target}: {type(e).__name__}: {e}")
+                    status, cached = 500, CachedResponse.from_json({"error": "internal server error"})
+
+                writer.write(self.render(method, status, cached, headers))
+                await writer.drain()
+
+                connection = headers.get('connection', '').lower()
+                if connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive'):
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        self._build_lock = asyncio.Lock()
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        await self.get_snapshot()  # Warm the cache before the first client
+        print(f"🌐 Serving {self.web_root} and /api/ from {self.sync.db_path} on http://{host}:{port}/")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Portal API Server')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    parser.add_argument('--minify', action='store_true', help='Serve minified JSON')
+    parser.add_argument('--web-root', help='Web portal root directory')
+    parser.add_argument('--db-path', help='Path to wrap-up manager database')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending schema migrations instead of refusing an out-of-date database')
+
+    args = parser.parse_args()
+
+    DataSync = load_data_sync()
+    try:
+        sync = DataSync(args.web_root, args.db_path, apply_migrations=args.migrate)
+    except (FileNotFoundError, SchemaOutOfDate) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    server = ApiServer(sync, sync.web_root, minify=args.minify)
+
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+    stats = server.stats
+    print(f"\n🛑 Server stopped. {stats['requests']} requests, {stats['not_modified']} not modified, "
+          f"{stats['rebuilds']} cache rebuilds.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for the Sync and Reporting Paths
+================================================
+Times data-sync and compliance-reporter entry points on generated portfolios.
+
+Features:
+- full_sync, weekly_report, deadline_check and financial_summary at 1k/10k/100k programs
+- Seeded databases from portfolio_generator.py, cached per size, seed and day
+- Best-of-N wall time plus peak Python memory (tracemalloc) per entry point
+- Each entry point runs in its own process, so caches and memory start cold
+- JSON baselines; --check exits 1 when time or memory regresses past --threshold
+- Output digests prove an optimized path matches the baseline or a reference checkout;
+  files only the measured checkout publishes are reported, not counted as differences
+
+Usage:
+    python3 benchmark_suite.py --sizes 1k,10k
+    python3 benchmark_suite.py --sizes 1k,10k --save-baseline
+    python3 benchmark_suite.py --sizes 1k,10k --check --threshold 0.25
+    python3 benchmark_suite.py --sizes 1k --reference /path/to/baseline-checkout/tools
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASELINE_FORMAT = 1
+TOOLS_DIR = Path(__file__).parent
+BASELINE_PATH = TOOLS_DIR / "benchmark_baseline.json"
+DATA_DIR = Path(tempfile.gettempdir()) / "wrapup-bench"
+
+ENTRY_POINTS = ['full_sync', 'weekly_report', 'deadline_check', 'financial_summary']
+
+# Timestamps that differ between runs of the same code on the same data
+VOLATILE_KEYS = {'last_sync', 'last_updated'}
+# Floats are compared to this many decimal places, so summing in a different order is not a change
+FLOAT_PLACES = 6
+# Time regressions smaller than this are treated as noise
+MIN_SECONDS_DELTA = 0.005
+
+
+def _load_script(tools_dir: Path, filename: str):
+    """Import a hyphenated tool script from tools_dir."""
+    spec = importlib.util.spec_from_file_location(filename.replace('-', '_')[:-3], tools_dir / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def normalize(value: Any) -> Any:
+    """Drop volatile timestamps and round floats so equal results compare equal."""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items() if key not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, float):
+        return round(value, FLOAT_PLACES)
+    return value
+
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(normalize(value), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def overall_digest(parts: Dict[str, str]) -> str:
+    """One digest over per-part digests; the parts name what differs on a mismatch."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def _published_digests(api_dir: Path, manifest_name: Optional[str]) -> Dict[str, str]:
+    """A digest per top-level JSON file a sync published, and one per subdirectory of them.
+
+    Subdirectories such as programs/ hold a file per program, so they are
+    digested as a whole to keep baselines small. The manifest is bookkeeping
+    and is left out.
+    """
+    files = {}
+    for path in sorted(api_dir.rglob('*.json')):
+        if path.name == manifest_name:
+            continue
+        with open(path) as f:
+            files[path.relative_to(api_dir).as_posix()] = _digest(json.load(f))
+
+    groups: Dict[str, Dict[str, str]] = {}
+    for name, digest in files.items():
+        top, _, rest = name.partition('/')
+        if rest:
+            groups.setdefault(top + '/', {})[rest] = digest
+    digests = {name: digest for name, digest in files.items() if '/' not in name}
+    digests.update({name: overall_digest(group) for name, group in groups.items()})
+    return digests
+
+
+def _entry_point(name: str, tools_dir: Path, db_path: str) -> Callable[[], Tuple[Callable, Callable, Callable]]:
+    """Return prepare() for an entry point.
+
+    prepare() gives (run, outputs, cleanup): run is the timed call, outputs
+    maps its result to a digest per named part, and cleanup removes any
+    scratch files. Setup such as opening the database stays out of the timing.
+    """
+    if name == 'full_sync':
+        data_sync = _load_script(tools_dir, 'data-sync.py')
+        manifest_name = getattr(data_sync, 'MANIFEST_NAME', None)
+
+        def prepare():
+            # A fresh web root each round, so every file is written
+            scratch = Path(tempfile.mkdtemp(prefix='wrapup-bench-'))
+            sync = data_sync.DataSync(str(scratch), db_path)
+            return (sync.full_sync,
+                    lambda result: _published_digests(scratch / "api", manifest_name),
+                    lambda: shutil.rmtree(scratch, ignore_errors=True))
+        return prepare
+
+    reporter_module = _load_script(tools_dir, 'compliance-reporter.py')
+    reporter = reporter_module.ComplianceReporter(db_path)
+    method = {
+        'weekly_report': reporter.generate_weekly_report,
+        'deadline_check': reporter.check_deadlines,
+        'financial_summary': reporter.financial_summary,
+    }[name]
+
+    def prepare():
+        return method, lambda result: {key: _digest(value) for key, value in result.items()}, lambda: None
+    return prepare
+
+
+def measure(name: str, tools_dir: Path, db_path: str, rounds: int) -> Dict:
+    """Time an entry point over rounds, then trace one more round for peak memory."""
+    sys.path.insert(0, str(tools_dir))
+    with contextlib.redirect_stdout(io.StringIO()):
+        prepare = _entry_point(name, tools_dir, db_path)
+        timings = []
+        parts = None
+        for _ in range(max(1, rounds)):
+            run, outputs, cleanup = prepare()
+            try:
+                start = time.perf_counter()
+                result = run()
+                timings.append(time.perf_counter() - start)
+                if parts is None:
+                    parts = outputs(result)
+            finally:
+                cleanup()
+
+        run, _, cleanup = prepare()
+        try:
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            cleanup()
+
+    return {
+        'seconds': min(timings),
+        'rounds': len(timings),
+        'peak_bytes': peak,
+        'digest': overall_digest(parts),
+        'parts': parts,
+    }
+
+
+def _measure_in_subprocess(name: str, tools_dir: Path, db_path: Path, rounds: int) -> Dict:
+    """Run measure() in a fresh interpreter and return its result (or the error)."""
+    command = [sys.executable, str(Path(__file__).resolve()), '--run-entry', name, '--db-path', str(db_path),
+               '--tools-dir', str(tools_dir), '--rounds', str(rounds)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f"exit status {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def portfolio_db(size: str, seed: int, data_dir: Path = DATA_DIR) -> Path:
+    """The generated database for size, building it on first use today."""
+    # Imported here, not at the top: a --run-entry worker must import wrapup_db
+    # and migrations from the tools directory it measures, not this one.
+    from portfolio_generator import GENERATOR_VERSION, generate_portfolio, parse_size
+
+    as_of = date.today()
+    db_path = data_dir / f"portfolio-{size}-s{seed}-v{GENERATOR_VERSION}-{as_of.isoformat()}.db"
+    if not db_path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        # Build under a temporary name so an interrupted run never leaves a partial database
+        partial = db_path.with_name(db_path.name + ".partial")
+        partial.unlink(missing_ok=True)
+        print(f"🏗️  Generating {parse_size(size):,} programs ({size}) into {db_path}")
+        counts = generate_portfolio(str(partial), parse_size(size), seed, as_of)
+        partial.replace(db_path)
+        print(f"   {counts.payroll_reports:,} payroll reports, {counts.enrollment_docs:,} docs in {counts.seconds:.1f}s")
+    else:
+        # Cached today by an earlier checkout; the tools measured refuse a schema behind theirs
+        from migrations import migrate
+        from wrapup_db import get_database
+        migrate(get_database(str(db_path)))
+    return db_path
+
+
+def run_suite(sizes: List[str], entries: List[str], rounds: int = 3, seed: int = 42,
+              tools_dir: Path = TOOLS_DIR, data_dir: Path = DATA_DIR) -> Dict:
+    """Benchmark every entry point at every size and return the results document."""
+    from portfolio_generator import GENERATOR_VERSION
+
+    results = {}
+    for size in sizes:
+        db_path = portfolio_db(size, seed, data_dir)
+        results[size] = {}
+        for name in entries:
+            result = _measure_in_subprocess(name, tools_dir, db_path, rounds)
+            results[size][name] = result
+            if 'error' in result:
+                print(f"   ❌ {size} {name}: {result['error']}")
+            else:
+                print(f"   ⏱️  {size:>5} {name:<18} {result['seconds'] * 1000:>10.1f} ms  "
+                      f"{result['peak_bytes'] / 1048576:>8.1f} MiB peak")
+    return {
+        'format': BASELINE_FORMAT,
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'as_of': date.today().isoformat(),
+        'seed': seed,
+        'generator_version': GENERATOR_VERSION,
+        'rounds': rounds,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def find_regressions(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Entry points slower or hungrier than the baseline by more than threshold (0.2 = 20%)."""
+    regressions = []
+    for size, entries in current['results'].items():
+        for name, result in entries.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before or 'error' in before or 'error' in result:
+                continue
+            for metric in ('seconds', 'peak_bytes'):
+                if not before[metric]:
+                    continue
+                ratio = result[metric] / before[metric]
+                if ratio <= 1 + threshold:
+                    continue
+                if metric == 'seconds' and result[metric] - before[metric] < MIN_SECONDS_DELTA:
+                    continue
+                regressions.append({'size': size, 'entry': name, 'metric': metric,
+                                    'baseline': before[metric], 'current': result[metric], 'ratio': ratio})
+    return regressions
+
+
+def find_output_changes(current: Dict, expected: Dict) -> List[Dict]:
+    """Entry points whose output differs from expected, with the parts that differ.
+
+    Only parts expected has are compared: a part missing from the current
+    output or with another digest is a change. Parts only the current
+    output has (files a newer checkout publishes) are listed under added
+    and do not make the outputs differ.
+    """
+    changes = []
+    for size, entries in current['results'].items():
+        for name, result in entries.items():
+            before = expected.get('results', {}).get(size, {}).get(name)
+            if not before or 'error' in before or 'error' in result:
+                continue
+            if result['digest'] == before['digest']:
+                continue
+            parts = sorted(part for part, digest in before['parts'].items() if result['parts'].get(part) != digest)
+            added = sorted(part for part in result['parts'] if part not in before['parts'])
+            changes.append({'size': size, 'entry': name, 'parts': parts, 'added': added})
+    return changes
+
+
+def differing(changes: List[Dict]) -> List[Dict]:
+    """The changes where a part expected has differs; added parts alone do not count."""
+    return [change for change in changes if change['parts']]
+
+
+def comparable(current: Dict, baseline: Dict) -> bool:
+    """Output digests only match when both runs used the same generated data on the same day."""
+    return all(current[key] == baseline.get(key) for key in ('as_of', 'seed', 'generator_version'))
+
+
+def _shown(parts: List[str]) -> str:
+    return ', '.join(parts[:5]) + (' ...' if len(parts) > 5 else '')
+
+
+def _print_output_changes(changes: List[Dict], against: str):
+    if not changes:
+        print(f"✅ Output identical to {against}")
+    elif not differing(changes):
+        print(f"✅ Output matches {against} on every part it publishes")
+    for change in changes:
+        if change['parts']:
+            print(f"❌ {change['size']} {change['entry']} output differs from {against}: {_shown(change['parts'])}")
+        if change['added']:
+            print(f"ℹ️  {change['size']} {change['entry']} also publishes {_shown(change['added'])}, "
+                  f"which {against} does not")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Sync and Reporting Benchmarks')
+    parser.add_argument('--sizes', default='1k,10k', help='Comma-separated portfolio sizes (1k, 10k, 100k or a count)')
+    parser.add_argument('--entries', default=','.join(ENTRY_POINTS), help='Comma-separated entry points to run')
+    parser.add_argument('--rounds', type=int, default=3, help='Timed rounds per entry point (best is kept)')
+    parser.add_argument('--seed', type=int, default=42, help='Portfolio generator seed')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='Exit 1 on regressions or output changes against the baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown or memory growth (0.2 = 20%%)')
+    parser.add_argument('--reference', help='tools/ directory of another checkout whose output must match')
+    parser.add_argument('--data-dir', default=str(DATA_DIR), help='Where generated databases are cached')
+    parser.add_argument('--output', help='Also write the results JSON here')
+    # Internal: measure one entry point in this process and print the result as JSON
+    parser.add_argument('--run-entry', help=argparse.SUPPRESS)
+    parser.add_argument('--db-path', help=argparse.SUPPRESS)
+    parser.add_argument('--tools-dir', default=str(TOOLS_DIR), help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run_entry:
+        print(json.dumps(measure(args.run_entry, Path(args.tools_dir), args.db_path, args.rounds)))
+        return
+
+    from portfolio_generator import parse_size
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    entries = [entry.strip() for entry in args.entries.split(',') if entry.strip()]
+    try:
+        for size in sizes:
+            parse_size(size)
+    except ValueError:
+        parser.error("--sizes takes 1k, 10k, 100k or program counts, e.g. 1k,10k")
+    unknown = [entry for entry in entries if entry not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(unknown)} (choose from {', '.join(ENTRY_POINTS)})")
+    if args.rounds < 1:
+        parser.error("--rounds must be at least 1")
+
+    print(f"\n⏱️  BENCHMARK - best of {args.rounds}, seed {args.seed}")
+    print("=" * 60)
+    current = run_suite(sizes, entries, args.rounds, args.seed, data_dir=Path(args.data_dir))
+    failed = any('error' in result for entries_by_name in current['results'].values()
+                 for result in entries_by_name.values())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+
+    if args.reference:
+        print(f"\n🔍 Reference run from {args.reference}")
+        reference = run_suite(sizes, entries, 1, args.seed, tools_dir=Path(args.reference),
+                              data_dir=Path(args.data_dir))
+        changes = find_output_changes(current, reference)
+        _print_output_changes(changes, "the reference checkout")
+        failed = failed or bool(differing(changes))
+
+    baseline_path = Path(args.baseline)
+    if args.check:
+        if not baseline_path.exists():
+            print(f"❌ No baseline at {baseline_path} - run with --save-baseline first")
+            sys.exit(1)
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        regressions = find_regressions(current, baseline, args.threshold)
+        for regression in regressions:
+            if regression['metric'] == 'seconds':
+                detail = f"{regression['baseline'] * 1000:.1f} ms -> {regression['current'] * 1000:.1f} ms"
+            else:
+                detail = f"{regression['baseline'] / 1048576:.1f} MiB -> {regression['current'] / 1048576:.1f} MiB"
+            print(f"❌ {regression['size']} {regression['entry']} {regression['metric']} regressed "
+                  f"{(regression['ratio'] - 1) * 100:.0f}%: {detail}")
+        if not regressions:
+            print(f"✅ No regressions beyond {args.threshold * 100:.0f}% of the baseline")
+
+        if comparable(current, baseline):
+            changes = find_output_changes(current, baseline)
+            _print_output_changes(changes, "the baseline")
+        else:
+            changes = []
+            print(f"⚠️  Baseline data is from {baseline.get('as_of')} (seed {baseline.get('seed')}); "
+                  f"output check skipped - use --reference to compare against another checkout")
+        failed = failed or bool(regressions) or bool(differing(changes))
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"💾 Baseline saved to {baseline_path}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Bid Deduct Engine for OCIP/CCIP Wrap-up Programs
+================================================
+Python port of calculate() in calculator.html, for pricing bids in bulk.
+
+Features:
+- Same compiled rate tables (api/rates.json), effective WC rates and whole-dollar
+  rounding as the calculator
+- WC (install class codes and 8235 supply only), GL, umbrella and 15% O&P
+- Batch pricing of a CSV of bids, vectorized with NumPy when it is installed
+- Pure-Python fallback that produces identical results
+- Throughput benchmark
+
+CSV columns (header row required; only state and contract_value are needed):
+    bid_id, state, contract_value, labor_scope, payroll, class_code, include_op
+
+Usage:
+    python3 bid_deduct.py bids.csv --output priced.csv
+    python3 bid_deduct.py --benchmark --rows 100000
+"""
+
+import argparse
+import csv
+import math
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from rate_tables import RateTable, WcRate, load_rate_table
+
+try:
+    import numpy as np
+except ImportError:  # Optional: batches fall back to a pure-Python loop
+    np = None
+
+LABOR_SCOPES = ('none', 'subcontracted', 'self')
+
+# Rate status for a bid's WC line
+RATE_OK = 'ok'
+RATE_NOT_APPLICABLE = 'not_applicable'    # Labor is not self-performed
+RATE_NO_RATES = 'no_rates'                # Self-performed, but no WC rates on file for the state
+RATE_UNKNOWN_CLASS = 'unknown_class_code'
+
+RESULT_COLUMNS = ['class_code_used', 'base_rate', 'emr', 'ld_factor', 'effective_rate', 'rate_status',
+                  'wc', 'gl', 'umbrella', 'subtotal', 'op', 'total']
+
+_NUMBER_PREFIX = re.compile(r'\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
+
+
+@dataclass(frozen=True)
+class BidQuote:
+    """Bid deduct lines for one bid, in whole dollars."""
+    wc: int
+    gl: int
+    umbrella: int
+    subtotal: int
+    op: int
+    total: int
+    rate_status: str
+    rate: Optional[WcRate] = None
+
+
+def js_round(value: float) -> int:
+    """Round like JavaScript's Math.round: halves go up, toward +infinity."""
+    floor = math.floor(value)
+    return int(floor + 1 if value - floor >= 0.5 else floor)
+
+
+def parse_number(value) -> float:
+    """Parse a possibly comma-formatted number like the calculator's parseNumber()."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return 0.0
+    match = _NUMBER_PREFIX.match(value.replace(',', ''))
+    return float(match.group(0)) if match else 0.0
+
+
+def parse_flag(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'y', 'x')
+
+
+@lru_cache(maxsize=None)
+def resolve_rate(state: str, labor_scope: str, class_code: str = '',
+                 rates: Optional[RateTable] = None) -> Tuple[str, Optional[WcRate]]:
+    """Return (rate_status, WcRate) for a state, labor scope and class code.
+
+    An empty class code picks the calculator's default for the state.
+    """
+    if labor_scope != 'self':
+        return RATE_NOT_APPLICABLE, None
+
+    rates = rates or load_rate_table()
+    options = rates.class_code_options(state)
+    rate = rates.lookup(state, class_code or (options[0] if options else ''))
+    if not state or rate is None:
+        return (RATE_NO_RATES if not options else RATE_UNKNOWN_CLASS), None
+    return RATE_OK, rate
+
+
+def normalize_bid(bid: Dict) -> Tuple[str, float, str, float, str, bool]:
+    """Return (state, contract_value, labor_scope, payroll, class_code, include_op) for a bid dict."""
+    state = str(bid.get('state') or '').strip().upper()
+    labor_scope = str(bid.get('labor_scope') or 'none').strip().lower()
+    if labor_scope not in LABOR_SCOPES:
+        raise ValueError(f"labor_scope must be one of {', '.join(LABOR_SCOPES)}, got {labor_scope!r}")
+    payroll = parse_number(bid.get('payroll')) if labor_scope == 'self' else 0.0
+    class_code = str(bid.get('class_code') or '').strip()
+    return (state, parse_number(bid.get('contract_value')), labor_scope, payroll,
+            class_code, parse_flag(bid.get('include_op')))
+
+
+def calculate(state: str, contract_value: float, labor_scope: str = 'none', payroll: float = 0,
+              class_code: str = '', include_op: bool = False, rates: Optional[RateTable] = None) -> BidQuote:
+    """Price one bid exactly as calculator.html's calculate() does."""
+    rates = rates or load_rate_table()
+    gl = js_round((contract_value / 1000) * rates.gl_rate)
+    umbrella = js_round((contract_value / 1000) * rates.umbrella_rate)
+
+    rate_status, rate = resolve_rate(state, labor_scope, class_code, rates)
+    wc = js_round((payroll / 100) * rate.effective_rate) if rate else 0
+
+    subtotal = wc + gl + umbrella
+    op = js_round(subtotal * rates.op_rate) if include_op else 0
+    return BidQuote(wc, gl, umbrella, subtotal, op, subtotal + op, rate_status, rate)
+
+
+def price_bids(bids: Sequence[Dict], vectorized: Optional[bool] = None,
+               rates: Optional[RateTable] = None) -> List[BidQuote]:
+    """Price a batch of bid dicts; vectorized with NumPy unless told otherwise."""
+    return price_rows([normalize_bid(bid) for bid in bids], vectorized, rates)
+
+
+def price_rows(rows: Sequence[Tuple], vectorized: Optional[bool] = None,
+               rates: Optional[RateTable] = None) -> List[BidQuote]:
+    """Price normalize_bid() tuples, column by column when NumPy is available."""
+    if not rows:
+        return []
+    columns = price_columns(*zip(*rows), vectorized=vectorized, rates=rates)
+    lines = [columns[name] for name in ('wc', 'gl', 'umbrella', 'subtotal', 'op', 'total')]
+    if not isinstance(lines[0], list):
+        lines = [line.tolist() for line in lines]
+    return [
+        BidQuote(*values, rate_status, rate)
+        for values, (rate_status, rate) in zip(zip(*lines), columns['rates'])
+    ]
+
+
+def price_columns(states: Sequence[str], contract_values: Sequence[float], labor_scopes: Sequence[str],
+                  payrolls: Sequence[float], class_codes: Sequence[str], include_ops: Sequence[bool],
+                  vectorized: Optional[bool] = None, rates: Optional[RateTable] = None) -> Dict:
+    """Price whole columns of normalized bids at once.
+
+    Returns the wc, gl, umbrella, subtotal, op and total columns (int64
+    arrays when vectorized, lists of ints otherwise) plus 'rates', the
+    (rate_status, WcRate) pair of every bid. Both paths give identical
+    numbers because they apply the same float64 operations in the same
+    order as the JavaScript.
+    """
+    if vectorized is None:
+        vectorized = np is not None
+    if vectorized and np is None:
+        raise RuntimeError("NumPy is not installed")
+
+    table = rates or load_rate_table()
+    gl_rate, umbrella_rate, op_rate = table.gl_rate, table.umbrella_rate, table.op_rate
+
+    # Few distinct (state, scope, class code) keys: resolve each once
+    resolved = [resolve_rate(state, scope, code, table) for state, scope, code in zip(states, labor_scopes, class_codes)]
+
+    if not vectorized:
+        columns = {name: [] for name in ('wc', 'gl', 'umbrella', 'subtotal', 'op', 'total')}
+        for contract_value, payroll, include_op, (_, rate) in zip(contract_values, payrolls, include_ops, resolved):
+            gl = js_round((contract_value / 1000) * gl_rate)
+            umbrella = js_round((contract_value / 1000) * umbrella_rate)
+            wc = js_round((payroll / 100) * rate.effective_rate) if rate else 0
+            subtotal = wc + gl + umbrella
+            op = js_round(subtotal * op_rate) if include_op else 0
+            for name, value in (('wc', wc), ('gl', gl), ('umbrella', umbrella),
+                                ('subtotal', subtotal), ('op', op), ('total', subtotal + op)):
+                columns[name].append(value)
+        columns['rates'] = resolved
+        return columns
+
+    count = len(resolved)
+    effective_rates = np.fromiter((rate.effective_rate if rate else 0.0 for _, rate in resolved),
+                                  dtype=np.float64, count=count)
+    has_rate = np.fromiter((rate is not None for _, rate in resolved), dtype=bool, count=count)
+
+    contract = np.asarray(contract_values, dtype=np.float64)
+    gl = js_round_array((contract / 1000) * gl_rate)
+    umbrella = js_round_array((contract / 1000) * umbrella_rate)
+    wc = np.where(has_rate, js_round_array((np.asarray(payrolls, dtype=np.float64) / 100) * effective_rates), 0)
+
+    subtotal = wc + gl + umbrella
+    op = np.where(np.asarray(include_ops, dtype=bool), js_round_array(subtotal * op_rate), 0)
+    return {'wc': wc, 'gl': gl, 'umbrella': umbrella, 'subtotal': subtotal, 'op': op,
+            'total': subtotal + op, 'rates': resolved}
+
+
+def js_round_array(values):
+    """Vectorized js_round() returning int64."""
+    floor = np.floor(values)
+    return (floor + (values - floor >= 0.5)).astype(np.int64)
+
+
+def quote_columns(quote: BidQuote) -> Dict:
+    """Flatten a quote into the RESULT_COLUMNS of the priced CSV."""
+    rate = quote.rate
+    return {
+        'class_code_used': rate.class_code if rate else '',
+        'base_rate': rate.base_rate if rate else '',
+        'emr': rate.emr if rate else '',
+        'ld_factor': rate.ld_factor if rate else '',
+        'effective_rate': f"{rate.effective_rate:.4f}" if rate else '',
+        'rate_status': quote.rate_status,
+        'wc': quote.wc,
+        'gl': quote.gl,
+        'umbrella': quote.umbrella,
+        'subtotal': quote.subtotal,
+        'op': quote.op,
+        'total': quote.total,
+    }
+
+
+def _chunks(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def price_csv(input_file, output_file, chunk_size: int = 50000, vectorized: Optional[bool] = None,
+              rates: Optional[RateTable] = None) -> Dict:
+    """Price every bid in a CSV stream, chunk by chunk, writing input plus result columns.
+
+    Rows that fail validation are reported and left out of the output.
+    """
+    reader = csv.DictReader(input_file)
+    if not reader.fieldnames or 'state' not in reader.fieldnames or 'contract_value' not in reader.fieldnames:
+        raise ValueError("CSV needs a header row with at least state and contract_value columns")
+
+    writer = csv.DictWriter(output_file, fieldnames=list(reader.fieldnames) + RESULT_COLUMNS,
+                            extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+
+    stats = {'rows': 0, 'priced': 0, 'errors': [], 'totals': dict.fromkeys(['wc', 'gl', 'umbrella', 'op', 'total'], 0)}
+    line = 1
+    for chunk in _chunks(reader, chunk_size):
+        valid, normalized = [], []
+        for row in chunk:
+            line += 1
+            try:
+                normalized.append(normalize_bid(row))
+                valid.append(row)
+            except ValueError as e:
+                stats['errors'].append(f"line {line}: {e}")
+
+        for row, quote in zip(valid, price_rows(normalized, vectorized, rates)):
+            writer.writerow({**row, **quote_columns(quote)})
+            for name in stats['totals']:
+                stats['totals'][name] += getattr(quote, name)
+
+        stats['rows'] += len(chunk)
+        stats['priced'] += len(valid)
+    return stats
+
+
+def random_bids(count: int, seed: int = 42) -> List[Dict]:
+    """Seeded synthetic bids covering every state, labor scope and class code."""
+    rng = random.Random(seed)
+    rates = load_rate_table()
+    states = sorted(rates.states) + ['', 'WA']
+    bids = []
+    for i in range(count):
+        state = rng.choice(states)
+        labor_scope = rng.choice(LABOR_SCOPES)
+        options = rates.class_code_options(state) or ['']
+        bids.append({
+            'bid_id': f"BID-{i:06d}",
+            'state': state,
+            'contract_value': f"{rng.uniform(0, 5_000_000):,.2f}",
+            'labor_scope': labor_scope,
+            'payroll': f"{rng.uniform(0, 1_500_000):.2f}" if labor_scope == 'self' else '',
+            'class_code': rng.choice(options),
+            'include_op': rng.choice(['yes', 'no']),
+        })
+    return bids
+
+
+def benchmark(rows: int = 100000, rounds: int = 3) -> Dict:
+    """Compare pure-Python and NumPy column pricing throughput on synthetic bids.
+
+    Bids are parsed once up front; the timings cover rate lookup and the
+    WC/GL/umbrella/O&P arithmetic for the whole batch.
+    """
+    columns = list(zip(*(normalize_bid(bid) for bid in random_bids(rows))))
+    modes = [('python', False)] + ([('numpy', True)] if np is not None else [])
+    results = {'rows': rows, 'numpy': np is not None}
+    totals = {}
+    for name, vectorized in modes:
+        timings = []
+        for _ in range(rounds):
+            resolve_rate.cache_clear()
+            start = time.perf_counter()
+            priced = price_columns(*columns, vectorized=vectorized)
+            timings.append(time.perf_counter() - start)
+        totals[name] = [list(map(int, priced[line])) for line in ('wc', 'gl', 'umbrella', 'op', 'total')]
+        results[name] = min(timings)
+        results[f"{name}_bids_per_second"] = rows / results[name] if results[name] else 0
+    if 'numpy' in totals:
+        results['identical'] = totals['numpy'] == totals['python']
+        results['speedup'] = results['python'] / results['numpy'] if results['numpy'] else 0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Bid Deduct Engine')
+    parser.add_argument('input', nargs='?', help='CSV of bids to price (- for stdin)')
+    parser.add_argument('--output', help='Priced CSV to write (default: stdout)')
+    parser.add_argument('--rates', help='Compiled rate artifact (default: api/rates.json)')
+    parser.add_argument('--no-numpy', action='store_true', help='Use the pure-Python path even if NumPy is installed')
+    parser.add_argument('--benchmark', action='store_true', help='Measure batch pricing throughput')
+    parser.add_argument('--rows', type=int, default=100000, help='Synthetic bids for --benchmark')
+
+    args = parser.parse_args()
+
+    if args.benchmark:
+        results = benchmark(args.rows)
+        print(f"\n⏱️  BID DEDUCT BENCHMARK - {results['rows']:,} bids, best of 3")
+        print("=" * 50)
+        print(f"Pure Python: {results['python']:.3f} s ({results['python_bids_per_second']:,.0f} bids/s)")
+        if results['numpy']:
+            print(f"NumPy:       {results['numpy']:.3f} s ({results['numpy_bids_per_second']:,.0f} bids/s)")
+            print(f"Speedup:     {results['speedup']:.1f}x, results {'identical' if results['identical'] else 'DIFFER'}")
+        else:
+            print("NumPy:       not installed")
+        return
+
+    if not args.input:
+        parser.print_help()
+        return
+
+    vectorized = False if args.no_numpy else None
+    input_file = sys.stdin if args.input == '-' else open(args.input, newline='')
+    output_file = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        stats = price_csv(input_file, output_file, vectorized=vectorized, rates=load_rate_table(args.rates))
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    totals = stats['totals']
+    report = sys.stderr if output_file is sys.stdout else sys.stdout
+    for error in stats['errors']:
+        print(f"   ❌ {error}", file=report)
+    print(f"✅ Priced {stats['priced']:,} of {stats['rows']:,} bids: WC ${totals['wc']:,}, GL ${totals['gl']:,}, "
+          f"umbrella ${totals['umbrella']:,}, O&P ${totals['op']:,}, total ${totals['total']:,}", file=report)
+    if stats['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Bond Store for the Pending Bonds Tracker
+========================================
+Keeps the bonds pending_bonds.html tracks in the wrap-up database and publishes them as paged JSON.
+
+Features:
+- Ingests exportBonds() CSV files, localStorage dumps (a JSON array of bonds)
+  and bond_request.html submissions (JSON objects, one per line or one per file)
+- Normalizes statuses, bond types, principals, amounts ($1,234.50) and dates (2/14/2026)
+- Upserts by bond id; older CSV exports carry no id, so their rows get a stable one from their contents
+- A stored bond is never overwritten by an older copy of it (dateModified), and keeps its submission date
+- Paged api/bonds/ JSON per view: every bond, each status, each type and each status and type,
+  newest first, with the per-status and per-type counts in api/bonds/index.json
+- api/bonds/versions.json (id -> dateModified) so the tracker knows which local bonds the store lacks
+- Unchanged pages are not rewritten and pages of emptied views are removed
+- Filtered, searchable pages straight from SQLite (BondStore.query, served by api-server.py)
+
+Usage:
+    python3 bonds.py --db-path /tmp/wrapup_demo.db --ingest udhg_pending_bonds_2026-02-14.csv
+    python3 bonds.py --db-path /tmp/wrapup_demo.db --ingest bonds.json --prune --publish --web-root /srv/portal
+    python3 bonds.py --db-path /tmp/wrapup_demo.db --stats
+    python3 bonds.py --db-path /tmp/wrapup_demo.db --list --status Pending --type "Bid Bond" --search metro
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from bulk_importer import normalize_amount, normalize_date
+from instrumentation import add_arguments as add_instrumentation_arguments, instrumented_run, metrics
+from publisher import JsonPublisher
+from sync_pipeline import PAGE_SIZE
+from wrapup_db import WrapupDatabase, get_database
+
+MAX_PAGE_SIZE = 500
+
+# The choices pending_bonds.html offers, in its order
+STATUSES = ['Pending', 'Submitted', 'Active', 'Released', 'Denied']
+BOND_TYPES = ['Bid Bond', 'Performance Bond', 'Payment Bond', 'Performance + Payment Bond',
+              'Maintenance Bond', 'Supply Bond', 'Other']
+
+# bond_request.html stores the principal's full name; the tracker's select uses the short one
+PRINCIPALS = {
+    'unified door and hardware group (udhg)': 'UDHG',
+    'builders firstsource (fbm)': 'FBM',
+}
+
+# Column -> key in the bond objects pending_bonds.html keeps in localStorage
+JSON_KEYS = {
+    'id': 'id',
+    'bond_type': 'bondType',
+    'status': 'status',
+    'project_name': 'projectName',
+    'obligee': 'obligee',
+    'bond_amount': 'bondAmount',
+    'contract_amount': 'contractAmount',
+    'principal': 'principal',
+    'project_state': 'projectState',
+    'requestor_name': 'requestorName',
+    'requestor_email': 'requestorEmail',
+    'urgency': 'urgency',
+    'notes': 'notes',
+    'date_submitted': 'dateSubmitted',
+    'date_modified': 'dateModified',
+}
+COLUMNS = list(JSON_KEYS)
+
+# exportBonds() CSV header -> column
+CSV_COLUMNS = {
+    'Date': 'date_submitted',
+    'Bond Type': 'bond_type',
+    'Status': 'status',
+    'Project': 'project_name',
+    'Obligee': 'obligee',
+    'Bond Amount': 'bond_amount',
+    'Contract Amount': 'contract_amount',
+    'Principal': 'principal',
+    'State': 'project_state',
+    'Requestor': 'requestor_name',
+    'Requestor Email': 'requestor_email',
+    'Urgency': 'urgency',
+    'Notes': 'notes',
+    'Last Modified': 'date_modified',
+    'ID': 'id',
+}
+
+# The contents that identify a bond exported without its id
+CSV_IDENTITY = ('date_submitted', 'bond_type', 'project_name', 'obligee', 'bond_amount', 'requestor_email')
+
+ORDER_BY = "ORDER BY date_submitted DESC, id DESC"
+
+# Newer or equal copies only, and only when something changed, so an older
+# export never undoes a later edit and re-ingesting a file writes nothing.
+# The submission date never changes once stored: the tracker keeps it on
+# edit, and a CSV export only carries its day.
+_UPDATED = [column for column in COLUMNS if column not in ('id', 'date_submitted')]
+UPSERT_SQL = f"""
+    INSERT INTO bonds ({', '.join(COLUMNS)}) VALUES ({', '.join(':' + c for c in COLUMNS)})
+    ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in _UPDATED)}
+    WHERE (bonds.date_modified IS NULL OR excluded.date_modified >= bonds.date_modified)
+      AND ({' OR '.join(f'bonds.{c} IS NOT excluded.{c}' for c in _UPDATED)})
+"""
+
+
+def _text(value: Any) -> Optional[str]:
+    text = str(value).strip() if value is not None else ''
+    return text or None
+
+
+def _choice(value: Any, choices: List[str]) -> Optional[str]:
+    """The choice value matches ignoring case, or None."""
+    text = _text(value)
+    if text is None:
+        return None
+    for choice in choices:
+        if choice.lower() == text.lower():
+            return choice
+    return None
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    """ISO timestamps (new Date().toISOString()) as they are; other dates as YYYY-MM-DD."""
+    text = _text(value)
+    if text is None:
+        return None
+    if len(text) > 10 and text[4] == '-':
+        try:
+            datetime.fromisoformat(text.replace('Z', '+00:00'))
+            return text
+        except ValueError:
+            pass
+    return normalize_date(text)
+
+
+def normalize_bond(record: Dict[str, Any]) -> Dict[str, Any]:
+    """A bonds row from a record keyed by column name; raises ValueError for an unusable one."""
+    bond_type = _text(record.get('bond_type'))
+    if bond_type is None:
+        raise ValueError("missing bond type")
+    status = _text(record.get('status'))
+    canonical_status = _choice(status, STATUSES) if status else 'Pending'
+    if canonical_status is None:
+        raise ValueError(f"unknown status {status!r} (choose from {', '.join(STATUSES)})")
+    principal = _text(record.get('principal'))
+    if principal is not None:
+        principal = PRINCIPALS.get(principal.lower(), principal)
+    state = _text(record.get('project_state'))
+
+    row = {
+        'id': _text(record.get('id')),
+        'bond_type': _choice(bond_type, BOND_TYPES) or bond_type,
+        'status': canonical_status,
+        'project_name': _text(record.get('project_name')),
+        'obligee': _text(record.get('obligee')),
+        'bond_amount': normalize_amount(record.get('bond_amount')),
+        'contract_amount': normalize_amount(record.get('contract_amount')),
+        'principal': principal,
+        'project_state': state.upper() if state else None,
+        'requestor_name': _text(record.get('requestor_name')),
+        'requestor_email': _text(record.get('requestor_email')),
+        'urgency': _text(record.get('urgency')),
+        'notes': _text(record.get('notes')),
+        'date_submitted': _timestamp(record.get('date_submitted')),
+        'date_modified': _timestamp(record.get('date_modified')),
+    }
+    if row['id'] is None:
+        identity = json.dumps([row[column] for column in CSV_IDENTITY])
+        row['id'] = 'csv-' + hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
+    return row
+
+
+def bond_json(row: Dict[str, Any]) -> Dict[str, Any]:
+    """A bonds row as the bond object pending_bonds.html renders."""
+    return {JSON_KEYS[column]: row[column] for column in COLUMNS}
+
+
+def read_bonds(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(position, record keyed by column name) for every bond in an export or submission file.
+
+    The position is the CSV or NDJSON line, or the index in a JSON array.
+    """
+    source = Path(path)
+    if source.suffix.lower() == '.csv':
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {CSV_COLUMNS.get(name, name): value for name, value in row.items()}
+        return
+
+    columns = {key: column for column, key in JSON_KEYS.items()}
+    with open(source, encoding='utf-8') as f:
+        if source.suffix.lower() in ('.ndjson', '.jsonl'):
+            items = ((number, json.loads(line)) for number, line in enumerate(f, 1) if line.strip())
+        else:
+            document = json.load(f)
+            items = enumerate(document if isinstance(document, list) else [document], 1)
+        for position, item in items:
+            if not isinstance(item, dict):
+                raise ValueError(f"{path}: bond {position} is not a JSON object")
+            yield position, {columns.get(key, key): value for key, value in item.items()}
+
+
+@dataclass
+class IngestResult:
+    """Outcome of ingesting one file."""
+    source: str
+    bonds_read: int = 0
+    bonds_written: int = 0  # New or changed; the rest were already stored
+    rejects: List[Tuple[int, str]] = field(default_factory=list)  # (position, error)
+    ids: List[str] = field(default_factory=list)
+
+
+def _slug(value: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-') or 'none'
+
+
+class BondStore:
+    """The bonds table: ingestion, counts and filtered pages."""
+
+    def __init__(self, db: WrapupDatabase):
+        self.db = db
+
+    def ingest(self, path: str) -> IngestResult:
+        """Upsert every bond in an export or submission file in one transaction."""
+        result = IngestResult(path)
+        rows = {}
+        for position, record in read_bonds(path):
+            result.bonds_read += 1
+            try:
+                row = normalize_bond(record)
+            except ValueError as e:
+                result.rejects.append((position, str(e)))
+                continue
+            rows[row['id']] = row  # The last copy of a bond in a file wins
+        result.ids = list(rows)
+
+        with metrics.span("bonds.ingest"), self.db.transaction() as conn:
+            cursor = conn.executemany(UPSERT_SQL, list(rows.values()))
+            result.bonds_written = max(cursor.rowcount, 0)
+        metrics.count("bonds.written", result.bonds_written)
+        return result
+
+    def prune(self, keep_ids: Iterable[str]) -> int:
+        """Delete every bond not in keep_ids (after ingesting a complete export); return how many."""
+        with self.db.transaction() as conn:
+            cursor = conn.execute("DELETE FROM bonds WHERE id NOT IN (SELECT value FROM json_each(?))",
+                                  (json.dumps(list(keep_ids)),))
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, Any]:
+        """Bond counts in total, per status, per type and per status and type, from one grouped query."""
+        counts = {'total': 0, 'by_status': {status: 0 for status in STATUSES}, 'by_type': {}, 'by_status_type': {}}
+        rows = self.db.connection.execute("SELECT status, bond_type, COUNT(*) FROM bonds GROUP BY status, bond_type")
+        for status, bond_type, count in rows:
+            counts['total'] += count
+            counts['by_status'][status] = counts['by_status'].get(status, 0) + count
+            counts['by_type'][bond_type] = counts['by_type'].get(bond_type, 0) + count
+            counts['by_status_type'].setdefault(status, {})[bond_type] = count
+        return counts
+
+    def iter_bonds(self) -> Iterator[Dict[str, Any]]:
+        """Every bond, newest first, as a row dict."""
+        cursor = self.db.connection.execute(f"SELECT {', '.join(COLUMNS)} FROM bonds {ORDER_BY}")
+        for row in cursor:
+            yield dict(zip(COLUMNS, row))
+
+    def query(self, status: Optional[str] = None, bond_type: Optional[str] = None, search: Optional[str] = None,
+              page: int = 1, page_size: int = PAGE_SIZE) -> Dict[str, Any]:
+        """One page of bonds, newest first, filtered as pending_bonds.html filters its table.
+
+        search matches the project, obligee and requestor names, ignoring
+        case. Raises ValueError for a bad page or page size.
+        """
+        if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page must be >= 1 and page_size between 1 and {MAX_PAGE_SIZE}")
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(_choice(status, STATUSES) or status)
+        if bond_type:
+            clauses.append("bond_type = ?")
+            params.append(_choice(bond_type, BOND_TYPES) or bond_type)
+        if search:
+            pattern = '%' + search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append("(" + " OR ".join(f"lower({column}) LIKE ? ESCAPE '\\'"
+                                             for column in ('project_name', 'obligee', 'requestor_name')) + ")")
+            params.extend([pattern] * 3)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self.db.snapshot() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM bonds {where}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM bonds {where} {ORDER_BY} LIMIT ? OFFSET ?",
+                                params + [page_size, (page - 1) * page_size]).fetchall()
+        filters = {'status': status, 'type': bond_type, 'q': search}
+        return {
+            "bonds": [bond_json(dict(zip(COLUMNS, row))) for row in rows],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "pages": math.ceil(total / page_size),
+            "filters": {name: value for name, value in filters.items() if value},
+        }
+
+
+class BondPager:
+    """Writes api/bonds/: index.json, versions.json and fixed-size, newest-first pages for every view.
+
+    A view is every bond ("all"), one status ("status/pending"), one type
+    ("type/bid-bond") or one status and type ("status/pending/type/bid-bond"),
+    so the tracker fetches the page it shows for any filter combination.
+    One pass over the bonds, holding one partial page per view.
+    """
+
+    def __init__(self, publisher: JsonPublisher, api_dir: Path, page_size: int = PAGE_SIZE, prune: bool = True):
+        self.publisher = publisher
+        self.api_dir = Path(api_dir)
+        self.page_size = page_size
+        self.prune = prune  # Remove stale page files from api_dir on finish()
+        self.bonds_dir = self.api_dir / "bonds"
+        self.views: Dict[str, Dict] = {}
+        self.published = set()
+        self.slugs: Dict[str, str] = {}
+        self.versions: Dict[str, str] = {}
+
+    def _slug(self, value: str) -> str:
+        """A path segment for a status or type, unique among the values seen."""
+        slug = self.slugs.get(value)
+        if slug is None:
+            slug = base = _slug(value)
+            taken = set(self.slugs.values())
+            number = 2
+            while slug in taken:
+                slug, number = f"{base}-{number}", number + 1
+            self.slugs[value] = slug
+        return slug
+
+    def add(self, row: Dict[str, Any]):
+        bond = bond_json(row)
+        self.versions[row['id']] = row['date_modified'] or ''
+        status, bond_type = row['status'], row['bond_type']
+        status_view = f"status/{self._slug(status)}"
+        type_view = f"type/{self._slug(bond_type)}"
+        for key, filters in (("all", {}),
+                             (status_view, {'status': status}),
+                             (type_view, {'type': bond_type}),
+                             (f"{status_view}/{type_view}", {'status': status, 'type': bond_type})):
+            view = self.views.get(key)
+            if view is None:
+                view = self.views[key] = {'filters': filters, 'count': 0, 'pages': [], 'buffer': []}
+            view['count'] += 1
+            view['buffer'].append(bond)
+            if len(view['buffer']) == self.page_size:
+                self._flush(key, view)
+
+    def _flush(self, key: str, view: Dict):
+        page_number = len(view['pages']) + 1
+        page_path = f"bonds/{key}/page-{page_number}.json"
+        self.publisher.publish(self.api_dir / page_path, {
+            "view": key,
+            "page": page_number,
+            "bonds": view['buffer']
+        })
+        self.published.add(page_path)
+        view['pages'].append(page_path)
+        view['buffer'] = []
+
+    def finish(self, last_sync: str) -> Dict[str, Any]:
+        """Flush partial pages, write index.json and drop stale pages; return the index."""
+        counts = {'total': 0, 'by_status': {status: 0 for status in STATUSES}, 'by_type': {}, 'by_status_type': {}}
+        view_index = []
+        for key, view in self.views.items():
+            if view['buffer']:
+                self._flush(key, view)
+            view_index.append({"key": key, **view['filters'], "count": view['count'], "pages": view['pages']})
+            filters = view['filters']
+            if not filters:
+                counts['total'] = view['count']
+            elif 'status' in filters and 'type' in filters:
+                counts['by_status_type'].setdefault(filters['status'], {})[filters['type']] = view['count']
+            elif 'status' in filters:
+                counts['by_status'][filters['status']] = view['count']
+            else:
+                counts['by_type'][filters['type']] = view['count']
+
+        index = {
+            "counts": counts,
+            "page_size": self.page_size,
+            "views": sorted(view_index, key=lambda view: view['key']),
+            "last_sync": last_sync
+        }
+        self.publisher.publish(self.bonds_dir / "index.json", index)
+        self.publisher.publish(self.bonds_dir / "versions.json", {"versions": self.versions})
+
+        # Drop pages left over from views that shrank or emptied
+        if self.prune and self.bonds_dir.exists():
+            for page_file in self.bonds_dir.glob("**/page-*.json"):
+                if page_file.relative_to(self.api_dir).as_posix() not in self.published:
+                    self.publisher.remove(page_file)
+        return index
+
+
+def publish_bonds(store: BondStore, publisher: JsonPublisher, api_dir: Path, prune: bool = True) -> Dict[str, Any]:
+    """Publish api/bonds/ from the store; return the index."""
+    pager = BondPager(publisher, api_dir, prune=prune)
+    with metrics.span("bonds.publish"), store.db.snapshot():
+        for row in store.iter_bonds():
+            pager.add(row)
+        return pager.finish(datetime.utcnow().isoformat() + 'Z')
+
+
+def print_counts(counts: Dict[str, Any]):
+    print(f"\n📋 BONDS: {counts['total']}")
+    print("=" * 40)
+    for status, count in counts['by_status'].items():
+        print(f"  {status:<28} {count:>6}")
+    print("-" * 40)
+    for bond_type, count in sorted(counts['by_type'].items()):
+        print(f"  {bond_type:<28} {count:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Pending Bonds Store')
+    parser.add_argument('--db-path', required=True, help='Path to wrap-up manager database')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending schema migrations instead of refusing an out-of-date database')
+    parser.add_argument('--ingest', nargs='+', metavar='FILE', help='exportBonds() CSV, localStorage JSON or bond request JSON/NDJSON files')
+    parser.add_argument('--prune', action='store_true', help='With --ingest, the files are a complete export: delete bonds missing from them')
+    parser.add_argument('--publish', action='store_true', help='Write the paged api/bonds/ JSON')
+    parser.add_argument('--web-root', help='With --publish, web portal root directory')
+    parser.add_argument('--minify', action='store_true', help='With --publish, write minified JSON')
+    parser.add_argument('--stats', action='store_true', help='Show bond counts by status and type')
+    parser.add_argument('--list', action='store_true', help='Show one page of bonds, newest first')
+    parser.add_argument('--status', help='With --list, only this status')
+    parser.add_argument('--type', dest='bond_type', help='With --list, only this bond type')
+    parser.add_argument('--search', help='With --list, match project, obligee or requestor names')
+    parser.add_argument('--page', type=int, default=1, help='With --list, page number')
+    add_instrumentation_arguments(parser)
+
+    args = parser.parse_args()
+
+    if not (args.ingest or args.publish or args.stats or args.list):
+        parser.print_help()
+        return
+    if args.prune and not args.ingest:
+        parser.error("--prune needs --ingest")
+    for path in args.ingest or []:
+        if not Path(path).is_file():
+            parser.error(f"file not found: {path}")
+
+    if not Path(args.db_path).is_file():
+        parser.error(f"database not found: {args.db_path}")
+
+    from migrations import SchemaOutOfDate, require_schema
+    db = get_database(args.db_path)
+    try:
+        require_schema(db, apply=args.migrate)
+    except SchemaOutOfDate as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    store = BondStore(db)
+
+    failed = False
+    with instrumented_run('bonds', args):
+        if args.ingest:
+            kept = []
+            for path in args.ingest:
+                try:
+                    result = store.ingest(path)
+                except (ValueError, csv.Error) as e:
+                    print(f"❌ {path}: {e}")
+                    failed = True
+                    continue
+                kept.extend(result.ids)
+                print(f"✅ {Path(path).name}: {result.bonds_read} bonds read, {result.bonds_written} new or changed, "
+                      f"{len(result.rejects)} rejected")
+                for position, error in result.rejects[:10]:
+                    print(f"   ❌ {position}: {error}")
+            if args.prune:
+                if failed:
+                    print("⚠️  Not pruning: some files could not be ingested")
+                else:
+                    print(f"🗑️  Removed {store.prune(kept)} bonds missing from the export")
+
+        if args.publish:
+            web_root = Path(args.web_root) if args.web_root else Path(__file__).parent.parent
+            api_dir = web_root / "api"
+            api_dir.mkdir(exist_ok=True)
+            publisher = JsonPublisher(api_dir, minify=args.minify)
+            index = publish_bonds(store, publisher, api_dir)
+            totals = publisher.finish()
+            print(f"✅ api/bonds/: {index['counts']['total']} bonds in {len(index['views'])} views, "
+                  f"{totals['files_written']} files written, {totals['files_skipped']} unchanged")
+
+        if args.stats:
+            print_counts(store.counts())
+
+        if args.list:
+            try:
+                page = store.query(args.status, args.bond_type, args.search, args.page)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"\n📄 BONDS - page {page['page']} of {page['pages']} ({page['total']} matching)")
+            print("=" * 40)
+            for bond in page['bonds']:
+                amount = f"${bond['bondAmount']:,.0f}" if bond['bondAmount'] else '-'
+                print(f"  {(bond['dateSubmitted'] or '-')[:10]}  {bond['status']:<10} {bond['bondType']:<28} "
+                      f"{amount:>12}  {bond['projectName'] or '-'}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+Bulk Importer for Wrap-up Data
+==============================
+Streams carrier and payroll exports (CSV or NDJSON) into the wrap-up database.
+
+Features:
+- Loads programs, payroll_reports and enrollment_docs, the tables data-sync.py reads
+- Normalizes dates (ISO, M/D/YYYY, timestamps) and amounts ($1,234.50, (12.00), 3.5%) a chunk at a time
+- Rejects rows with unknown programs, bad dates, amounts or statuses by line number, optionally into a file
+- Upserts each chunk with executemany in one transaction (--batch-size)
+- Leaves unchanged rows alone, so change capture and incremental syncs see only real changes
+- Reports rows per second while running and at the end
+- Commits progress with every batch, so an interrupted import resumes where it stopped
+
+Usage:
+    python3 bulk_importer.py --db-path /tmp/wrapup_demo.db --into payroll_reports payroll_2026.csv
+    python3 bulk_importer.py --db-path /tmp/wrapup_demo.db --into enrollment_docs docs.ndjson --batch-size 20000
+    python3 bulk_importer.py --db-path /tmp/wrapup_demo.db --into programs programs.csv --rejects rejected.ndjson
+    python3 bulk_importer.py --db-path /tmp/wrapup_demo.db --into payroll_reports payroll_2026.csv --restart
+    python3 bulk_importer.py --db-path /tmp/wrapup_demo.db --status
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from instrumentation import add_arguments as add_instrumentation_arguments, instrumented_run, metrics
+from wrapup_db import WrapupDatabase, get_database
+
+DEFAULT_BATCH_SIZE = 5000
+PROGRESS_INTERVAL = 5.0  # seconds between rows-per-second lines
+FINGERPRINT_BYTES = 65536  # a source is recognized on resume by a hash of its first bytes
+MAX_PRINTED_REJECTS = 10
+
+DATE_FORMATS = ('%m/%d/%Y', '%m/%d/%y', '%Y/%m/%d', '%d-%b-%Y', '%b %d, %Y', '%B %d, %Y')
+
+
+@lru_cache(maxsize=65536)
+def _parse_date(text: str) -> str:
+    if len(text) > 10 and text[10] in 'T ':
+        text = text[:10]  # Timestamps keep their date
+    if len(text) == 10 and text[4] == '-' and text[7] == '-':
+        datetime.strptime(text, '%Y-%m-%d')
+        return text
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError
+
+
+def normalize_date(value: Any) -> Optional[str]:
+    """An ISO YYYY-MM-DD date from ISO, US and timestamp forms; None for an empty cell."""
+    text = str(value).strip() if value is not None else ''
+    if not text:
+        return None
+    try:
+        return _parse_date(text)
+    except ValueError:
+        raise ValueError(f"unrecognized date {value!r}") from None
+
+
+def normalize_amount(value: Any) -> Optional[float]:
+    """A number from 1234.5, "$1,234.50" or "(1,234.50)" (negative); None for an empty cell."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"not an amount: {value!r}")
+    try:
+        amount = float(value)  # Plain numbers, the common case
+    except ValueError:
+        text = value.strip().replace(',', '').replace('$', '').replace(' ', '')
+        if not text:
+            return None
+        negative = text.startswith('(') and text.endswith(')')
+        try:
+            amount = float(text[1:-1] if negative else text)
+        except ValueError:
+            raise ValueError(f"not an amount: {value!r}") from None
+        if negative:
+            amount = -amount
+    if not math.isfinite(amount):
+        raise ValueError(f"not an amount: {value!r}")
+    return amount
+
+
+def normalize_percent(value: Any) -> Optional[float]:
+    """A percentage from 3.5 or "3.5%", between 0 and 100."""
+    text = str(value).strip().rstrip('%') if isinstance(value, str) else value
+    percent = normalize_amount(text)
+    if percent is not None and not 0 <= percent <= 100:
+        raise ValueError(f"percentage out of range: {value!r}")
+    return percent
+
+
+def _text(value: Any) -> Optional[str]:
+    text = str(value).strip() if value is not None else ''
+    return text or None
+
+
+def _required_text(value: Any) -> str:
+    text = _text(value)
+    if text is None:
+        raise ValueError("missing value")
+    return text
+
+
+@lru_cache(maxsize=4096)
+def _snake_case(text: str) -> Optional[str]:
+    text = text.strip()
+    return text.lower().replace(' ', '_').replace('-', '_') if text else None
+
+
+def _code(value: Any) -> Optional[str]:
+    """lower_snake_case form of a status or document type ("Not Started" -> not_started)."""
+    return _snake_case(value) if isinstance(value, str) else _snake_case(_text(value) or '')
+
+
+def _choice(allowed: Sequence[str], normalize: Callable[[Any], Optional[str]] = _code):
+    def check(value: Any) -> str:
+        code = normalize(value)
+        if code not in allowed:
+            raise ValueError(f"{value!r} is not one of {', '.join(allowed)}")
+        return code
+    return check
+
+
+def _email(value: Any) -> Optional[str]:
+    text = _text(value)
+    if text is not None and '@' not in text:
+        raise ValueError(f"not an email address: {value!r}")
+    return text
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """How one target table's rows are normalized and upserted."""
+    name: str
+    key: Tuple[str, ...]  # Natural key: one row per key after an import
+    columns: Dict[str, Callable[[Any], Any]]  # Column -> normalizer, in table order
+    required: Tuple[str, ...]  # Columns every source file must have
+    unique_key: bool = True  # key is a UNIQUE constraint, so ON CONFLICT applies
+    insert_requires: Tuple[str, ...] = ()  # NOT NULL columns without a default, needed to add a row
+
+    def upsert_statements(self, columns: Sequence[str]) -> List[str]:
+        """Statements run with executemany over a batch of row dicts with these columns.
+
+        Rows are only rewritten when a value differs, so unchanged rows
+        fire no triggers and log no changes. Without the insert_requires
+        columns the rows can only update existing ones.
+        """
+        values = [column for column in columns if column not in self.key]
+        changed = " OR ".join(f"{self.name}.{column} IS NOT :{column}" for column in values)
+        match = " AND ".join(f"{column} = :{column}" for column in self.key)
+        update = (f"UPDATE {self.name} SET {', '.join(f'{c} = :{c}' for c in values)} "
+                  f"WHERE {match} AND ({changed})")
+        if not all(column in columns for column in self.insert_requires):
+            return [update] if values else []
+
+        if self.unique_key:
+            sql = (f"INSERT INTO {self.name} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)}) "
+                   f"ON CONFLICT({', '.join(self.key)}) DO ")
+            if not values:
+                return [sql + "NOTHING"]
+            return [sql + f"UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in values)} "
+                          f"WHERE {changed.replace(':', 'excluded.')}"]
+
+        statements = [update] if values else []
+        statements.append(f"INSERT INTO {self.name} ({', '.join(columns)}) "
+                          f"SELECT {', '.join(':' + c for c in columns)} "
+                          f"WHERE NOT EXISTS (SELECT 1 FROM {self.name} WHERE {match})")
+        return statements
+
+
+TABLES = {
+    'programs': TableSpec(
+        name='programs',
+        key=('id',),
+        columns={
+            'id': _required_text,
+            'project_name': _required_text,
+            'project_address': _text,
+            'program_type': _choice(['OCIP', 'CCIP'], lambda value: (_text(value) or '').upper()),
+            'enrollment_status': _choice(['pending', 'enrolled', 'active', 'completed']),
+            'bid_deduct_pct': normalize_percent,
+            'contract_value': normalize_amount,
+            'estimated_completion': normalize_date,
+            'contact_name': _text,
+            'contact_email': _email,
+        },
+        required=('id',),
+        insert_requires=('project_name',),
+    ),
+    'payroll_reports': TableSpec(
+        name='payroll_reports',
+        key=('program_id', 'due_date'),  # payroll_reports has no unique key; one report per program and due date
+        columns={
+            'program_id': _required_text,
+            'due_date': lambda value: normalize_date(value) or _required_text(None),
+            'status': _choice(['pending', 'submitted', 'overdue']),
+            'payroll_amount': normalize_amount,
+            'submitted_date': normalize_date,
+        },
+        required=('program_id', 'due_date'),
+        unique_key=False,
+    ),
+    'enrollment_docs': TableSpec(
+        name='enrollment_docs',
+        key=('program_id', 'document_type'),
+        columns={
+            'program_id': _required_text,
+            'document_type': lambda value: _code(value) or _required_text(None),
+            'status': _choice(['completed', 'pending', 'not_started']),
+            'submitted_date': normalize_date,
+        },
+        required=('program_id', 'document_type'),
+    ),
+}
+
+
+def _column_name(header: str) -> str:
+    return header.strip().lstrip('\ufeff').lower().replace(' ', '_').replace('-', '_')
+
+
+@dataclass
+class SourceRecord:
+    line: int  # Line the record starts on
+    end_line: int  # Line it ends on (quoted CSV cells can span lines)
+    end_offset: int  # Byte offset just past the record, where a resume continues
+    values: Any  # Cell list (CSV) or the line's text (NDJSON)
+
+
+class SourceReader:
+    """Reads records from a CSV or NDJSON file, tracking the byte offset after each one.
+
+    The file is read in binary and fed to the csv module a line at a time,
+    so the offset after a record is known exactly even when quoted cells
+    span lines, and a resumed import seeks straight to it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.format = 'ndjson' if path.suffix.lower() in ('.ndjson', '.jsonl') else 'csv'
+        self.header: Optional[List[str]] = None
+        self.header_end = 0
+        if self.format == 'csv':
+            with open(path, 'rb') as f:
+                lines = self._lines(f, 0, 0)
+                first = next(csv.reader(lines), None)
+                self.header = [_column_name(name) for name in first] if first else []
+                self.header_end = self._offset
+
+    def _lines(self, f, offset: int, line: int) -> Iterator[str]:
+        self._offset, self._line = offset, line
+        for raw in f:
+            self._offset += len(raw)
+            self._line += 1
+            yield raw.decode('utf-8')
+
+    def records(self, offset: int = 0, line: int = 0) -> Iterator[SourceRecord]:
+        """Records after byte offset (the start of the data when 0), line being the last line read before it."""
+        if self.format == 'csv' and offset < self.header_end:
+            offset, line = self.header_end, 1
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            lines = self._lines(f, offset, line)
+            if self.format == 'csv':
+                reader = csv.reader(lines)
+                start = self._line + 1
+                for cells in reader:
+                    if cells:
+                        yield SourceRecord(start, self._line, self._offset, cells)
+                    start = self._line + 1
+            else:
+                for text in lines:
+                    if text.strip():
+                        yield SourceRecord(self._line, self._line, self._offset, text)
+
+    def columns(self) -> Optional[List[str]]:
+        """Column names from the CSV header; None for NDJSON, whose keys vary per record."""
+        return self.header
+
+
+def fingerprint(path: Path) -> str:
+    """Hash of the file's first bytes, which identifies it when resuming (appended data is fine)."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(FINGERPRINT_BYTES)).hexdigest()
+
+
+@dataclass
+class ImportResult:
+    """Outcome of importing one source file."""
+    source: str
+    target: str
+    rows_read: int = 0
+    rows_written: int = 0  # Inserted or changed; the rest matched the database already
+    rows_rejected: int = 0
+    seconds: float = 0.0
+    resumed_at_line: int = 0
+    skipped: bool = False  # Already imported; nothing to do
+    rejects: List[Dict[str, Any]] = field(default_factory=list)  # The first few, for printing
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+
+class BulkImporter:
+    """Imports CSV and NDJSON files into the wrap-up tables in resumable batches."""
+
+    def __init__(self, db: WrapupDatabase, batch_size: int = DEFAULT_BATCH_SIZE,
+                 rejects_out: Optional[TextIO] = None, progress: bool = True):
+        if batch_size < 1:
+            raise ValueError("batch size must be at least 1")
+        self.db = db
+        self.batch_size = batch_size
+        self.rejects_out = rejects_out
+        self.progress = progress
+
+    def import_file(self, path: str, target: str, restart: bool = False) -> ImportResult:
+        """Import one file into target, resuming an interrupted import of it unless restart.
+
+        Raises ValueError for an unknown target, a CSV header without the
+        target's required columns, or a file that changed since its
+        interrupted import.
+        """
+        spec = TABLES.get(target)
+        if spec is None:
+            raise ValueError(f"unknown target table {target!r} (choose from {', '.join(TABLES)})")
+        source = Path(path).resolve()
+        reader = SourceReader(source)
+        header = reader.columns()
+        if header is not None:
+            missing = [column for column in spec.required if column not in header]
+            if missing:
+                raise ValueError(f"{path}: missing required columns {', '.join(missing)}")
+
+        result = ImportResult(str(source), target)
+        offset, line = self._start(source, target, restart, result)
+        if result.skipped:
+            return result
+        if result.resumed_at_line and self.progress:
+            print(f"   ↪️  Resuming after line {result.resumed_at_line:,}")
+
+        start = time.perf_counter()
+        last_report = start
+        batch: List[SourceRecord] = []
+        for record in reader.records(offset, line):
+            batch.append(record)
+            if len(batch) == self.batch_size:
+                self._import_batch(spec, header, source, batch, result)
+                batch = []
+                now = time.perf_counter()
+                if self.progress and now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    print(f"   ⏳ {result.rows_read:,} rows, {result.rows_read / (now - start):,.0f} rows/s")
+        if batch:
+            self._import_batch(spec, header, source, batch, result)
+
+        with self.db.transaction() as conn:
+            conn.execute("UPDATE import_progress SET completed_at = ?, updated_at = ? WHERE source = ?",
+                         (_now(), _now(), str(source)))
+        result.seconds = time.perf_counter() - start
+        metrics.count("import.rows_read", result.rows_read)
+        metrics.count("import.rows_written", result.rows_written)
+        metrics.count("import.rows_rejected", result.rows_rejected)
+        return result
+
+    def _start(self, source: Path, target: str, restart: bool, result: ImportResult) -> Tuple[int, int]:
+        """Create or check the file's progress row; return the (byte offset, line) to continue from."""
+        digest = fingerprint(source)
+        with self.db.transaction() as conn:
+            row = conn.execute("""
+                SELECT target, fingerprint, byte_offset, line, completed_at FROM import_progress WHERE source = ?
+            """, (str(source),)).fetchone()
+            if row is not None and not restart:
+                previous_target, previous_digest, offset, line, completed_at = row
+                if previous_target != target:
+                    raise ValueError(f"{source} was imported into {previous_target}; use --restart to import it again")
+                if completed_at:
+                    result.skipped = True
+                    return offset, line
+                if previous_digest != digest:
+                    raise ValueError(f"{source} changed since its interrupted import; use --restart")
+                result.resumed_at_line = line
+                return offset, line
+
+            conn.execute("""
+                INSERT OR REPLACE INTO import_progress (source, target, fingerprint, started_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (str(source), target, digest, _now(), _now()))
+        return 0, 0
+
+    def _normalize(self, spec: TableSpec, header: Optional[List[str]],
+                   batch: List[SourceRecord]) -> Tuple[Dict[Tuple[str, ...], List], List[Dict[str, Any]]]:
+        """Valid rows grouped by their column set, and a reject entry for every other record."""
+        groups: Dict[Tuple[str, ...], List] = {}
+        rejects = []
+        if header is not None:
+            indexes = [(column, i) for i, column in enumerate(header) if column in spec.columns]
+            columns = tuple(column for column, _ in indexes)
+            width = len(header)
+        for record in batch:
+            try:
+                if header is not None:
+                    cells = record.values
+                    if len(cells) != width:
+                        raise ValueError(f"expected {width} fields, found {len(cells)}")
+                    raw = {column: cells[i] for column, i in indexes}
+                else:
+                    raw = json.loads(record.values)
+                    if not isinstance(raw, dict):
+                        raise ValueError("not a JSON object")
+                    raw = {_column_name(name): value for name, value in raw.items()}
+                    columns = tuple(column for column in spec.columns if column in raw)
+                    missing = [column for column in spec.required if column not in raw]
+                    if missing:
+                        raise ValueError(f"missing {', '.join(missing)}")
+                row = {}
+                for column in columns:
+                    try:
+                        row[column] = spec.columns[column](raw[column])
+                    except ValueError as e:
+                        raise ValueError(f"{column}: {e}") from None
+                groups.setdefault(columns, []).append((record, row))
+            except ValueError as e:
+                rejects.append({'line': record.line, 'error': str(e), 'record': _reject_text(record.values)})
+        return groups, rejects
+
+    def _import_batch(self, spec: TableSpec, header: Optional[List[str]], source: Path,
+                      batch: List[SourceRecord], result: ImportResult):
+        """Normalize, check and upsert one batch, committing it with the file's progress."""
+        with metrics.span("import.normalize"):
+            groups, rejects = self._normalize(spec, header, batch)
+
+        with metrics.span("import.batch"), self.db.transaction() as conn:
+            rows_by_columns = self._check_programs(conn, spec, groups, rejects)
+            written = 0
+            for columns, rows in rows_by_columns.items():
+                if not spec.unique_key:
+                    # The statements match existing rows by key, so the last row for a key wins
+                    rows = list({tuple(row[column] for column in spec.key): row for row in rows}.values())
+                for sql in spec.upsert_statements(columns):
+                    cursor = conn.executemany(sql, rows)
+                    written += max(cursor.rowcount, 0)
+            last = batch[-1]
+            result.rows_read += len(batch)
+            result.rows_written += written
+            result.rows_rejected += len(rejects)
+            conn.execute("""
+                UPDATE import_progress
+                SET byte_offset = ?, line = ?, rows_read = rows_read + ?, rows_written = rows_written + ?,
+                    rows_rejected = rows_rejected + ?, updated_at = ?
+                WHERE source = ?
+            """, (last.end_offset, last.end_line, len(batch), written, len(rejects), _now(), str(source)))
+
+        if rejects:
+            rejects.sort(key=lambda reject: reject['line'])
+            room = MAX_PRINTED_REJECTS - len(result.rejects)
+            result.rejects.extend(rejects[:max(room, 0)])
+            if self.rejects_out is not None:
+                for reject in rejects:
+                    self.rejects_out.write(json.dumps({'source': str(source), **reject}) + "\n")
+
+    def _check_programs(self, conn, spec: TableSpec, groups: Dict[Tuple[str, ...], List],
+                        rejects: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+        """Drop rows that would reference a missing program, or create one without a project name."""
+        id_column = 'id' if spec.name == 'programs' else 'program_id'
+        program_ids = sorted({row[id_column] for rows in groups.values() for _, row in rows})
+        existing = {row[0] for row in conn.execute(
+            "SELECT id FROM programs WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(program_ids),))}
+
+        checked = {}
+        for columns, rows in groups.items():
+            kept = []
+            for record, row in rows:
+                if row[id_column] in existing:
+                    kept.append(row)
+                elif spec.name != 'programs':
+                    rejects.append({'line': record.line, 'error': f"unknown program {row[id_column]!r}",
+                                    'record': _reject_text(record.values)})
+                elif any(column not in row for column in spec.insert_requires):
+                    rejects.append({'line': record.line, 'error': "new program without project_name",
+                                    'record': _reject_text(record.values)})
+                else:
+                    kept.append(row)
+                    existing.add(row[id_column])
+            if kept:
+                checked[columns] = kept
+        return checked
+
+
+def _reject_text(values: Any) -> str:
+    if isinstance(values, str):
+        return values.rstrip('\r\n')
+    return json.dumps(values)
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + 'Z'
+
+
+def import_status(db: WrapupDatabase) -> List[Dict[str, Any]]:
+    """Every file's import progress, most recently updated first."""
+    cursor = db.connection.execute("""
+        SELECT source, target, line, rows_read, rows_written, rows_rejected, started_at, updated_at, completed_at
+        FROM import_progress ORDER BY updated_at DESC
+    """)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+def print_result(result: ImportResult):
+    """Print one file's outcome and its first rejected rows."""
+    name = Path(result.source).name
+    if result.skipped:
+        print(f"⏭️  {name} was already imported into {result.target} (use --restart to import it again)")
+        return
+    print(f"✅ {name} -> {result.target}: {result.rows_read:,} rows read, {result.rows_written:,} written, "
+          f"{result.rows_rejected:,} rejected in {result.seconds:.1f}s ({result.rows_per_second:,.0f} rows/s)")
+    for reject in result.rejects:
+        print(f"   ❌ line {reject['line']}: {reject['error']}")
+    if result.rows_rejected > len(result.rejects):
+        print(f"   ... and {result.rows_rejected - len(result.rejects):,} more rejected rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Bulk Importer')
+    parser.add_argument('files', nargs='*', metavar='FILE', help='CSV or NDJSON (.ndjson, .jsonl) files to import, in order')
+    parser.add_argument('--db-path', required=True, help='Path to wrap-up manager database')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending schema migrations instead of refusing an out-of-date database')
+    parser.add_argument('--into', choices=list(TABLES), help='Table the files are imported into')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per transaction')
+    parser.add_argument('--rejects', metavar='FILE', help='Append rejected rows here as NDJSON')
+    parser.add_argument('--restart', action='store_true', help='Import from the start even if a file was imported before')
+    parser.add_argument('--status', action='store_true', help='List the progress of every imported file')
+    add_instrumentation_arguments(parser)
+
+    args = parser.parse_args()
+
+    if not args.files and not args.status:
+        parser.print_help()
+        return
+    if args.files and not args.into:
+        parser.error("--into is required when importing files")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    for path in args.files:
+        if not Path(path).is_file():
+            parser.error(f"file not found: {path}")
+
+    if not Path(args.db_path).is_file():
+        parser.error(f"database not found: {args.db_path}")
+
+    from migrations import SchemaOutOfDate, require_schema
+    db = get_database(args.db_path)
+    try:
+        require_schema(db, apply=args.migrate)
+    except SchemaOutOfDate as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    failed = False
+    with instrumented_run('bulk-importer', args):
+        if args.files:
+            rejects_out = open(args.rejects, 'a', encoding='utf-8') if args.rejects else None
+            try:
+                importer = BulkImporter(db, args.batch_size, rejects_out)
+                for path in args.files:
+                    print(f"📥 Importing {path} into {args.into}...")
+                    try:
+                        print_result(importer.import_file(path, args.into, restart=args.restart))
+                    except ValueError as e:
+                        print(f"❌ {e}")
+                        failed = True
+            finally:
+                if rejects_out is not None:
+                    rejects_out.close()
+
+        if args.status:
+            print(f"\n📋 IMPORT PROGRESS")
+            print("=" * 60)
+            for entry in import_status(db):
+                state = f"completed {entry['completed_at']}" if entry['completed_at'] else f"stopped after line {entry['line']:,}"
+                print(f"  {entry['source']} -> {entry['target']}: {entry['rows_read']:,} read, "
+                      f"{entry['rows_written']:,} written, {entry['rows_rejected']:,} rejected, {state}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
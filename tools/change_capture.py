@@ -0,0 +1,128 @@
+"""
+Change Capture for the Wrap-up Database
+=======================================
+Reads the trigger-maintained change log (see migrations.py, version 4).
+
+Every insert, update or delete on programs, payroll_reports or
+enrollment_docs appends a row to change_log, and program_changes keeps the
+latest change time per program. Consumers remember how far they have read
+in sync_cursor, so an incremental sync only touches programs whose rows
+actually changed. ChangeWatcher lets a resident process notice new
+commits cheaply and wait for a burst of writes to settle.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from wrapup_db import WrapupDatabase
+
+
+def latest_seq(conn: sqlite3.Connection) -> int:
+    """Return the sequence number of the newest change (0 if none)."""
+    row = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()
+    return row[0] or 0
+
+
+def get_cursor(conn: sqlite3.Connection, name: str):
+    """Return the last sequence number a consumer has processed, or None."""
+    row = conn.execute("SELECT last_seq FROM sync_cursor WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def changed_programs(conn: sqlite3.Connection, since_seq: int) -> Tuple[Set[str], int]:
+    """Return program ids changed after since_seq and the newest sequence number seen."""
+    rows = conn.execute("""
+        SELECT program_id, MAX(seq) FROM change_log
+        WHERE seq > ?
+        GROUP BY program_id
+    """, (since_seq,)).fetchall()
+
+    program_ids = {row[0] for row in rows}
+    newest = max((row[1] for row in rows), default=since_seq)
+    return program_ids, newest
+
+
+def last_changed_at(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Return the time each program (or any of its rows) last changed."""
+    return {
+        row[0]: row[1]
+        for row in conn.execute("SELECT program_id, changed_at FROM program_changes")
+    }
+
+
+def advance_cursor(db: WrapupDatabase, name: str, seq: int):
+    """Record that a consumer has processed every change up to seq, then prune."""
+    with db.transaction() as conn:
+        conn.execute("""
+            INSERT INTO sync_cursor (name, last_seq, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                last_seq = MAX(last_seq, excluded.last_seq),
+                updated_at = excluded.updated_at
+        """, (name, seq, datetime.utcnow().isoformat() + 'Z'))
+
+        # Every consumer has read past these rows; program_changes keeps the times
+        conn.execute("""
+            DELETE FROM change_log
+            WHERE seq <= (SELECT MIN(last_seq) FROM sync_cursor)
+        """)
+
+
+class ChangeWatcher:
+    """Polls PRAGMA data_version to detect commits made by other connections.
+
+    data_version only moves when another connection (in any process)
+    commits, so this connection's own writes - cursor updates, for
+    example - never wake the watcher. Unlike WAL file mtimes it is not
+    fooled by checkpoints or coarse timestamps, and one poll costs
+    microseconds.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, poll_interval: float = 0.1,
+                 debounce: float = 0.2, max_delay: float = 0.5):
+        self.conn = conn
+        self.poll_interval = poll_interval
+        self.debounce = debounce      # Quiet time that ends a burst of writes
+        self.max_delay = max_delay    # Never wait longer than this after the first change
+        self.version = self.data_version()
+
+    def data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _poll_timeout(self, until: Optional[datetime]) -> float:
+        if until is None:
+            return self.poll_interval
+        remaining = (until - datetime.now(timezone.utc)).total_seconds()
+        return max(0.0, min(self.poll_interval, remaining))
+
+    def wait_for_change(self, stop: threading.Event, until: Optional[datetime] = None) -> Optional[float]:
+        """Block until a burst of commits settles.
+
+        Returns the monotonic time the first change was seen, or None if
+        stop was set first or the wall-clock instant until (timezone-aware)
+        arrived. The last sleep before until is cut short so the caller
+        wakes at that instant, not at the next poll. The version is
+        recorded before returning, so commits that land while the caller
+        syncs trigger another round.
+        """
+        while not stop.wait(self._poll_timeout(until)):
+            version = self.data_version()
+            if version == self.version:
+                if until is not None and datetime.now(timezone.utc) >= until:
+                    return None
+                continue
+
+            first_seen = last_seen = time.monotonic()
+            while not stop.is_set():
+                self.version = version
+                now = time.monotonic()
+                if now - last_seen >= self.debounce or now - first_seen >= self.max_delay:
+                    return first_seen
+                stop.wait(min(self.poll_interval, self.debounce))
+                version = self.data_version()
+                if version != self.version:
+                    last_seen = time.monotonic()
+            return None
+        return None
@@ -6,32 +6,57 @@ Automated report generation for wrap-up program compliance tracking.
 
 Features:
 - Weekly compliance scorecards  
-- Deadline monitoring and alerts
-- Financial impact analysis
+- Deadline monitoring and alerts (only new or changed alerts listed by default)
+- Financial impact analysis, aggregated in SQLite with subtotals by type, status, quarter or state
+- Streaming JSON, NDJSON, CSV and HTML output in constant memory (--output, --out)
 - Integration with wrap-up manager backend
+- Per-stage timings and counters, --profile (cProfile + slowest SQL) and JSON/Prometheus run metrics
 
 Usage:
     python3 compliance-reporter.py --weekly-report
     python3 compliance-reporter.py --deadline-check
+    python3 compliance-reporter.py --deadline-check --all-alerts
     python3 compliance-reporter.py --financial-summary
+    python3 compliance-reporter.py --financial-summary --by program_type,state --top 10
+    python3 compliance-reporter.py --weekly-report --output csv --out weekly.csv
+    python3 compliance-reporter.py --financial-summary --by status --output html --out financial.html
+    python3 compliance-reporter.py --weekly-report --profile --metrics-dir /var/lib/node_exporter/textfile_collector
 """
 
 import json
-import sqlite3
 import argparse
-from datetime import datetime, timedelta
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any, Optional, Sequence
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from alert_engine import DEADLINE_RULES, AlertEngine, AlertLog, due_ordinal
+from instrumentation import add_arguments as add_instrumentation_arguments, instrumented_run, metrics
+from portfolio_snapshot import (EMPTY_STATS, NEXT_WINDOW_DUE_SQL, UPCOMING_DEADLINES_SQL, PortfolioSnapshot,
+                                compliance_score, iter_program_rows, load_program_stats)
+from migrations import SchemaOutOfDate, migrate, require_schema
+from report_renderer import FORMATS, Report, Rows, RowSpool, Section, collect, render, report_from_dict
+from rollup import DIMENSIONS, rollup, refresh_dimensions, rollup_rows, top_programs
+from wrapup_db import get_database
 
 class ComplianceReporter:
     
-    def __init__(self, db_path: str = None):
-        """Initialize compliance reporter."""
+    def __init__(self, db_path: str = None, portfolio: Optional[PortfolioSnapshot] = None,
+                 apply_migrations: bool = False):
+        """Initialize compliance reporter.
+        
+        portfolio, a PortfolioSnapshot of the same database, is shared by
+        every report instead of each querying the programs again. A
+        db_path that does not exist raises FileNotFoundError, and a
+        database behind the current schema raises SchemaOutOfDate unless
+        apply_migrations is set.
+        """
         if db_path is None:
             # Try to find wrap-up manager database
             possible_paths = [
@@ -49,223 +74,203 @@ class ComplianceReporter:
             if self.db_path is None:
                 self.db_path = "/tmp/wrapup_demo.db"
                 self._create_demo_data()
+        elif not Path(db_path).expanduser().exists():
+            raise FileNotFoundError(f"database not found: {db_path}")
         else:
             self.db_path = db_path
+        
+        self.db = get_database(self.db_path)
+        require_schema(self.db, apply=apply_migrations)
+        self.alert_engine = AlertEngine(DEADLINE_RULES)
+        self.last_alerts = []
+        self.next_window_entry = None
+        self.portfolio = portfolio
             
     def _create_demo_data(self):
         """Create demo data for testing."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        # Create tables
-        conn.executescript("""
-            CREATE TABLE IF NOT EXISTS programs (
-                id TEXT PRIMARY KEY,
-                project_name TEXT NOT NULL,
-                program_type TEXT DEFAULT 'OCIP',
-                enrollment_status TEXT DEFAULT 'pending',
-                bid_deduct_pct REAL DEFAULT 0,
-                contract_value REAL DEFAULT 0,
-                estimated_completion TEXT
-            );
+        db = get_database(self.db_path)
+        conn = db.connection
+        
+        # Create tables and indexes
+        migrate(db)
+        
+        with db.transaction():
+            # Insert demo data
+            demo_programs = [
+                ("WU-2026-001", "Riverside Development Phase II", "OCIP", "enrolled", 3.5, 2850000, "2026-08-15"),
+                ("WU-2026-002", "Metro Office Complex", "CCIP", "pending", 4.2, 1650000, "2026-06-30"),
+                ("WU-2026-003", "Industrial Park Expansion", "OCIP", "active", 3.8, 4200000, "2026-12-15")
+            ]
             
-            CREATE TABLE IF NOT EXISTS payroll_reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                program_id TEXT NOT NULL,
-                due_date TEXT NOT NULL,
-                status TEXT DEFAULT 'pending',
-                payroll_amount REAL
-            );
+            for program in demo_programs:
+                conn.execute("""
+                    INSERT OR REPLACE INTO programs 
+                    (id, project_name, program_type, enrollment_status, bid_deduct_pct, contract_value, estimated_completion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, program)
             
-            CREATE TABLE IF NOT EXISTS enrollment_docs (
-                program_id TEXT NOT NULL,
-                document_type TEXT NOT NULL,
-                status TEXT DEFAULT 'not_started'
-            );
-        """)
-        
-        # Insert demo data
-        demo_programs = [
-            ("WU-2026-001", "Riverside Development Phase II", "OCIP", "enrolled", 3.5, 2850000, "2026-08-15"),
-            ("WU-2026-002", "Metro Office Complex", "CCIP", "pending", 4.2, 1650000, "2026-06-30"),
-            ("WU-2026-003", "Industrial Park Expansion", "OCIP", "active", 3.8, 4200000, "2026-12-15")
-        ]
-        
-        for program in demo_programs:
-            conn.execute("""
-                INSERT OR REPLACE INTO programs 
-                (id, project_name, program_type, enrollment_status, bid_deduct_pct, contract_value, estimated_completion)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, program)
-        
-        # Demo payroll reports
-        payroll_data = [
-            ("WU-2026-001", "2026-03-15", "pending", 125000),
-            ("WU-2026-001", "2026-04-15", "pending", 0),
-            ("WU-2026-002", "2026-03-01", "overdue", 85000),
-            ("WU-2026-003", "2026-03-10", "submitted", 180000)
-        ]
-        
-        for payroll in payroll_data:
-            conn.execute("""
-                INSERT OR REPLACE INTO payroll_reports (program_id, due_date, status, payroll_amount)
-                VALUES (?, ?, ?, ?)
-            """, payroll)
-        
-        # Demo enrollment docs
-        doc_data = [
-            ("WU-2026-001", "enrollment_form", "completed"),
-            ("WU-2026-001", "insurance_verification", "completed"), 
-            ("WU-2026-001", "loss_history", "completed"),
-            ("WU-2026-002", "enrollment_form", "pending"),
-            ("WU-2026-002", "insurance_verification", "not_started"),
-            ("WU-2026-003", "enrollment_form", "completed"),
-            ("WU-2026-003", "waiver_request", "pending")
-        ]
-        
-        for doc in doc_data:
-            conn.execute("""
-                INSERT OR REPLACE INTO enrollment_docs (program_id, document_type, status)
-                VALUES (?, ?, ?)
-            """, doc)
+            # Demo payroll reports
+            payroll_data = [
+                ("WU-2026-001", "2026-03-15", "pending", 125000),
+                ("WU-2026-001", "2026-04-15", "pending", 0),
+                ("WU-2026-002", "2026-03-01", "overdue", 85000),
+                ("WU-2026-003", "2026-03-10", "submitted", 180000)
+            ]
+            
+            for payroll in payroll_data:
+                conn.execute("""
+                    INSERT OR REPLACE INTO payroll_reports (program_id, due_date, status, payroll_amount)
+                    VALUES (?, ?, ?, ?)
+                """, payroll)
+            
+            # Demo enrollment docs
+            doc_data = [
+                ("WU-2026-001", "enrollment_form", "completed"),
+                ("WU-2026-001", "insurance_verification", "completed"), 
+                ("WU-2026-001", "loss_history", "completed"),
+                ("WU-2026-002", "enrollment_form", "pending"),
+                ("WU-2026-002", "insurance_verification", "not_started"),
+                ("WU-2026-003", "enrollment_form", "completed"),
+                ("WU-2026-003", "waiver_request", "pending")
+            ]
+            
+            for doc in doc_data:
+                conn.execute("""
+                    INSERT OR REPLACE INTO enrollment_docs (program_id, document_type, status)
+                    VALUES (?, ?, ?)
+                """, doc)
         
-        conn.commit()
-        conn.close()
         print(f"Demo database created at {self.db_path}")
 
+    @metrics.timed("report.load_programs")
     def get_programs(self) -> List[Dict]:
         """Get all programs with current status."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        if self.portfolio is not None:
+            result = [self._program_dict(program, stats) for program, stats, _ in self.portfolio.rows()]
+            metrics.count("report.programs_loaded", len(result))
+            return result
         
-        programs = conn.execute("""
-            SELECT * FROM programs ORDER BY project_name
-        """).fetchall()
+        with self.db.snapshot() as conn, metrics.span("report.query"):
+            programs = conn.execute("""
+                SELECT * FROM programs ORDER BY project_name
+            """).fetchall()
+            stats_by_program = load_program_stats(conn)
         
-        result = []
-        for program in programs:
-            program_dict = dict(program)
-            
-            # Calculate compliance score
-            program_dict['compliance_score'] = self._calculate_compliance_score(program['id'])
-            
-            # Get next deadline
-            program_dict['next_deadline'] = self._get_next_deadline(program['id'])
-            
-            # Calculate estimated savings
-            savings = (program['contract_value'] or 0) * (program['bid_deduct_pct'] or 0) / 100
-            program_dict['estimated_savings'] = savings
-            
-            result.append(program_dict)
+        result = [self._program_dict(program, stats_by_program.get(program['id'], EMPTY_STATS))
+                  for program in programs]
         
-        conn.close()
+        metrics.count("report.programs_loaded", len(result))
         return result
 
-    def _calculate_compliance_score(self, program_id: str) -> int:
-        """Calculate compliance score for a program."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def _program_dict(self, program, stats) -> Dict:
+        """A program row with its compliance score, next deadline and estimated savings."""
+        program_dict = dict(program)
         
-        # Check enrollment docs
-        total_docs = conn.execute("""
-            SELECT COUNT(*) as total FROM enrollment_docs WHERE program_id = ?
-        """, (program_id,)).fetchone()['total']
+        # Calculate compliance score
+        program_dict['compliance_score'] = compliance_score(stats, include_past_due=False)
         
-        completed_docs = conn.execute("""
-            SELECT COUNT(*) as completed FROM enrollment_docs 
-            WHERE program_id = ? AND status = 'completed'
-        """, (program_id,)).fetchone()['completed']
+        # Get next deadline
+        program_dict['next_deadline'] = stats.next_deadline
         
-        # Check payroll reports
-        overdue_reports = conn.execute("""
-            SELECT COUNT(*) as overdue FROM payroll_reports 
-            WHERE program_id = ? AND status = 'overdue'
-        """, (program_id,)).fetchone()['overdue']
+        # Calculate estimated savings
+        savings = (program['contract_value'] or 0) * (program['bid_deduct_pct'] or 0) / 100
+        program_dict['estimated_savings'] = savings
         
-        conn.close()
-        
-        # Calculate score
-        if total_docs == 0:
-            doc_score = 50  # No docs required yet
-        else:
-            doc_score = (completed_docs / total_docs) * 70
-        
-        penalty = overdue_reports * 15  # 15 points per overdue report
-        score = max(0, min(100, doc_score + 30 - penalty))
+        return program_dict
+
+    def _calculate_compliance_score(self, program_id: str) -> int:
+        """Calculate compliance score for a program."""
+        stats = load_program_stats(self.db.connection, program_id).get(program_id, EMPTY_STATS)
         
-        return int(score)
+        return compliance_score(stats, include_past_due=False)
 
     def _get_next_deadline(self, program_id: str) -> str:
         """Get next upcoming deadline for a program."""
-        conn = sqlite3.connect(self.db_path)
-        
-        deadline = conn.execute("""
-            SELECT due_date FROM payroll_reports 
-            WHERE program_id = ? AND status IN ('pending', 'overdue') 
-            ORDER BY due_date LIMIT 1
-        """, (program_id,)).fetchone()
-        
-        conn.close()
+        stats = load_program_stats(self.db.connection, program_id).get(program_id, EMPTY_STATS)
         
-        if deadline:
-            return deadline[0]
-        return ""
+        return stats.next_deadline
 
+    @metrics.timed("report.weekly")
     def generate_weekly_report(self) -> Dict[str, Any]:
         """Generate weekly compliance report."""
-        programs = self.get_programs()
-        
-        # Calculate summary metrics
-        total_programs = len(programs)
-        active_programs = len([p for p in programs if p['enrollment_status'] in ['enrolled', 'active']])
-        avg_compliance = sum(p['compliance_score'] for p in programs) / total_programs if total_programs > 0 else 0
-        total_savings = sum(p['estimated_savings'] for p in programs)
-        
-        # Find issues
-        compliance_issues = [p for p in programs if p['compliance_score'] < 70]
-        upcoming_deadlines = []
-        
-        for program in programs:
-            if program['next_deadline']:
-                deadline_date = datetime.strptime(program['next_deadline'], '%Y-%m-%d')
-                days_until = (deadline_date - datetime.now()).days
-                if days_until <= 7:
-                    upcoming_deadlines.append({
-                        'program': program['project_name'],
-                        'deadline': program['next_deadline'],
-                        'days_until': days_until
-                    })
+        return collect(self.weekly_report())
+
+    def weekly_report(self) -> Report:
+        """The weekly compliance report as a stream of sections (see report_renderer.py).
+        
+        Programs are scored as they are read. Compliance issues and upcoming
+        deadlines wait in spools on disk, and the summary and recommendations,
+        which need every program, come after them, so no list of programs is
+        held in memory.
+        """
+        return Report('weekly_report', 'Weekly Compliance Report', self._weekly_sections())
+
+    def _weekly_sections(self) -> Iterator[Section]:
+        now = datetime.now()
+        totals = {'programs': 0, 'active': 0, 'compliance': 0, 'savings': 0, 'urgent': 0, 'high_value_issues': 0}
         
-        return {
-            'report_date': datetime.now().strftime('%Y-%m-%d'),
-            'summary': {
-                'total_programs': total_programs,
-                'active_programs': active_programs,
-                'avg_compliance_score': round(avg_compliance, 1),
-                'total_estimated_savings': total_savings
-            },
-            'programs': programs,
-            'compliance_issues': compliance_issues,
-            'upcoming_deadlines': upcoming_deadlines,
-            'recommendations': self._generate_recommendations(compliance_issues, upcoming_deadlines)
-        }
+        with self.db.snapshot() as conn, RowSpool() as issues, RowSpool() as deadlines:
+            rows = self.portfolio.rows() if self.portfolio is not None else iter_program_rows(conn)
+            
+            def programs():
+                for program, stats, _ in rows:
+                    program_dict = self._program_dict(program, stats)
+                    totals['programs'] += 1
+                    if program_dict['enrollment_status'] in ['enrolled', 'active']:
+                        totals['active'] += 1
+                    totals['compliance'] += program_dict['compliance_score']
+                    totals['savings'] += program_dict['estimated_savings']
+                    
+                    # Find issues
+                    if program_dict['compliance_score'] < 70:
+                        issues.write(program_dict)
+                        if program_dict.get('contract_value', 0) > 2000000:
+                            totals['high_value_issues'] += 1
+                    
+                    if program_dict['next_deadline']:
+                        deadline_date = datetime.strptime(program_dict['next_deadline'], '%Y-%m-%d')
+                        days_until = (deadline_date - now).days
+                        if days_until <= 7:
+                            deadlines.write({
+                                'program': program_dict['project_name'],
+                                'deadline': program_dict['next_deadline'],
+                                'days_until': days_until
+                            })
+                            if days_until <= 3:
+                                totals['urgent'] += 1
+                    
+                    yield program_dict
+                metrics.count("report.programs_loaded", totals['programs'])
+            
+            def summary():
+                total_programs = totals['programs']
+                avg_compliance = totals['compliance'] / total_programs if total_programs > 0 else 0
+                return {
+                    'total_programs': total_programs,
+                    'active_programs': totals['active'],
+                    'avg_compliance_score': round(avg_compliance, 1),
+                    'total_estimated_savings': totals['savings']
+                }
+            
+            yield Section('report_date', now.strftime('%Y-%m-%d'))
+            yield Section('programs', Rows(programs()))
+            yield Section('compliance_issues', lambda: Rows(issues.rows()))
+            yield Section('upcoming_deadlines', lambda: Rows(deadlines.rows()))
+            yield Section('summary', summary)
+            yield Section('recommendations', lambda: self._generate_recommendations(
+                issues.count, totals['urgent'], totals['high_value_issues']))
 
-    def _generate_recommendations(self, issues: List[Dict], deadlines: List[Dict]) -> List[str]:
+    def _generate_recommendations(self, issues: int, urgent_deadlines: int, high_value_issues: int) -> List[str]:
         """Generate actionable recommendations."""
         recommendations = []
         
         if issues:
-            recommendations.append(f"🔴 {len(issues)} programs have compliance scores below 70% - prioritize document completion")
+            recommendations.append(f"🔴 {issues} programs have compliance scores below 70% - prioritize document completion")
         
-        if deadlines:
-            urgent = [d for d in deadlines if d['days_until'] <= 3]
-            if urgent:
-                recommendations.append(f"⏰ {len(urgent)} payroll reports due within 3 days - immediate action required")
+        if urgent_deadlines:
+            recommendations.append(f"⏰ {urgent_deadlines} payroll reports due within 3 days - immediate action required")
         
-        high_value_low_compliance = [
-            p for p in issues if p.get('contract_value', 0) > 2000000
-        ]
-        if high_value_low_compliance:
+        if high_value_issues:
             recommendations.append("💰 High-value contracts have compliance issues - potential savings at risk")
         
         if not recommendations:
@@ -273,51 +278,28 @@ class ComplianceReporter:
         
         return recommendations
 
+    @metrics.timed("report.deadlines")
     def check_deadlines(self) -> Dict[str, Any]:
         """Check for upcoming deadlines and generate alerts."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
         today = datetime.now().date()
-        alerts = []
         
         # Check payroll deadlines
-        upcoming = conn.execute("""
-            SELECT pr.*, p.project_name, p.program_type 
-            FROM payroll_reports pr
-            JOIN programs p ON pr.program_id = p.id
-            WHERE pr.status IN ('pending', 'overdue')
-            AND date(pr.due_date) BETWEEN date('now') AND date('now', '+14 days')
-            ORDER BY pr.due_date
-        """).fetchall()
+        if self.portfolio is not None:
+            upcoming = self.portfolio.upcoming_deadlines()
+            later_due = self.portfolio.next_window_due()
+        else:
+            with self.db.snapshot() as conn, metrics.span("report.deadlines_query"):
+                upcoming = [dict(row) for row in conn.execute(UPCOMING_DEADLINES_SQL)]
+                later_due = conn.execute(NEXT_WINDOW_DUE_SQL).fetchone()[0]
         
-        for report in upcoming:
-            due_date = datetime.strptime(report['due_date'], '%Y-%m-%d').date()
-            days_until = (due_date - today).days
-            
-            if days_until < 0:
-                priority = 'critical'
-                message = f"OVERDUE: {report['project_name']} payroll report was due {abs(days_until)} days ago"
-            elif days_until <= 2:
-                priority = 'high'
-                message = f"URGENT: {report['project_name']} payroll report due in {days_until} day(s)"
-            elif days_until <= 7:
-                priority = 'medium'
-                message = f"Upcoming: {report['project_name']} payroll report due in {days_until} days"
-            else:
-                priority = 'low'
-                message = f"Scheduled: {report['project_name']} payroll report due in {days_until} days"
-            
-            alerts.append({
-                'type': 'deadline',
-                'priority': priority,
-                'message': message,
-                'program_id': report['program_id'],
-                'due_date': report['due_date'],
-                'days_until': days_until
-            })
+        # The first report past the 14-day window gets its alert 14 days before it is due
+        later = due_ordinal(later_due)
+        self.next_window_entry = date.fromordinal(later - 14) if later is not None else None
         
-        conn.close()
+        with metrics.span("report.alerts"):
+            self.last_alerts = self.alert_engine.evaluate(upcoming, today)
+            alerts = [alert.as_dict() for alert in self.last_alerts]
+        metrics.count("report.alerts", len(alerts))
         
         return {
             'check_date': today.strftime('%Y-%m-%d'),
@@ -330,58 +312,181 @@ class ComplianceReporter:
             }
         }
 
-    def financial_summary(self) -> Dict[str, Any]:
-        """Generate financial impact summary."""
-        programs = self.get_programs()
-        
-        total_contract_value = sum(p.get('contract_value', 0) for p in programs)
-        total_estimated_savings = sum(p['estimated_savings'] for p in programs)
-        
-        # Group by program type
-        by_type = {}
-        for program in programs:
-            ptype = program.get('program_type', 'Unknown')
-            if ptype not in by_type:
-                by_type[ptype] = {
-                    'count': 0,
-                    'contract_value': 0,
-                    'estimated_savings': 0,
-                    'avg_bid_deduct': 0
-                }
-            
-            by_type[ptype]['count'] += 1
-            by_type[ptype]['contract_value'] += program.get('contract_value', 0)
-            by_type[ptype]['estimated_savings'] += program['estimated_savings']
-        
-        # Calculate averages
-        for ptype in by_type:
-            if by_type[ptype]['count'] > 0:
-                total_deduct = sum(p.get('bid_deduct_pct', 0) for p in programs if p.get('program_type') == ptype)
-                by_type[ptype]['avg_bid_deduct'] = total_deduct / by_type[ptype]['count']
-        
-        return {
+    def next_alert_change(self) -> Optional[date]:
+        """The next date on which check_deadlines() would give different alerts, or None.
+
+        That is when an alert in the window escalates, or when the first
+        report beyond it enters the window, whichever comes first.
+        """
+        changes = [day for day in (self.alert_engine.next_transition(), self.next_window_entry) if day is not None]
+        return min(changes, default=None)
+
+    def deadline_report(self) -> Report:
+        """check_deadlines() as a report for report_renderer.py."""
+        return report_from_dict('deadline_check', 'Deadline Check', self.check_deadlines(), rows=['alerts'])
+
+    def record_alerts(self, alerts):
+        """Remember alerts across runs and return only the new or changed ones."""
+        return AlertLog(self.db, DEADLINE_RULES.name).record(alerts)
+
+    @metrics.timed("report.financial")
+    def financial_summary(self, dimensions: Optional[Sequence[str]] = None, top: int = 5) -> Dict[str, Any]:
+        """Generate financial impact summary.
+
+        Totals and the program type breakdown are aggregated in SQLite
+        (rollup.py) and only the top programs by savings are loaded in
+        full. With dimensions, 'rollup' adds nested subtotals by each
+        dimension in turn.
+        """
+        dimensions = list(dimensions or [])
+        if 'state' in dimensions:
+            refresh_dimensions(self.db)
+        
+        with self.db.snapshot() as conn, metrics.span("report.rollup"):
+            # Program types in first-appearance order, as the dashboard lists programs
+            by_type = rollup(conn, ['program_type'], order='dashboard')
+            breakdown = rollup(conn, dimensions) if dimensions else None
+            top_ids = top_programs(conn, top)
+            top_dicts = []
+            for program_id in top_ids:
+                shared = self.portfolio.program(program_id) if self.portfolio and self.portfolio.loaded else None
+                if shared is None:
+                    # No portfolio loaded yet, or the program was added after it was read
+                    program = conn.execute("SELECT * FROM programs WHERE id = ?", (program_id,)).fetchone()
+                    shared = program, load_program_stats(conn, program_id).get(program_id, EMPTY_STATS)
+                top_dicts.append(self._program_dict(*shared))
+        
+        summary = {
             'report_date': datetime.now().strftime('%Y-%m-%d'),
             'totals': {
-                'total_programs': len(programs),
-                'total_contract_value': total_contract_value,
-                'total_estimated_savings': total_estimated_savings,
-                'savings_percentage': (total_estimated_savings / total_contract_value * 100) if total_contract_value > 0 else 0
+                'total_programs': by_type.programs,
+                'total_contract_value': by_type.contract_value,
+                'total_estimated_savings': by_type.estimated_savings,
+                'savings_percentage': by_type.savings_percentage
             },
-            'by_program_type': by_type,
-            'top_programs': sorted(
-                programs, 
-                key=lambda x: x['estimated_savings'], 
-                reverse=True
-            )[:5]
+            'by_program_type': {group.value: group.measures() for group in by_type.groups},
+            'top_programs': top_dicts
         }
+        if breakdown is not None:
+            summary['rollup'] = breakdown.as_dict()
+        return summary
+
+def financial_report(reporter: ComplianceReporter, dimensions: Sequence[str], top: int) -> Report:
+    """financial_summary() as a report for report_renderer.py; the rollup flattens to one row per subtotal."""
+    return report_from_dict(
+        'financial_summary', 'Financial Summary', reporter.financial_summary(dimensions, top),
+        rows=['top_programs'], keys={'by_program_type': 'program_type'},
+        flat={'rollup': lambda tree: Rows(rollup_rows(tree, dimensions))})
+
+
+def print_rollup(group: Dict[str, Any], depth: int = 0):
+    """Print nested rollup subtotals, one indented line per group."""
+    for child in group.get('groups', []):
+        label = next(iter(child.values()))
+        print(f"{'  ' * (depth + 1)}{label if label is not None else 'Unknown'}: {child['count']} programs, "
+              f"${child['contract_value']:,.0f} contract, ${child['estimated_savings']:,.0f} savings "
+              f"({child['avg_bid_deduct']:.1f}% avg deduct)")
+        print_rollup(child, depth + 1)
+
+
+def print_weekly_report(report: Dict[str, Any]):
+    """Print a generate_weekly_report() result to the console."""
+    print("\n📊 WEEKLY COMPLIANCE REPORT")
+    print("=" * 50)
+    print(f"Report Date: {report['report_date']}")
+    print(f"Total Programs: {report['summary']['total_programs']}")
+    print(f"Active Programs: {report['summary']['active_programs']}")
+    print(f"Average Compliance: {report['summary']['avg_compliance_score']}%")
+    print(f"Total Estimated Savings: ${report['summary']['total_estimated_savings']:,.0f}")
+    
+    if report['compliance_issues']:
+        print(f"\n⚠️  COMPLIANCE ISSUES ({len(report['compliance_issues'])} programs)")
+        for issue in report['compliance_issues']:
+            print(f"  • {issue['project_name']}: {issue['compliance_score']}%")
+    
+    if report['upcoming_deadlines']:
+        print(f"\n⏰ UPCOMING DEADLINES ({len(report['upcoming_deadlines'])} reports)")
+        for deadline in report['upcoming_deadlines']:
+            print(f"  • {deadline['program']} due in {deadline['days_until']} days ({deadline['deadline']})")
+    
+    print("\n💡 RECOMMENDATIONS:")
+    for rec in report['recommendations']:
+        print(f"  • {rec}")
+
+
+def print_deadline_check(reporter: ComplianceReporter, all_alerts: bool = False):
+    """Run the deadline check, remember its alerts and print the new or changed ones (every one with all_alerts)."""
+    alerts = reporter.check_deadlines()
+    print(f"\n⏰ DEADLINE CHECK - {alerts['check_date']}")
+    print("=" * 40)
+    print(f"Total Alerts: {alerts['summary']['total_alerts']}")
+    print(f"Critical: {alerts['summary']['critical']} | High: {alerts['summary']['high']} | Medium: {alerts['summary']['medium']}")
+    
+    changes = reporter.record_alerts(reporter.last_alerts)
+    print(f"New: {changes.new} | Changed: {changes.changed} | Unchanged: {changes.unchanged} | Resolved: {len(changes.resolved)}")
+    
+    shown = reporter.last_alerts if all_alerts else changes.emitted
+    if shown:
+        print("\nALERT DETAILS:" if all_alerts else "\nNEW OR CHANGED ALERTS:")
+        for alert in shown:
+            priority_icon = {'critical': '🔴', 'high': '🟡', 'medium': '🟠', 'low': '🟢'}
+            print(f"  {priority_icon.get(alert.priority, '•')} {alert.message}")
+    elif alerts['alerts']:
+        print("\n✅ No new or changed alerts since the last check")
+    else:
+        print("\n✅ No upcoming deadlines within the next 14 days")
+    
+    next_change = reporter.next_alert_change()
+    if next_change:
+        print(f"\nNext alert change: {next_change.isoformat()}")
+
+
+def print_financial_summary(summary: Dict[str, Any], dimensions: Sequence[str], top: int):
+    """Print a financial_summary() result to the console."""
+    print(f"\n💰 FINANCIAL SUMMARY - {summary['report_date']}")
+    print("=" * 45)
+    totals = summary['totals']
+    print(f"Total Contract Value: ${totals['total_contract_value']:,.0f}")
+    print(f"Total Estimated Savings: ${totals['total_estimated_savings']:,.0f}")
+    print(f"Overall Savings Rate: {totals['savings_percentage']:.1f}%")
+    
+    print("\nBY PROGRAM TYPE:")
+    for ptype, data in summary['by_program_type'].items():
+        print(f"  {ptype}: {data['count']} programs, ${data['estimated_savings']:,.0f} savings ({data['avg_bid_deduct']:.1f}% avg deduct)")
+    
+    print(f"\nTOP {top} PROGRAMS BY SAVINGS:")
+    for i, program in enumerate(summary['top_programs'], 1):
+        print(f"  {i}. {program['project_name']}: ${program['estimated_savings']:,.0f}")
+    
+    if 'rollup' in summary:
+        print(f"\nBY {' / '.join(dimensions).upper().replace('_', ' ')}:")
+        print_rollup(summary['rollup'])
+
+
+def open_reporter(args) -> ComplianceReporter:
+    """The reporter for the CLI's --db-path; exits with a message when it is missing or out of date."""
+    try:
+        return ComplianceReporter(args.db_path, apply_migrations=args.migrate)
+    except (FileNotFoundError, SchemaOutOfDate) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
 
 def main():
     parser = argparse.ArgumentParser(description='OCIP/CCIP Compliance Reporter')
     parser.add_argument('--weekly-report', action='store_true', help='Generate weekly compliance report')
     parser.add_argument('--deadline-check', action='store_true', help='Check upcoming deadlines')
+    parser.add_argument('--all-alerts', action='store_true', help='With --deadline-check, list every alert, not just new or changed ones')
     parser.add_argument('--financial-summary', action='store_true', help='Generate financial summary')
-    parser.add_argument('--output', default='console', choices=['console', 'json', 'html'], help='Output format')
+    parser.add_argument('--by', help='With --financial-summary, subtotal by these dimensions, outermost first '
+                                     f"(comma-separated: {', '.join(DIMENSIONS)})")
+    parser.add_argument('--top', type=int, default=5, help='With --financial-summary, how many top programs by savings to list')
+    parser.add_argument('--output', default='console', choices=['console'] + FORMATS,
+                        help='Output format; anything but console streams one report to stdout or --out')
+    parser.add_argument('--out', metavar='FILE', help='With --output, write the report here instead of stdout')
     parser.add_argument('--db-path', help='Path to wrap-up manager database')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending schema migrations instead of refusing an out-of-date database')
+    add_instrumentation_arguments(parser)
     
     args = parser.parse_args()
     
@@ -389,63 +494,49 @@ def main():
         parser.print_help()
         return
     
-    reporter = ComplianceReporter(args.db_path)
+    dimensions = [name.strip() for name in args.by.split(',') if name.strip()] if args.by else []
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        parser.error(f"unknown --by dimensions: {', '.join(unknown)} (choose from {', '.join(DIMENSIONS)})")
     
-    if args.weekly_report:
-        report = reporter.generate_weekly_report()
-        print("\n📊 WEEKLY COMPLIANCE REPORT")
-        print("=" * 50)
-        print(f"Report Date: {report['report_date']}")
-        print(f"Total Programs: {report['summary']['total_programs']}")
-        print(f"Active Programs: {report['summary']['active_programs']}")
-        print(f"Average Compliance: {report['summary']['avg_compliance_score']}%")
-        print(f"Total Estimated Savings: ${report['summary']['total_estimated_savings']:,.0f}")
-        
-        if report['compliance_issues']:
-            print(f"\n⚠️  COMPLIANCE ISSUES ({len(report['compliance_issues'])} programs)")
-            for issue in report['compliance_issues']:
-                print(f"  • {issue['project_name']}: {issue['compliance_score']}%")
-        
-        if report['upcoming_deadlines']:
-            print(f"\n⏰ UPCOMING DEADLINES ({len(report['upcoming_deadlines'])} reports)")
-            for deadline in report['upcoming_deadlines']:
-                print(f"  • {deadline['program']} due in {deadline['days_until']} days ({deadline['deadline']})")
-        
-        print("\n💡 RECOMMENDATIONS:")
-        for rec in report['recommendations']:
-            print(f"  • {rec}")
+    if args.output != 'console':
+        if sum([args.weekly_report, args.deadline_check, args.financial_summary]) > 1:
+            parser.error(f"--output {args.output} renders one report at a time")
+        
+        # Status, profile and metrics messages go to stderr; stdout carries only the report
+        report_out = sys.stdout
+        with redirect_stdout(sys.stderr), instrumented_run('compliance-reporter', args):
+            reporter = open_reporter(args)
+            if args.weekly_report:
+                report = reporter.weekly_report()
+            elif args.deadline_check:
+                report = reporter.deadline_report()
+            else:
+                report = financial_report(reporter, dimensions, args.top)
+            
+            with metrics.span("report.render"):
+                if args.out:
+                    with open(args.out, 'w', encoding='utf-8', newline='') as out:
+                        render(report, args.output, out)
+                    print(f"✅ {report.title} written to {args.out}")
+                else:
+                    render(report, args.output, report_out)
+        return
     
-    if args.deadline_check:
-        alerts = reporter.check_deadlines()
-        print(f"\n⏰ DEADLINE CHECK - {alerts['check_date']}")
-        print("=" * 40)
-        print(f"Total Alerts: {alerts['summary']['total_alerts']}")
-        print(f"Critical: {alerts['summary']['critical']} | High: {alerts['summary']['high']} | Medium: {alerts['summary']['medium']}")
+    with instrumented_run('compliance-reporter', args):
+        reporter = open_reporter(args)
+        if args.weekly_report and (args.deadline_check or args.financial_summary):
+            # The reports of this run share one read of the portfolio
+            reporter.portfolio = PortfolioSnapshot(reporter.db)
         
-        if alerts['alerts']:
-            print("\nALERT DETAILS:")
-            for alert in alerts['alerts']:
-                priority_icon = {'critical': '🔴', 'high': '🟡', 'medium': '🟠', 'low': '🟢'}
-                print(f"  {priority_icon.get(alert['priority'], '•')} {alert['message']}")
-        else:
-            print("\n✅ No upcoming deadlines within the next 14 days")
-    
-    if args.financial_summary:
-        summary = reporter.financial_summary()
-        print(f"\n💰 FINANCIAL SUMMARY - {summary['report_date']}")
-        print("=" * 45)
-        totals = summary['totals']
-        print(f"Total Contract Value: ${totals['total_contract_value']:,.0f}")
-        print(f"Total Estimated Savings: ${totals['total_estimated_savings']:,.0f}")
-        print(f"Overall Savings Rate: {totals['savings_percentage']:.1f}%")
+        if args.weekly_report:
+            print_weekly_report(reporter.generate_weekly_report())
         
-        print("\nBY PROGRAM TYPE:")
-        for ptype, data in summary['by_program_type'].items():
-            print(f"  {ptype}: {data['count']} programs, ${data['estimated_savings']:,.0f} savings ({data['avg_bid_deduct']:.1f}% avg deduct)")
+        if args.deadline_check:
+            print_deadline_check(reporter, args.all_alerts)
         
-        print(f"\nTOP 5 PROGRAMS BY SAVINGS:")
-        for i, program in enumerate(summary['top_programs'][:5], 1):
-            print(f"  {i}. {program['project_name']}: ${program['estimated_savings']:,.0f}")
+        if args.financial_summary:
+            print_financial_summary(reporter.financial_summary(dimensions, args.top), dimensions, args.top)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -6,34 +6,87 @@ Syncs data between wrap-up manager database and web portal JSON files.
 
 Features:
 - Real-time dashboard data updates
-- Automatic alert generation
+- Automatic alert generation from the shared alert rules, reporting only new or changed alerts
 - Status synchronization
 - Compliance score calculation
+- Incremental sync of changed programs only
+- Atomic, precompressed JSON publishing
+- Paged dashboard index sharded by status and compliance band
+- Streaming full sync with flat memory use
+- Parallel program detail generation with per-worker read-only connections
+- Watch mode that resyncs incrementally within a second of a database change
+- Score cache that rebuilds a program when its data changes or a pending report falls past due
+- Per-stage timings and counters, --profile (cProfile + slowest SQL) and JSON/Prometheus run metrics
+- Fan-out sync of several regional databases in a process pool, merged into one dashboard
+- Daily compliance history per program, with portfolio trends published to api/trends.json
 
 Usage:
     python3 data-sync.py --sync-dashboard
     python3 data-sync.py --generate-alerts
+    python3 data-sync.py --generate-alerts --all-alerts
     python3 data-sync.py --full-sync
+    python3 data-sync.py --full-sync --stream
+    python3 data-sync.py --full-sync --workers 4
+    python3 data-sync.py --benchmark-workers 1,2,4,8
+    python3 data-sync.py --incremental
+    python3 data-sync.py --incremental --no-history
+    python3 data-sync.py --watch
+    python3 data-sync.py --full-sync --profile
+    python3 data-sync.py --incremental --metrics-dir /var/lib/node_exporter/textfile_collector
+    python3 data-sync.py --full-sync --sources '/data/regions/*/wrapup.db'
+    python3 data-sync.py --sync-dashboard --sources west=/data/west.db east=/data/east.db --processes 2
 """
 
 import json
-import sqlite3
+import os
 import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
+import signal
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.append(str(Path(__file__).parent))
+
+from portfolio_snapshot import (EMPTY_STATS, PortfolioSnapshot, compliance_score, iter_program_rows,
+                                load_program_stats, programs_past_due_since)
+from alert_engine import DASHBOARD_RULES, AlertEngine, AlertLog
+from instrumentation import add_arguments as add_instrumentation_arguments, instrumented_run, metrics
+from change_capture import ChangeWatcher, advance_cursor, changed_programs, get_cursor, last_changed_at, latest_seq
+from migrations import SchemaOutOfDate, migrate, require_schema
+from multi_source import SourceResult, merge_programs, namespace_id, namespace_program, resolve_sources
+from publisher import MANIFEST_NAME, JsonArray, JsonPublisher
+from score_cache import ScoreCache, next_local_midnight, score_boundary
+from snapshot_history import HistoryStore, history_row
+from sync_pipeline import DashboardPager, SummaryAccumulator
+from wrapup_db import WrapupDatabase, get_database
+
+SYNC_CURSOR = "data-sync"
 
 class DataSync:
     
-    def __init__(self, web_root: str = None, db_path: str = None):
-        """Initialize data sync."""
-        self.web_root = Path(web_root) if web_root else Path(__file__).parent.parent
-        self.api_dir = self.web_root / "api"
-        self.api_dir.mkdir(exist_ok=True)
+    def __init__(self, web_root: str = None, db_path: str = None, minify: bool = False, publish_stats: bool = False,
+                 workers: int = 1, history: bool = True, portfolio=None, apply_migrations: bool = False):
+        """Initialize data sync.
+        
+        portfolio, a PortfolioSnapshot of the same database, supplies the
+        full program list when several outputs of one run share it. A
+        db_path that does not exist raises FileNotFoundError, and a
+        database behind the current schema raises SchemaOutOfDate unless
+        apply_migrations is set.
+        """
+        self._init_publishing(web_root, minify, publish_stats)
+        self.workers = max(1, workers)
+        self.score_cache = ScoreCache()
         
         # Find wrap-up manager database
-        if db_path and Path(db_path).exists():
+        if db_path and Path(db_path).expanduser().exists():
             self.db_path = db_path
+        elif db_path:
+            raise FileNotFoundError(f"database not found: {db_path}")
         else:
             possible_paths = [
                 "/workspace/output/wrapup.db",
@@ -50,305 +103,248 @@ class DataSync:
             if self.db_path is None:
                 print("⚠️  Wrap-up manager database not found. Using demo data.")
                 self._create_demo_db()
+        
+        self.db = get_database(self.db_path)
+        require_schema(self.db, apply=apply_migrations)
+        self.portfolio = portfolio
+        self.history = HistoryStore(self.db) if history else None
+
+    def _init_publishing(self, web_root, minify, publish_stats):
+        """Set up the api/ directory, publisher and alert engine."""
+        self.web_root = Path(web_root) if web_root else Path(__file__).parent.parent
+        self.api_dir = self.web_root / "api"
+        self.api_dir.mkdir(exist_ok=True)
+        self.publisher = JsonPublisher(self.api_dir, minify=minify, track_files=publish_stats)
+        self.minify = minify
+        self.publish_stats = publish_stats
+        self.detail_errors = {}
+        self.alert_engine = AlertEngine(DASHBOARD_RULES)
+        self.last_alerts = None
+        self.history = None
+        self.portfolio = None
 
     def _create_demo_db(self):
         """Create demo database for testing."""
         self.db_path = "/tmp/wrapup_sync_demo.db"
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        # Create tables
-        conn.executescript("""
-            CREATE TABLE IF NOT EXISTS programs (
-                id TEXT PRIMARY KEY,
-                project_name TEXT NOT NULL,
-                project_address TEXT,
-                program_type TEXT DEFAULT 'OCIP',
-                enrollment_status TEXT DEFAULT 'pending',
-                bid_deduct_pct REAL DEFAULT 0,
-                contract_value REAL DEFAULT 0,
-                estimated_completion TEXT,
-                contact_name TEXT,
-                contact_email TEXT
-            );
-            
-            CREATE TABLE IF NOT EXISTS payroll_reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                program_id TEXT NOT NULL,
-                due_date TEXT NOT NULL,
-                status TEXT DEFAULT 'pending',
-                payroll_amount REAL,
-                submitted_date TEXT
-            );
+        db = get_database(self.db_path)
+        conn = db.connection
+        
+        # Create tables and indexes
+        migrate(db)
+        
+        with db.transaction():
+            # Insert realistic demo data
+            demo_programs = [
+                ("WU-2026-001", "Riverside Development Phase II", "1245 Riverside Dr, Dallas TX", "OCIP", "enrolled", 3.5, 2850000, "2026-08-15", "Sarah Chen", "s.chen@riverside.com"),
+                ("WU-2026-002", "Metro Office Complex", "890 Metro Blvd, Phoenix AZ", "CCIP", "pending", 4.2, 1650000, "2026-06-30", "Mike Rodriguez", "mrodriguez@metroffice.com"),
+                ("WU-2026-003", "Industrial Park Expansion", "3400 Industrial Way, Seattle WA", "OCIP", "active", 3.8, 4200000, "2026-12-15", "Jennifer Walsh", "j.walsh@indpark.com"),
+                ("WU-2026-004", "Healthcare Campus", "720 Medical Center Dr, Denver CO", "OCIP", "enrolled", 4.0, 3100000, "2026-10-30", "David Kumar", "d.kumar@healthcampus.org")
+            ]
             
-            CREATE TABLE IF NOT EXISTS enrollment_docs (
-                program_id TEXT NOT NULL,
-                document_type TEXT NOT NULL,
-                status TEXT DEFAULT 'not_started',
-                submitted_date TEXT
-            );
-        """)
-        
-        # Insert realistic demo data
-        demo_programs = [
-            ("WU-2026-001", "Riverside Development Phase II", "1245 Riverside Dr, Dallas TX", "OCIP", "enrolled", 3.5, 2850000, "2026-08-15", "Sarah Chen", "s.chen@riverside.com"),
-            ("WU-2026-002", "Metro Office Complex", "890 Metro Blvd, Phoenix AZ", "CCIP", "pending", 4.2, 1650000, "2026-06-30", "Mike Rodriguez", "mrodriguez@metroffice.com"),
-            ("WU-2026-003", "Industrial Park Expansion", "3400 Industrial Way, Seattle WA", "OCIP", "active", 3.8, 4200000, "2026-12-15", "Jennifer Walsh", "j.walsh@indpark.com"),
-            ("WU-2026-004", "Healthcare Campus", "720 Medical Center Dr, Denver CO", "OCIP", "enrolled", 4.0, 3100000, "2026-10-30", "David Kumar", "d.kumar@healthcampus.org")
-        ]
-        
-        for program in demo_programs:
-            conn.execute("""
-                INSERT OR REPLACE INTO programs 
-                (id, project_name, project_address, program_type, enrollment_status, bid_deduct_pct, contract_value, estimated_completion, contact_name, contact_email)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, program)
-        
-        # Demo payroll reports with realistic dates
-        payroll_data = [
-            ("WU-2026-001", "2026-03-15", "pending", 125000, None),
-            ("WU-2026-001", "2026-04-15", "pending", 0, None),
-            ("WU-2026-002", "2026-03-01", "overdue", 85000, None),
-            ("WU-2026-003", "2026-03-10", "submitted", 180000, "2026-03-08"),
-            ("WU-2026-003", "2026-04-10", "pending", 0, None),
-            ("WU-2026-004", "2026-03-20", "pending", 95000, None),
-            ("WU-2026-004", "2026-04-20", "pending", 0, None)
-        ]
-        
-        for payroll in payroll_data:
-            conn.execute("""
-                INSERT OR REPLACE INTO payroll_reports (program_id, due_date, status, payroll_amount, submitted_date)
-                VALUES (?, ?, ?, ?, ?)
-            """, payroll)
-        
-        # Demo enrollment docs
-        doc_data = [
-            ("WU-2026-001", "enrollment_form", "completed", "2026-01-15"),
-            ("WU-2026-001", "insurance_verification", "completed", "2026-01-18"),
-            ("WU-2026-001", "loss_history", "completed", "2026-01-20"),
-            ("WU-2026-002", "enrollment_form", "pending", None),
-            ("WU-2026-002", "insurance_verification", "not_started", None),
-            ("WU-2026-003", "enrollment_form", "completed", "2026-02-01"),
-            ("WU-2026-003", "waiver_request", "pending", None),
-            ("WU-2026-004", "enrollment_form", "completed", "2026-02-10"),
-            ("WU-2026-004", "insurance_verification", "completed", "2026-02-12"),
-            ("WU-2026-004", "loss_history", "pending", None)
-        ]
-        
-        for doc in doc_data:
-            conn.execute("""
-                INSERT OR REPLACE INTO enrollment_docs (program_id, document_type, status, submitted_date)
-                VALUES (?, ?, ?, ?)
-            """, doc)
-        
-        conn.commit()
-        conn.close()
-        print(f"✅ Demo database created at {self.db_path}")
-
-    def get_programs_data(self):
-        """Get programs data from database."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        programs = conn.execute("""
-            SELECT * FROM programs ORDER BY project_name
-        """).fetchall()
-        
-        result = []
-        for program in programs:
-            program_dict = dict(program)
+            for program in demo_programs:
+                conn.execute("""
+                    INSERT OR REPLACE INTO programs 
+                    (id, project_name, project_address, program_type, enrollment_status, bid_deduct_pct, contract_value, estimated_completion, contact_name, contact_email)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, program)
             
-            # Calculate compliance score
-            program_dict['compliance_score'] = self._calculate_compliance_score(program['id'])
+            # Demo payroll reports with realistic dates
+            payroll_data = [
+                ("WU-2026-001", "2026-03-15", "pending", 125000, None),
+                ("WU-2026-001", "2026-04-15", "pending", 0, None),
+                ("WU-2026-002", "2026-03-01", "overdue", 85000, None),
+                ("WU-2026-003", "2026-03-10", "submitted", 180000, "2026-03-08"),
+                ("WU-2026-003", "2026-04-10", "pending", 0, None),
+                ("WU-2026-004", "2026-03-20", "pending", 95000, None),
+                ("WU-2026-004", "2026-04-20", "pending", 0, None)
+            ]
             
-            # Get next deadline
-            program_dict['payroll_due'] = self._get_next_deadline(program['id'])
+            for payroll in payroll_data:
+                conn.execute("""
+                    INSERT OR REPLACE INTO payroll_reports (program_id, due_date, status, payroll_amount, submitted_date)
+                    VALUES (?, ?, ?, ?, ?)
+                """, payroll)
             
-            # Calculate estimated savings
-            savings = (program['contract_value'] or 0) * (program['bid_deduct_pct'] or 0) / 100
-            program_dict['estimated_savings'] = int(savings)
+            # Demo enrollment docs
+            doc_data = [
+                ("WU-2026-001", "enrollment_form", "completed", "2026-01-15"),
+                ("WU-2026-001", "insurance_verification", "completed", "2026-01-18"),
+                ("WU-2026-001", "loss_history", "completed", "2026-01-20"),
+                ("WU-2026-002", "enrollment_form", "pending", None),
+                ("WU-2026-002", "insurance_verification", "not_started", None),
+                ("WU-2026-003", "enrollment_form", "completed", "2026-02-01"),
+                ("WU-2026-003", "waiver_request", "pending", None),
+                ("WU-2026-004", "enrollment_form", "completed", "2026-02-10"),
+                ("WU-2026-004", "insurance_verification", "completed", "2026-02-12"),
+                ("WU-2026-004", "loss_history", "pending", None)
+            ]
             
-            # Set status based on enrollment
-            if program['enrollment_status'] == 'enrolled':
-                program_dict['status'] = 'active'
-            elif program['enrollment_status'] == 'pending':
-                program_dict['status'] = 'pending'
-            else:
-                program_dict['status'] = program['enrollment_status']
+            for doc in doc_data:
+                conn.execute("""
+                    INSERT OR REPLACE INTO enrollment_docs (program_id, document_type, status, submitted_date)
+                    VALUES (?, ?, ?, ?)
+                """, doc)
             
-            # Add timestamp
-            program_dict['last_updated'] = datetime.utcnow().isoformat() + 'Z'
+        print(f"✅ Demo database created at {self.db_path}")
+
+    @metrics.timed("sync.load_programs")
+    def get_programs_data(self, program_ids=None):
+        """Get programs data from database, optionally only for the given ids."""
+        if program_ids is None and self.portfolio is not None:
+            rows = self.portfolio.rows()
+        else:
+            with self.db.snapshot() as conn, metrics.span("sync.query"):
+                if program_ids is None:
+                    programs = conn.execute("""
+                        SELECT * FROM programs ORDER BY project_name
+                    """).fetchall()
+                    stats_by_program = load_program_stats(conn)
+                else:
+                    programs = conn.execute("""
+                        SELECT * FROM programs
+                        WHERE id IN (SELECT value FROM json_each(?))
+                        ORDER BY project_name
+                    """, (json.dumps(sorted(program_ids)),)).fetchall()
+                    stats_by_program = {}
+                    for program in programs:
+                        stats_by_program.update(load_program_stats(conn, program['id']))
+                changed_at = last_changed_at(conn)
+            rows = [(program, stats_by_program.get(program['id'], EMPTY_STATS), changed_at.get(program['id']))
+                    for program in programs]
+        
+        with metrics.span("sync.score"):
+            result = []
+            boundaries = []
+            for program, stats, program_changed_at in rows:
+                result.append(self._build_program_dict(dict(program), stats, program_changed_at))
+                boundaries.append(score_boundary(stats.score_changes_on))
             
-            result.append(program_dict)
+            # Remember each row until its score can change on its own
+            if program_ids is None:
+                self.score_cache.load(zip(result, boundaries))
+            else:
+                for row, valid_until in zip(result, boundaries):
+                    self.score_cache.put(row, valid_until)
         
-        conn.close()
+        metrics.count("sync.programs_loaded", len(result))
         return result
 
-    def _calculate_compliance_score(self, program_id: str) -> int:
-        """Calculate compliance score for a program."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        # Check enrollment docs
-        total_docs = conn.execute("""
-            SELECT COUNT(*) as total FROM enrollment_docs WHERE program_id = ?
-        """, (program_id,)).fetchone()
-        total_docs = total_docs['total'] if total_docs else 0
-        
-        completed_docs = conn.execute("""
-            SELECT COUNT(*) as completed FROM enrollment_docs 
-            WHERE program_id = ? AND status = 'completed'
-        """, (program_id,)).fetchone()
-        completed_docs = completed_docs['completed'] if completed_docs else 0
-        
-        # Check payroll reports
-        overdue_reports = conn.execute("""
-            SELECT COUNT(*) as overdue FROM payroll_reports 
-            WHERE program_id = ? AND status = 'overdue'
-        """, (program_id,)).fetchone()
-        overdue_reports = overdue_reports['overdue'] if overdue_reports else 0
-        
-        # Check if any pending reports are actually overdue
-        today = datetime.now().date()
-        actually_overdue = conn.execute("""
-            SELECT COUNT(*) as overdue FROM payroll_reports 
-            WHERE program_id = ? AND status = 'pending' AND date(due_date) < date('now')
-        """, (program_id,)).fetchone()
-        actually_overdue = actually_overdue['overdue'] if actually_overdue else 0
-        
-        conn.close()
-        
-        # Calculate score
-        if total_docs == 0:
-            doc_score = 50  # No docs required yet
+    def _load_score_cache(self, conn, api_file):
+        """Seed the score cache from the last published dashboard.
+        
+        Rows whose score went stale after that sync, because a pending
+        report fell past due, are left out and returned for rebuilding.
+        """
+        with open(api_file) as f:
+            previous = json.load(f)
+        
+        stats_by_program = load_program_stats(conn)
+        stale = programs_past_due_since(conn, previous['last_sync']) & stats_by_program.keys()
+        self.score_cache.load(
+            (program, score_boundary(stats_by_program.get(program['id'], EMPTY_STATS).score_changes_on))
+            for program in previous['programs'] if program['id'] not in stale
+        )
+        return stale
+
+    def next_boundary(self):
+        """The next instant the published scores or alerts change without a database write.
+        
+        Scores change at the earliest cached score boundary; alert day
+        counts and levels roll over at local midnight.
+        """
+        boundaries = [next_local_midnight()]
+        score_boundary = self.score_cache.next_boundary()
+        if score_boundary:
+            boundaries.append(score_boundary)
+        return min(boundaries)
+
+    def _build_program_dict(self, program_dict, stats, changed_at=None):
+        """Add score, deadline, savings, status and timestamp to a program row."""
+        # Calculate compliance score
+        program_dict['compliance_score'] = compliance_score(stats)
+        
+        # Get next deadline
+        program_dict['payroll_due'] = stats.next_deadline
+        
+        # Calculate estimated savings
+        savings = (program_dict['contract_value'] or 0) * (program_dict['bid_deduct_pct'] or 0) / 100
+        program_dict['estimated_savings'] = int(savings)
+        
+        # Set status based on enrollment
+        if program_dict['enrollment_status'] == 'enrolled':
+            program_dict['status'] = 'active'
+        elif program_dict['enrollment_status'] == 'pending':
+            program_dict['status'] = 'pending'
         else:
-            doc_score = (completed_docs / total_docs) * 70
+            program_dict['status'] = program_dict['enrollment_status']
+        
+        # Add timestamp of the last real change to this program's rows
+        program_dict['last_updated'] = changed_at or datetime.utcnow().isoformat() + 'Z'
         
-        penalty = (overdue_reports + actually_overdue) * 15  # 15 points per overdue report
-        score = max(0, min(100, doc_score + 30 - penalty))
+        return program_dict
+
+    def _calculate_compliance_score(self, program_id: str) -> int:
+        """Calculate compliance score for a program."""
+        stats = load_program_stats(self.db.connection, program_id).get(program_id, EMPTY_STATS)
         
-        return int(score)
+        return compliance_score(stats)
 
     def _get_next_deadline(self, program_id: str) -> str:
         """Get next upcoming deadline for a program."""
-        conn = sqlite3.connect(self.db_path)
-        
-        deadline = conn.execute("""
-            SELECT due_date FROM payroll_reports 
-            WHERE program_id = ? AND status IN ('pending', 'overdue') 
-            ORDER BY due_date LIMIT 1
-        """, (program_id,)).fetchone()
+        stats = load_program_stats(self.db.connection, program_id).get(program_id, EMPTY_STATS)
         
-        conn.close()
-        
-        if deadline:
-            return deadline[0]
-        return ""
+        return stats.next_deadline
 
     def generate_alerts(self, programs_data):
         """Generate alerts based on current program status."""
-        alerts = []
-        today = datetime.now().date()
-        
-        for program in programs_data:
-            # Deadline alerts
-            if program.get('payroll_due'):
-                try:
-                    due_date = datetime.strptime(program['payroll_due'], '%Y-%m-%d').date()
-                    days_until = (due_date - today).days
-                    
-                    if days_until < 0:
-                        alerts.append({
-                            "type": "deadline",
-                            "priority": "high",
-                            "message": f"{program['project_name']} payroll report is {abs(days_until)} days overdue",
-                            "program_id": program['id']
-                        })
-                    elif days_until <= 3:
-                        alerts.append({
-                            "type": "deadline", 
-                            "priority": "high",
-                            "message": f"{program['project_name']} payroll report due in {days_until} day(s) ({due_date.strftime('%B %d')})",
-                            "program_id": program['id']
-                        })
-                    elif days_until <= 7:
-                        alerts.append({
-                            "type": "deadline",
-                            "priority": "medium", 
-                            "message": f"{program['project_name']} payroll report due in {days_until} days ({due_date.strftime('%B %d')})",
-                            "program_id": program['id']
-                        })
-                except ValueError:
-                    pass  # Invalid date format
-            
-            # Compliance alerts
-            if program['compliance_score'] < 60:
-                alerts.append({
-                    "type": "compliance",
-                    "priority": "high" if program['compliance_score'] < 40 else "medium",
-                    "message": f"{program['project_name']} compliance score below {'40%' if program['compliance_score'] < 40 else '60%'} - missing enrollment docs",
-                    "program_id": program['id']
-                })
-            
-            # High-value program alerts
-            if program.get('contract_value', 0) > 3000000 and program['compliance_score'] < 80:
-                alerts.append({
-                    "type": "financial",
-                    "priority": "medium",
-                    "message": f"{program['project_name']} is high-value (${program['contract_value']:,.0f}) with suboptimal compliance ({program['compliance_score']}%)",
-                    "program_id": program['id']
-                })
-        
-        return alerts
+        return [alert.as_dict() for alert in self.alert_engine.evaluate(programs_data)]
+
+    def record_alerts(self, alerts):
+        """Remember alerts across runs and return only the new or changed ones."""
+        return AlertLog(self.db, DASHBOARD_RULES.name).record(alerts)
 
     def calculate_summary(self, programs_data):
         """Calculate summary metrics."""
-        total_programs = len(programs_data)
-        active_programs = len([p for p in programs_data if p['status'] == 'active'])
-        pending_enrollment = len([p for p in programs_data if p['enrollment_status'] == 'pending'])
-        
-        total_contract_value = sum(p.get('contract_value', 0) for p in programs_data)
-        estimated_total_savings = sum(p.get('estimated_savings', 0) for p in programs_data)
-        
-        compliance_scores = [p['compliance_score'] for p in programs_data if p['compliance_score'] > 0]
-        avg_compliance_score = sum(compliance_scores) / len(compliance_scores) if compliance_scores else 0
-        
-        # Count upcoming deadlines
-        today = datetime.now().date()
-        upcoming_deadlines = 0
+        accumulator = SummaryAccumulator()
         for program in programs_data:
-            if program.get('payroll_due'):
-                try:
-                    due_date = datetime.strptime(program['payroll_due'], '%Y-%m-%d').date()
-                    if (due_date - today).days <= 14:
-                        upcoming_deadlines += 1
-                except ValueError:
-                    pass
-        
-        return {
-            "total_programs": total_programs,
-            "active_programs": active_programs,
-            "pending_enrollment": pending_enrollment,
-            "upcoming_deadlines": upcoming_deadlines,
-            "total_contract_value": int(total_contract_value),
-            "estimated_total_savings": int(estimated_total_savings),
-            "avg_compliance_score": int(avg_compliance_score)
-        }
+            accumulator.add(program)
+        return accumulator.result()
 
-    def sync_dashboard_data(self):
-        """Sync dashboard data from database to JSON files."""
+    @metrics.timed("sync.dashboard")
+    def sync_dashboard_data(self, record_history: bool = True):
+        """Sync dashboard data from database to JSON files.
+        
+        Callers holding a snapshot pass record_history=False and record
+        the history themselves once it is released.
+        """
         print("🔄 Syncing dashboard data...")
         
         # Get programs data
         programs_data = self.get_programs_data()
         print(f"   Found {len(programs_data)} programs")
         
+        dashboard_data = self._write_dashboard(programs_data)
+        if record_history:
+            self._record_history(map(history_row, programs_data))
+        self._finish_publish()
+        return dashboard_data
+
+    def _write_dashboard(self, programs_data, sources=None):
+        """Build alerts and summary for programs_data and write wrapup-status.json.
+        
+        sources, when given, is published as the per-database provenance
+        of a merged dashboard.
+        """
         # Generate alerts
-        alerts = self.generate_alerts(programs_data)
+        with metrics.span("sync.alerts"):
+            self.last_alerts = self.alert_engine.evaluate(programs_data)
+            alerts = [alert.as_dict() for alert in self.last_alerts]
+        metrics.count("sync.alerts", len(alerts))
         print(f"   Generated {len(alerts)} alerts")
         
         # Calculate summary
-        summary = self.calculate_summary(programs_data)
+        with metrics.span("sync.summary"):
+            summary = self.calculate_summary(programs_data)
         
         # Create dashboard JSON
         dashboard_data = {
@@ -357,33 +353,59 @@ class DataSync:
             "alerts": alerts,
             "last_sync": datetime.utcnow().isoformat() + 'Z'
         }
+        if sources is not None:
+            dashboard_data["sources"] = sources
         
         # Write to API directory
         api_file = self.api_dir / "wrapup-status.json"
-        with open(api_file, 'w') as f:
-            json.dump(dashboard_data, f, indent=2)
+        with metrics.span("sync.publish_dashboard"):
+            self.publisher.publish(api_file, dashboard_data)
+        self._write_dashboard_pages(dashboard_data)
         
         print(f"✅ Dashboard data synced to {api_file}")
         return dashboard_data
 
-    def generate_program_detail(self, program_id: str):
+    def _record_history(self, rows):
+        """Store today's history frame from history_row() tuples and publish api/trends.json."""
+        if self.history is None:
+            return
+        with metrics.span("sync.history"):
+            frame = self.history.record(rows)
+            self.publisher.publish(self.api_dir / "trends.json", self.history.trends())
+        print(f"   Recorded history for {len(frame.program_ids)} programs ({frame.period})")
+
+    @metrics.timed("sync.dashboard_pages")
+    def _write_dashboard_pages(self, dashboard_data):
+        """Write the paged dashboard API (api/dashboard/) for dashboard_data."""
+        pager = DashboardPager(self.publisher, self.api_dir)
+        for program in dashboard_data['programs']:
+            pager.add(program)
+        pager.add_alerts(dashboard_data['alerts'])
+        pager.finish(dashboard_data['summary'], dashboard_data['last_sync'])
+
+    def generate_program_detail(self, program_id: str, db: WrapupDatabase = None):
         """Generate detailed data for a specific program."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        
-        # Get program details
-        program = conn.execute("""
-            SELECT * FROM programs WHERE id = ?
-        """, (program_id,)).fetchone()
-        
-        if not program:
-            return None
+        with (db or self.db).snapshot() as conn:
+            # Get program details
+            program = conn.execute("""
+                SELECT * FROM programs WHERE id = ?
+            """, (program_id,)).fetchone()
+            
+            if not program:
+                return None
+            
+            stats = load_program_stats(conn, program_id).get(program_id, EMPTY_STATS)
+            return self._program_detail(conn, dict(program), compliance_score(stats))
+
+    def _program_detail(self, conn, program_dict, compliance):
+        """Attach payroll reports and enrollment docs to a program row."""
+        program_id = program_dict['id']
         
         # Get payroll reports
         payroll_reports = conn.execute("""
             SELECT * FROM payroll_reports 
             WHERE program_id = ? 
-            ORDER BY due_date DESC
+            ORDER BY due_date DESC, id
         """, (program_id,)).fetchall()
         
         # Get enrollment docs
@@ -393,76 +415,585 @@ class DataSync:
             ORDER BY document_type
         """, (program_id,)).fetchall()
         
-        conn.close()
-        
         # Format data
-        program_dict = dict(program)
-        program_dict['compliance_score'] = self._calculate_compliance_score(program_id)
+        program_dict['compliance_score'] = compliance
         program_dict['payroll_reports'] = [dict(row) for row in payroll_reports]
         program_dict['enrollment_docs'] = [dict(row) for row in enrollment_docs]
         
         return program_dict
 
+    def _write_program_detail(self, program_id: str, detail_data):
+        """Write api/programs/<id>.json for one program."""
+        program_details_dir = self.api_dir / "programs"
+        program_details_dir.mkdir(exist_ok=True)
+        
+        detail_file = program_details_dir / f"{program_id}.json"
+        self.publisher.publish(detail_file, detail_data)
+
+    @metrics.timed("sync.program_details")
+    def _write_program_details(self, program_ids, workers: int = 1):
+        """Generate and publish the detail file of every program.
+        
+        With more than one worker the programs fan out over a thread pool.
+        Each worker thread reads through its own read-only connection; SQLite
+        queries, gzip and fsync release the GIL, so the threads overlap.
+        Files and errors do not depend on scheduling. Returns
+        {program_id: error} for the programs that failed, in program order.
+        """
+        reader = self.db if workers <= 1 else WrapupDatabase(self.db_path, readonly=True)
+        
+        def write_detail(program_id):
+            try:
+                detail_data = self.generate_program_detail(program_id, reader)
+                if detail_data:
+                    self._write_program_detail(program_id, detail_data)
+                return None
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+        
+        if workers <= 1:
+            outcomes = [write_detail(program_id) for program_id in program_ids]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detail") as pool:
+                outcomes = list(pool.map(write_detail, program_ids))
+        
+        errors = {program_id: error for program_id, error in zip(program_ids, outcomes) if error}
+        metrics.count("sync.program_details", len(program_ids) - len(errors))
+        metrics.count("sync.detail_errors", len(errors))
+        for program_id, error in errors.items():
+            print(f"   ❌ {program_id}: {error}")
+        return errors
+
+    def _finish_publish(self):
+        """Flush the publisher and report bytes and time per file."""
+        with metrics.span("publish.finish"):
+            totals = self.publisher.finish()
+        metrics.count("publish.files_written", totals['files_written'])
+        metrics.count("publish.files_skipped", totals['files_skipped'])
+        metrics.count("publish.bytes_written", totals['bytes_written'])
+        if not totals['files_written'] and not totals['files_skipped']:
+            return
+        
+        if self.publish_stats:
+            for result in totals['files']:
+                if result.skipped:
+                    print(f"   ⏭️  {result.path} unchanged ({result.seconds * 1000:.1f} ms)")
+                else:
+                    print(f"   📝 {result.path} {result.bytes_written:,} B, gz {result.gzip_bytes:,} B ({result.seconds * 1000:.1f} ms)")
+        
+        print(f"   📦 Published {totals['files_written']} files ({totals['bytes_written']:,} bytes), "
+              f"skipped {totals['files_skipped']} unchanged in {totals['seconds'] * 1000:.0f} ms")
+
+    @metrics.timed("full_sync")
     def full_sync(self):
         """Perform full synchronization."""
         print("🚀 Starting full sync...")
         
-        # Sync dashboard
-        dashboard_data = self.sync_dashboard_data()
+        # Read the dashboard and every detail file from one snapshot. Worker
+        # connections take their own snapshots a moment later; anything they
+        # see beyond synced_seq is picked up again by the next incremental sync.
+        with self.db.snapshot():
+            # Sync dashboard
+            dashboard_data = self.sync_dashboard_data(record_history=False)
+            
+            # Generate individual program details
+            program_ids = [program['id'] for program in dashboard_data['programs']]
+            if self.workers > 1:
+                print(f"   Generating program details with {self.workers} workers")
+            self.detail_errors = self._write_program_details(program_ids, self.workers)
+            # Changes after a shared portfolio was read are not in this dashboard
+            synced_seq = self.portfolio.synced_seq if self.portfolio else latest_seq(self.db.connection)
+        
+        self._record_history(map(history_row, dashboard_data['programs']))
+        self._finish_publish()
+        
+        if self.detail_errors:
+            # Do not mark the changes as synced while detail files are missing
+            print(f"⚠️  Full sync finished with {len(self.detail_errors)} failed program details - rerun --full-sync.")
+        else:
+            advance_cursor(self.db, SYNC_CURSOR, synced_seq)
+            print(f"✅ Full sync completed. {len(dashboard_data['programs'])} programs synced.")
+        self._print_summary(dashboard_data['summary'], len(dashboard_data['alerts']))
+        return dashboard_data
+
+    @metrics.timed("stream_sync")
+    def stream_sync(self):
+        """Full sync in a single streaming pass over the programs table.
+        
+        Each program flows through scoring, alert rules, the summary and
+        dashboard page stages and its detail file as it is read, and
+        wrapup-status.json is serialized incrementally, so memory stays flat
+        whatever the portfolio size.
+        """
+        print("🚀 Starting streaming full sync...")
+        
+        # Rows are not kept, so the next incremental sync reseeds from the file
+        self.score_cache.clear()
+        api_file = self.api_dir / "wrapup-status.json"
+        summary = SummaryAccumulator()
+        pager = DashboardPager(self.publisher, self.api_dir)
+        history_rows = []
+        last_sync = datetime.utcnow().isoformat() + 'Z'
+        
+        with self.db.snapshot() as conn, tempfile.TemporaryFile('w+') as alert_spool:
+            def programs():
+                for program, stats, changed_at in iter_program_rows(conn):
+                    program_dict = self._build_program_dict(dict(program), stats, changed_at)
+                    
+                    # Alerts are spooled to disk until the programs array is written
+                    alerts = self.generate_alerts([program_dict])
+                    for alert in alerts:
+                        alert_spool.write(json.dumps(alert) + "\n")
+                    
+                    summary.add(program_dict)
+                    pager.add(program_dict)
+                    pager.add_alerts(alerts)
+                    history_rows.append(history_row(program_dict))
+                    
+                    detail_data = self._program_detail(conn, program, program_dict['compliance_score'])
+                    self._write_program_detail(program_dict['id'], detail_data)
+                    
+                    yield program_dict
+            
+            def spooled_alerts():
+                alert_spool.seek(0)
+                for line in alert_spool:
+                    yield json.loads(line)
+            
+            self.publisher.publish_stream(api_file, [
+                ("programs", JsonArray(programs())),
+                ("summary", summary.result),
+                ("alerts", lambda: JsonArray(spooled_alerts())),
+                ("last_sync", last_sync)
+            ])
+            synced_seq = latest_seq(conn)
+        
+        print(f"   Found {summary.total_programs} programs")
+        print(f"   Generated {pager.alert_count} alerts")
+        metrics.count("sync.programs_loaded", summary.total_programs)
+        metrics.count("sync.alerts", pager.alert_count)
+        
+        pager.finish(summary.result(), last_sync)
+        self._record_history(history_rows)
+        self._finish_publish()
+        advance_cursor(self.db, SYNC_CURSOR, synced_seq)
+        
+        print(f"✅ Streaming sync completed. {summary.total_programs} programs synced.")
+        self._print_summary(summary.result(), pager.alert_count)
+        return summary.result()
+
+    @metrics.timed("incremental_sync")
+    def incremental_sync(self, refresh: bool = False):
+        """Regenerate only the programs whose rows changed or whose score went stale since the last sync.
+        
+        Unchanged programs come from the score cache. With refresh the
+        dashboard is rewritten even when no program needs rebuilding, so
+        alert day counts move on at midnight.
+        """
+        print("⚡ Starting incremental sync...")
         
-        # Generate individual program details
-        program_details_dir = self.api_dir / "programs"
-        program_details_dir.mkdir(exist_ok=True)
+        api_file = self.api_dir / "wrapup-status.json"
         
-        for program in dashboard_data['programs']:
-            program_id = program['id']
-            detail_data = self.generate_program_detail(program_id)
+        last_seq = get_cursor(self.db.connection, SYNC_CURSOR)
+        if last_seq is None or not api_file.exists():
+            print("   No previous sync found - running full sync")
+            return self.full_sync()
+        
+        with self.db.snapshot() as conn:
+            program_ids, synced_seq = changed_programs(conn, last_seq)
+            stale = set() if self.score_cache.loaded else self._load_score_cache(conn, api_file)
+            expired = (self.score_cache.expire() | stale) - program_ids
+            rebuild = program_ids | expired
+            if not rebuild and not refresh:
+                print("✅ No changes since last sync")
+                return None
             
-            if detail_data:
-                detail_file = program_details_dir / f"{program_id}.json"
-                with open(detail_file, 'w') as f:
-                    json.dump(detail_data, f, indent=2)
+            if program_ids:
+                print(f"   {len(program_ids)} programs changed")
+            if expired:
+                print(f"   {len(expired)} programs crossed a score boundary")
+            changed = {p['id']: p for p in self.get_programs_data(rebuild)} if rebuild else {}
+            with metrics.span("sync.detail_query"):
+                details = {program_id: self.generate_program_detail(program_id) for program_id in changed}
+        metrics.count("sync.programs_rebuilt", len(rebuild))
+        
+        # Deleted programs drop out; everything else comes from the cache
+        self.score_cache.invalidate(rebuild - changed.keys())
+        programs_data = sorted(self.score_cache.rows(), key=lambda p: p['project_name'])
+        
+        dashboard_data = self._write_dashboard(programs_data)
+        self._record_history(map(history_row, programs_data))
+        
+        for program_id in rebuild:
+            if details.get(program_id):
+                self._write_program_detail(program_id, details[program_id])
+            else:
+                # Program was deleted
+                self.publisher.remove(self.api_dir / "programs" / f"{program_id}.json")
+        self._finish_publish()
         
-        print(f"✅ Full sync completed. {len(dashboard_data['programs'])} programs synced.")
+        advance_cursor(self.db, SYNC_CURSOR, synced_seq)
         
-        # Print summary
-        summary = dashboard_data['summary']
+        print(f"✅ Incremental sync completed. {len(rebuild)} of {len(programs_data)} programs regenerated.")
+        self._print_summary(dashboard_data['summary'], len(dashboard_data['alerts']))
+        return dashboard_data
+
+    def watch(self, debounce: float = 0.2, max_delay: float = 0.5, poll_interval: float = 0.1):
+        """Stay resident and run an incremental sync after every burst of database writes.
+        
+        Between writes the loop sleeps until the next score or alert
+        boundary (see next_boundary()) and refreshes the dashboard exactly
+        then. Runs until SIGINT/SIGTERM. Counters are printed after each
+        sync and published to api/sync-daemon.json, and the run metrics are
+        rewritten when a metrics directory was given.
+        """
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        
+        stats = {
+            "started_at": datetime.utcnow().isoformat() + 'Z',
+            "syncs_run": 0,
+            "syncs_skipped": 0,
+            "boundary_syncs": 0,
+            "sync_errors": 0,
+            "last_latency_ms": None,
+            "max_latency_ms": None,
+            "avg_latency_ms": None,
+            "last_sync": None,
+            "next_boundary": None
+        }
+        total_latency = 0.0
+        
+        def run_sync(first_seen, boundary=False):
+            nonlocal total_latency
+            try:
+                result = self.incremental_sync(refresh=boundary)
+            except Exception as e:
+                stats["sync_errors"] += 1
+                print(f"❌ Sync failed: {type(e).__name__}: {e}")
+                return
+            
+            if result is None:
+                stats["syncs_skipped"] += 1
+            elif boundary:
+                print_alert_changes(self.record_alerts(self.last_alerts))
+                stats["boundary_syncs"] += 1
+                stats["last_sync"] = datetime.utcnow().isoformat() + 'Z'
+            else:
+                print_alert_changes(self.record_alerts(self.last_alerts))
+                latency_ms = (time.monotonic() - first_seen) * 1000
+                total_latency += latency_ms
+                stats["syncs_run"] += 1
+                stats["last_latency_ms"] = round(latency_ms, 1)
+                stats["max_latency_ms"] = round(max(latency_ms, stats["max_latency_ms"] or 0), 1)
+                stats["avg_latency_ms"] = round(total_latency / stats["syncs_run"], 1)
+                stats["last_sync"] = datetime.utcnow().isoformat() + 'Z'
+            
+            stats["next_boundary"] = self.next_boundary().isoformat()
+            self.publisher.publish(self.api_dir / "sync-daemon.json", stats)
+            self.publisher.finish()
+            metrics.checkpoint(success=stats["sync_errors"] == 0)
+            print(f"👀 Syncs run {stats['syncs_run']}, skipped {stats['syncs_skipped']}, "
+                  f"errors {stats['sync_errors']}, last latency {stats['last_latency_ms']} ms, "
+                  f"next boundary {stats['next_boundary']}")
+        
+        watcher = ChangeWatcher(self.db.connection, poll_interval, debounce, max_delay)
+        print(f"👀 Watching {self.db_path} (debounce {debounce * 1000:.0f} ms, max delay {max_delay * 1000:.0f} ms)")
+        
+        # Catch up on anything written while no sync was running
+        run_sync(time.monotonic())
+        
+        while True:
+            boundary = self.next_boundary()
+            first_seen = watcher.wait_for_change(stop, until=boundary)
+            if stop.is_set():
+                break
+            if first_seen is None:
+                print(f"⏰ Reached boundary {boundary.isoformat()}")
+                run_sync(time.monotonic(), boundary=True)
+            else:
+                run_sync(first_seen)
+        
+        print(f"\n🛑 Watch stopped. {stats['syncs_run']} syncs run, {stats['syncs_skipped']} skipped, "
+              f"{stats['sync_errors']} errors.")
+        return stats
+
+    def benchmark_workers(self, worker_counts, rounds: int = 3):
+        """Time detail generation for each worker count into scratch web roots.
+        
+        Every run starts from an empty api/ directory so all files are
+        written, and the published hashes are compared across worker counts
+        to confirm the output does not depend on parallelism.
+        """
+        with self.db.snapshot() as conn:
+            program_ids = [row[0] for row in conn.execute("SELECT id FROM programs ORDER BY project_name")]
+        
+        results = []
+        reference = None
+        for workers in worker_counts:
+            timings = []
+            for _ in range(rounds):
+                with tempfile.TemporaryDirectory() as scratch:
+                    scratch_sync = DataSync(scratch, self.db_path, minify=self.publisher.minify)
+                    start = time.perf_counter()
+                    errors = scratch_sync._write_program_details(program_ids, workers)
+                    scratch_sync.publisher.finish()
+                    timings.append(time.perf_counter() - start)
+                    
+                    with open(scratch_sync.api_dir / MANIFEST_NAME) as f:
+                        hashes = {key: entry['sha256'] for key, entry in json.load(f).items()}
+            
+            if reference is None:
+                reference = hashes
+            best = min(timings)
+            results.append({
+                'workers': workers,
+                'seconds': best,
+                'programs_per_second': len(program_ids) / best if best else 0,
+                'speedup': results[0]['seconds'] / best if results and best else 1.0,
+                'errors': len(errors),
+                'identical': hashes == reference
+            })
+        return results
+
+    def _print_summary(self, summary, alert_count):
+        """Print headline metrics for a synced dashboard."""
         print(f"\n📊 SUMMARY:")
         print(f"   Active Programs: {summary['active_programs']}")
         print(f"   Total Contract Value: ${summary['total_contract_value']:,}")
         print(f"   Estimated Savings: ${summary['estimated_total_savings']:,}")
         print(f"   Average Compliance: {summary['avg_compliance_score']}%")
-        print(f"   Active Alerts: {len(dashboard_data['alerts'])}")
+        print(f"   Active Alerts: {alert_count}")
+
+def _sync_source(source, web_root, minify, details, history, apply_migrations=False):
+    """Process pool task: read, score and optionally publish detail files for one source.
+    
+    Rows come back with namespaced ids for merging. Detail files go to
+    api/programs/<source>/<program id>.json under their own manifest, so
+    workers never share a file. With history, the source's own database
+    records today's history frame.
+    """
+    start = time.perf_counter()
+    result = SourceResult(source)
+    try:
+        sync = DataSync(web_root, source.db_path, minify=minify, history=history, apply_migrations=apply_migrations)
+        with sync.db.snapshot():
+            programs = sync.get_programs_data()
+            result.synced_at = datetime.utcnow().isoformat() + 'Z'
+            if details:
+                detail_dir = sync.api_dir / "programs" / source.name
+                detail_dir.mkdir(parents=True, exist_ok=True)
+                publisher = JsonPublisher(detail_dir, minify=minify, track_files=False)
+                for program in programs:
+                    try:
+                        detail_data = sync.generate_program_detail(program['id'])
+                        if detail_data:
+                            publisher.publish(detail_dir / f"{program['id']}.json",
+                                              namespace_program(source.name, detail_data))
+                    except Exception as e:
+                        result.detail_errors[namespace_id(source.name, program['id'])] = f"{type(e).__name__}: {e}"
+                publisher.finish()
+        if sync.history is not None:
+            sync.history.record(map(history_row, programs))
+        result.programs = [namespace_program(source.name, program) for program in programs]
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+class MultiSourceSync(DataSync):
+    """Syncs several wrap-up databases (one per region or business unit) into one dashboard.
+    
+    Each database is read, scored and given its detail files in its own
+    process, so the whole portfolio syncs in about the time of the slowest
+    source. The parent merges the rows in project name order and builds
+    alerts, summary and dashboard pages over the merge, exactly as for a
+    single database holding every program. Program ids are namespaced as
+    <source>:<id>, and wrapup-status.json lists each source's provenance.
+    Each source records its history frame in its own database; no merged
+    trends.json is published.
+    """
+    
+    def __init__(self, sources, web_root: str = None, minify: bool = False, publish_stats: bool = False,
+                 processes: int = None, history: bool = True, apply_migrations: bool = False):
+        """Initialize a fan-out sync over sources (see multi_source.resolve_sources)."""
+        self._init_publishing(web_root, minify, publish_stats)
+        self.apply_migrations = apply_migrations
+        self.sources = sources
+        self.record_source_history = history
+        self.processes = max(1, min(processes or os.cpu_count() or 1, len(sources)))
+        self.failed_sources = {}
+    
+    @metrics.timed("sync.sources")
+    def _sync_sources(self, details):
+        """Run _sync_source for every source in the process pool, in source order."""
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            futures = [pool.submit(_sync_source, source, str(self.web_root), self.minify, details,
+                                   self.record_source_history, self.apply_migrations)
+                       for source in self.sources]
+            return [future.result() for future in futures]
+    
+    @metrics.timed("multi_sync")
+    def sync(self, details: bool = True):
+        """Sync every source and publish the merged dashboard (and detail files when details)."""
+        print(f"🚀 Syncing {len(self.sources)} databases with {self.processes} processes...")
+        results = self._sync_sources(details)
+        
+        for result in results:
+            metrics.observe("sync.source", result.seconds)
+            if result.error:
+                print(f"   ❌ {result.source.name}: {result.error}")
+            else:
+                print(f"   {result.source.name}: {len(result.programs)} programs in {result.seconds:.2f}s "
+                      f"({result.source.db_path})")
+        
+        self.detail_errors = {program_id: error for result in results
+                              for program_id, error in result.detail_errors.items()}
+        for program_id, error in self.detail_errors.items():
+            print(f"   ❌ {program_id}: {error}")
+        self.failed_sources = {result.source.name: result.error for result in results if result.error}
+        if self.failed_sources:
+            # A summary without a region would look complete but be wrong
+            print(f"⚠️  {len(self.failed_sources)} of {len(results)} databases failed - "
+                  "wrapup-status.json was not published.")
+            return None
+        
+        with metrics.span("sync.merge"):
+            programs_data = merge_programs(results)
+        metrics.count("sync.programs_loaded", len(programs_data))
+        print(f"   Merged {len(programs_data)} programs")
+        
+        dashboard_data = self._write_dashboard(programs_data, [result.provenance() for result in results])
+        self._finish_publish()
+        self._print_summary(dashboard_data['summary'], len(dashboard_data['alerts']))
+        return dashboard_data
+
+PRIORITY_ICONS = {'critical': '🔴', 'high': '🔴', 'medium': '🟡', 'low': '🟢'}
+
+def print_alert_changes(changes):
+    """Print the alerts that are new or changed since the previous run."""
+    print(f"🔔 {len(changes.emitted)} new or changed alerts ({changes.new} new, {changes.changed} changed, "
+          f"{changes.unchanged} unchanged, {len(changes.resolved)} resolved)")
+    for alert in changes.emitted:
+        print(f"  {PRIORITY_ICONS.get(alert.priority, '•')} {alert.message}")
 
 def main():
     parser = argparse.ArgumentParser(description='OCIP/CCIP Data Sync')
     parser.add_argument('--sync-dashboard', action='store_true', help='Sync dashboard data only')
-    parser.add_argument('--generate-alerts', action='store_true', help='Generate alerts only')
+    parser.add_argument('--generate-alerts', action='store_true', help='Generate alerts only, showing those new or changed since the last run')
+    parser.add_argument('--all-alerts', action='store_true', help='With --generate-alerts, list every current alert')
     parser.add_argument('--full-sync', action='store_true', help='Perform full synchronization')
+    parser.add_argument('--stream', action='store_true', help='With --full-sync, stream programs through the sync in one pass')
+    parser.add_argument('--incremental', action='store_true', help='Only regenerate programs changed since the last sync')
+    parser.add_argument('--watch', action='store_true', help='Stay resident and resync incrementally when the database changes')
+    parser.add_argument('--debounce', type=float, default=0.2, help='With --watch, seconds of quiet that end a burst of writes')
+    parser.add_argument('--minify', action='store_true', help='Write minified JSON')
+    parser.add_argument('--publish-stats', action='store_true', help='Report bytes written and time for every published file')
+    parser.add_argument('--workers', type=int, default=1, help='Threads generating program detail files in --full-sync')
+    parser.add_argument('--benchmark-workers', metavar='N,N,...', help='Time detail generation for each worker count')
     parser.add_argument('--web-root', help='Web portal root directory')
     parser.add_argument('--db-path', help='Path to wrap-up manager database')
+    parser.add_argument('--sources', nargs='+', metavar='PATH|GLOB|NAME=PATH',
+                        help='Sync several databases in parallel and merge them (with --full-sync or --sync-dashboard)')
+    parser.add_argument('--no-history', action='store_true', help='Do not record this run in the snapshot history')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending schema migrations to the database(s) first')
+    parser.add_argument('--processes', type=int, help='With --sources, worker processes (default: one per database, up to the CPU count)')
+    add_instrumentation_arguments(parser)
     
     args = parser.parse_args()
     
-    if not any([args.sync_dashboard, args.generate_alerts, args.full_sync]):
+    if not any([args.sync_dashboard, args.generate_alerts, args.full_sync, args.incremental, args.benchmark_workers,
+                args.watch]):
         parser.print_help()
         return
     
-    sync = DataSync(args.web_root, args.db_path)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.stream and args.workers > 1:
+        parser.error("--workers applies to the batch full sync, not --stream")
     
-    if args.sync_dashboard:
-        sync.sync_dashboard_data()
-    
-    if args.generate_alerts:
-        programs_data = sync.get_programs_data()
-        alerts = sync.generate_alerts(programs_data)
-        print(f"Generated {len(alerts)} alerts:")
-        for alert in alerts:
-            priority_icon = {'high': '🔴', 'medium': '🟡', 'low': '🟢'}
-            print(f"  {priority_icon.get(alert['priority'], '•')} {alert['message']}")
+    if args.sources:
+        if args.db_path or args.stream or args.workers > 1 or any([
+                args.generate_alerts, args.incremental, args.watch, args.benchmark_workers]):
+            parser.error("--sources works with --full-sync or --sync-dashboard only")
+        if args.processes is not None and args.processes < 1:
+            parser.error("--processes must be at least 1")
+        try:
+            sources = resolve_sources(args.sources)
+        except ValueError as e:
+            parser.error(str(e))
+        
+        with instrumented_run('data-sync', args):
+            sync = MultiSourceSync(sources, args.web_root, minify=args.minify, publish_stats=args.publish_stats,
+                                   processes=args.processes, history=not args.no_history,
+                                   apply_migrations=args.migrate)
+            sync.sync(details=args.full_sync)
+            if sync.failed_sources or sync.detail_errors:
+                sys.exit(1)
+        return
     
-    if args.full_sync:
-        sync.full_sync()
+    with instrumented_run('data-sync', args):
+        try:
+            sync = DataSync(args.web_root, args.db_path, minify=args.minify, publish_stats=args.publish_stats,
+                            workers=args.workers, history=not args.no_history, apply_migrations=args.migrate)
+        except (FileNotFoundError, SchemaOutOfDate) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        
+        # Outputs of one run read the portfolio once; --watch must keep seeing new writes
+        if sum([args.sync_dashboard, args.generate_alerts, args.full_sync and not args.stream]) > 1 and not args.watch:
+            sync.portfolio = PortfolioSnapshot(sync.db)
+        
+        if args.benchmark_workers:
+            try:
+                worker_counts = [int(n) for n in args.benchmark_workers.split(',')]
+            except ValueError:
+                parser.error("--benchmark-workers takes comma-separated worker counts, e.g. 1,2,4,8")
+            results = sync.benchmark_workers(worker_counts)
+            print(f"\n⏱️  DETAIL GENERATION BENCHMARK - best of 3")
+            print("=" * 60)
+            print(f"{'Workers':>7}  {'Seconds':>8}  {'Programs/s':>10}  {'Speedup':>7}  Output")
+            for result in results:
+                output = 'identical' if result['identical'] else 'DIFFERS'
+                if result['errors']:
+                    output += f", {result['errors']} errors"
+                print(f"{result['workers']:>7}  {result['seconds']:>8.2f}  {result['programs_per_second']:>10,.0f}  "
+                      f"{result['speedup']:>6.1f}x  {output}")
+            return
+        
+        if args.sync_dashboard:
+            sync.sync_dashboard_data()
+        
+        if args.generate_alerts:
+            programs_data = sync.get_programs_data()
+            alerts = sync.alert_engine.evaluate(programs_data)
+            changes = sync.record_alerts(alerts)
+            if args.all_alerts:
+                print(f"Generated {len(alerts)} alerts:")
+                for alert in alerts:
+                    print(f"  {PRIORITY_ICONS.get(alert.priority, '•')} {alert.message}")
+            else:
+                print_alert_changes(changes)
+            next_change = sync.alert_engine.next_transition()
+            if next_change:
+                print(f"   Next deadline alert change: {next_change.isoformat()}")
+        
+        if args.full_sync:
+            if args.stream:
+                sync.stream_sync()
+            else:
+                sync.full_sync()
+        
+        if args.incremental:
+            sync.incremental_sync()
+        
+        if args.watch:
+            sync.watch(debounce=args.debounce)
+        
+        if sync.detail_errors:
+            sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,375 @@
+"""
+Run Instrumentation for OCIP/CCIP Tools
+=======================================
+Named stage timings, counters and an optional SQL profile for one run.
+
+Stages are timed with metrics.span("sync.alerts") blocks and counted with
+metrics.count("sync.programs", n). Names are explicit and dotted rather
+than derived from nesting, so worker threads report under the same names
+as the main thread; an outer stage's time includes its inner ones. Spans
+cost a couple of microseconds, so they stay on in every run; they wrap
+stages and per-file work, never per-row loops.
+
+The metrics of a run are written as <tool>.json and as <tool>.prom in the
+Prometheus text format, for the node exporter's textfile collector. Both
+files are replaced atomically.
+
+--profile adds cProfile over the whole command and a SQL profile:
+connections opened through wrapup_db after it starts use a connection
+class that times every statement, including the time spent fetching its
+rows, and the slowest statements are printed after the run.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import wrapup_db
+
+PROFILE_FUNCTIONS = 25
+PROFILE_STATEMENTS = 10
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Stage timings and counters for the current run of one tool; safe across threads."""
+
+    def __init__(self, tool: str = ""):
+        self._lock = threading.Lock()
+        self.metrics_dir: Optional[Path] = None
+        self.reset(tool)
+
+    def reset(self, tool: str):
+        """Start a new run for tool, discarding everything recorded so far."""
+        with self._lock:
+            self.tool = tool
+            self.started_at = datetime.utcnow().isoformat() + 'Z'
+            self._started = time.time()
+            self._start = time.perf_counter()
+            self.stages: Dict[str, List[float]] = {}  # name -> [calls, seconds, max seconds]
+            self.counters: Dict[str, float] = {}
+            self.sql: List[Dict] = []
+
+    def span(self, name: str) -> _Span:
+        """Time a block as one call of stage name."""
+        return _Span(self, name)
+
+    def timed(self, name: str):
+        """Decorator form of span()."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, name: str, seconds: float):
+        """Record one call of stage name that took seconds (for times measured elsewhere)."""
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = [1, seconds, seconds]
+            else:
+                stage[0] += 1
+                stage[1] += seconds
+                if seconds > stage[2]:
+                    stage[2] = seconds
+
+    def count(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self, success: bool = True) -> Dict:
+        with self._lock:
+            return {
+                "tool": self.tool,
+                "started_at": self.started_at,
+                "duration_seconds": round(time.perf_counter() - self._start, 6),
+                "success": success,
+                "stages": {
+                    name: {"calls": calls, "seconds": round(seconds, 6), "max_seconds": round(longest, 6)}
+                    for name, (calls, seconds, longest) in sorted(self.stages.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "slowest_sql": list(self.sql),
+            }
+
+    def prometheus_text(self, success: bool = True) -> str:
+        """The run in the Prometheus text exposition format."""
+        data = self.as_dict(success)
+        tool = _label(data['tool'])
+        lines = []
+
+        def family(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{{{labels}}} {value}")
+
+        stages = data['stages'].items()
+        family("wrapup_stage_seconds", "Wall time spent in each stage during the run.",
+               [(f'tool="{tool}",stage="{_label(name)}"', stage['seconds']) for name, stage in stages])
+        family("wrapup_stage_calls", "Times each stage ran during the run.",
+               [(f'tool="{tool}",stage="{_label(name)}"', stage['calls']) for name, stage in stages])
+        family("wrapup_stage_max_seconds", "Longest single call of each stage during the run.",
+               [(f'tool="{tool}",stage="{_label(name)}"', stage['max_seconds']) for name, stage in stages])
+        family("wrapup_count", "Items counted during the run.",
+               [(f'tool="{tool}",name="{_label(name)}"', value) for name, value in data['counters'].items()])
+        family("wrapup_run_duration_seconds", "Wall time of the run so far.",
+               [(f'tool="{tool}"', data['duration_seconds'])])
+        family("wrapup_run_timestamp_seconds", "Unix time the run started.",
+               [(f'tool="{tool}"', float(int(self._started)))])
+        family("wrapup_run_success", "1 if the run finished without an error.",
+               [(f'tool="{tool}"', int(success))])
+        return "\n".join(lines) + "\n"
+
+    def write(self, metrics_dir: Path, success: bool = True) -> List[Path]:
+        """Atomically write <tool>.json and <tool>.prom into metrics_dir."""
+        metrics_dir = Path(metrics_dir)
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        name = self.tool.replace('-', '_') or 'wrapup'
+        outputs = {
+            metrics_dir / f"{name}.json": json.dumps(self.as_dict(success), indent=2) + "\n",
+            metrics_dir / f"{name}.prom": self.prometheus_text(success),
+        }
+        for path, text in outputs.items():
+            fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, prefix=f".{path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(text)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        return list(outputs)
+
+    def checkpoint(self, success: bool = True):
+        """Write the metrics so far if the run was given a metrics directory (long-running modes)."""
+        if self.metrics_dir is not None:
+            self.write(self.metrics_dir, success)
+
+    def print_stages(self, limit: int = 20):
+        """Print the slowest stages of the run."""
+        data = self.as_dict()
+        print(f"\n⏱️  STAGES - {data['duration_seconds'] * 1000:,.1f} ms total")
+        print("=" * 60)
+        stages = sorted(data['stages'].items(), key=lambda item: item[1]['seconds'], reverse=True)
+        for name, stage in stages[:limit]:
+            print(f"  {stage['seconds'] * 1000:>10,.1f} ms  {stage['calls']:>7,}x  {name}")
+        if data['counters']:
+            print("  " + ", ".join(f"{name} {value:,}" for name, value in data['counters'].items()))
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# The process-wide metrics every tool module records into
+metrics = Metrics()
+
+
+class SqlProfile:
+    """Per-statement call counts, rows and time, collected by ProfiledConnection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements: Dict[str, List[float]] = {}  # sql -> [calls, seconds, max seconds, rows]
+        self._previous_factory = None
+
+    def record(self, sql: str, seconds: float, rows: int = 0, call: bool = False):
+        key = " ".join(sql.split())
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = [0, 0.0, 0.0, 0]
+            if call:
+                entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += rows
+
+    def slowest(self, limit: int = PROFILE_STATEMENTS) -> List[Dict]:
+        with self._lock:
+            ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [{"sql": sql, "calls": int(calls), "seconds": round(seconds, 6), "max_seconds": round(longest, 6),
+                 "rows": int(rows)} for sql, (calls, seconds, longest, rows) in ranked]
+
+    def install(self):
+        """Profile every connection wrapup_db opens from now on."""
+        global _active_profile
+        _active_profile = self
+        self._previous_factory = wrapup_db.set_connection_factory(ProfiledConnection)
+
+    def uninstall(self):
+        global _active_profile
+        if self._previous_factory is not None:
+            wrapup_db.set_connection_factory(self._previous_factory)
+            self._previous_factory = None
+        _active_profile = None
+
+
+_active_profile: Optional[SqlProfile] = None
+
+
+def _record(sql: Optional[str], seconds: float, rows: int = 0, call: bool = False):
+    profile = _active_profile
+    if profile is not None and sql:
+        profile.record(sql, seconds, rows, call)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Times execution and every fetch against the statement that produced the rows."""
+
+    _sql: Optional[str] = None
+
+    def execute(self, sql, parameters=()):
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record(sql, time.perf_counter() - start, call=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql = sql
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record(sql, time.perf_counter() - start, call=True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        _record(self._sql, time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        _record(self._sql, time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        _record(self._sql, time.perf_counter() - start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            _record(self._sql, time.perf_counter() - start)
+            raise
+        _record(self._sql, time.perf_counter() - start, 1)
+        return row
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3.Connection whose statements run on ProfiledCursor."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def add_arguments(parser):
+    """Add --profile, --profile-out and --metrics-dir to a tool's argument parser."""
+    parser.add_argument('--profile', action='store_true',
+                        help='Print stage times, the top functions by cumulative time and the slowest SQL')
+    parser.add_argument('--profile-out', metavar='FILE', help='With --profile, also save the raw cProfile stats')
+    parser.add_argument('--metrics-dir', metavar='DIR',
+                        help='Write <tool>.json and <tool>.prom run metrics here (node exporter textfile collector)')
+
+
+@contextmanager
+def instrumented_run(tool: str, args) -> Iterator[Metrics]:
+    """Collect metrics for one command-line run, profiling and writing them as args ask."""
+    metrics.reset(tool)
+    metrics.metrics_dir = Path(args.metrics_dir) if args.metrics_dir else None
+    profiler = sql_profile = None
+    if args.profile:
+        sql_profile = SqlProfile()
+        sql_profile.install()
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    success = False
+    try:
+        yield metrics
+        success = True
+    except SystemExit as e:
+        success = not e.code
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            sql_profile.uninstall()
+            metrics.sql = sql_profile.slowest()
+            print_profile(profiler, sql_profile, args.profile_out)
+        if metrics.metrics_dir is not None:
+            paths = metrics.write(metrics.metrics_dir, success)
+            print(f"📈 Metrics written to {', '.join(str(path) for path in paths)}")
+
+
+def print_profile(profiler: cProfile.Profile, sql_profile: SqlProfile, profile_out: Optional[str] = None):
+    """Print stage times, the hottest functions and the slowest SQL statements."""
+    metrics.print_stages()
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    if profile_out:
+        stats.dump_stats(profile_out)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(PROFILE_FUNCTIONS)
+    print(f"\n🔬 TOP {PROFILE_FUNCTIONS} FUNCTIONS BY CUMULATIVE TIME (main thread)")
+    print("=" * 60)
+    print(stream.getvalue().strip())
+
+    print(f"\n🐢 SLOWEST SQL (execute + fetch)")
+    print("=" * 60)
+    for statement in sql_profile.slowest():
+        sql = statement['sql'] if len(statement['sql']) <= 100 else statement['sql'][:97] + "..."
+        print(f"  {statement['seconds'] * 1000:>10,.1f} ms  {statement['calls']:>7,}x  "
+              f"{statement['rows']:>9,} rows  {sql}")
+
+    if profile_out:
+        print(f"\n💾 cProfile stats saved to {profile_out} (python3 -m pstats {profile_out})")
+    sys.stdout.flush()
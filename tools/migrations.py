@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Schema Migrations for the Wrap-up Database
+==========================================
+Versioned schema changes applied in order and recorded in schema_version.
+
+Features:
+- Base programs / payroll_reports / enrollment_docs tables
+- Unique (program_id, document_type) key so INSERT OR REPLACE replaces docs
+- Composite indexes behind the compliance scoring and deadline queries
+- Trigger-fed change log so syncs can skip unchanged programs
+- Per-consumer alert state so alert runs emit only new or changed alerts
+- Trigger-maintained program_stats so a compliance score is one row fetch
+- Cached rollup dimensions (parsed address state), re-parsed only when the address changes
+- Month-partitioned snapshot history frames for compliance trends
+- Bulk import checkpoints so an interrupted import resumes where it stopped
+- Bond store with status and type indexes for the paged pending bonds API
+- EXPLAIN QUERY PLAN check that the hot queries actually use them
+
+Usage:
+    python3 migrations.py --db-path /tmp/wrapup_demo.db
+    python3 migrations.py --db-path /tmp/wrapup_demo.db --status
+    python3 migrations.py --db-path /tmp/wrapup_demo.db --explain
+    python3 migrations.py --db-path /tmp/wrapup_demo.db --check-stats
+    python3 migrations.py --db-path /tmp/wrapup_demo.db --rebuild-stats
+"""
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+from portfolio_snapshot import (PROGRAM_STATS_REBUILD_SQL, PROGRAM_STATS_SQL, STATS_SQL, STREAM_SQL,
+                                UPCOMING_DEADLINES_SQL, check_program_stats, rebuild_program_stats)
+from rollup import UNPARSED_DIMENSIONS_SQL
+from wrapup_db import WrapupDatabase, get_database
+
+
+def _change_triggers(table: str, key: str) -> List[str]:
+    """Build the insert/update/delete triggers that feed change_log for a table."""
+    log = f"INSERT INTO change_log (table_name, program_id, op) VALUES ('{table}', {{row}}.{key}, '{{op}}');"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_log_insert AFTER INSERT ON {table}
+        BEGIN
+            {log.format(row='NEW', op='insert')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_log_update AFTER UPDATE ON {table}
+        BEGIN
+            {log.format(row='NEW', op='update')}
+            INSERT INTO change_log (table_name, program_id, op)
+            SELECT '{table}', OLD.{key}, 'update' WHERE OLD.{key} IS NOT NEW.{key};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_log_delete AFTER DELETE ON {table}
+        BEGIN
+            {log.format(row='OLD', op='delete')}
+        END
+        """,
+    ]
+
+
+# Recompute one program's program_stats row with index seeks; inserts
+# nothing when the program does not exist. Migration 7's triggers run
+# this version; migration 10 replaces them with _STATS_REFRESH_FIXED.
+_STATS_REFRESH = """
+    INSERT OR REPLACE INTO program_stats
+        (program_id, total_docs, completed_docs, overdue_reports, next_pending_due, next_deadline)
+    SELECT p.id,
+           (SELECT COUNT(*) FROM enrollment_docs WHERE program_id = p.id),
+           (SELECT COUNT(*) FROM enrollment_docs WHERE program_id = p.id AND status = 'completed'),
+           (SELECT COUNT(*) FROM payroll_reports WHERE program_id = p.id AND status = 'overdue'),
+           (SELECT MIN(due_date) FROM payroll_reports WHERE program_id = p.id AND status = 'pending'),
+           COALESCE((SELECT MIN(due_date) FROM payroll_reports
+                     WHERE program_id = p.id AND status IN ('pending', 'overdue')), '')
+    FROM programs p WHERE p.id = {program};
+"""
+
+# Once ANALYZE (or PRAGMA optimize) has written sqlite_stat1, SQLite 3.40
+# answers next_deadline's MIN() with both statuses as keys of the
+# (program_id, status, due_date) index by stopping at the first status,
+# so it returns the overdue minimum and skips an earlier pending date
+# (NEXT_DEADLINE_PROBE reproduces it). The unary + keeps the MIN() on the
+# program_id prefix, a scan of one program's dozen reports.
+_STATS_REFRESH_FIXED = _STATS_REFRESH.replace("AND status IN ('pending', 'overdue')",
+                                              "AND +status IN ('pending', 'overdue')")
+
+NEXT_DEADLINE_PROBE = """
+    CREATE TABLE payroll_reports (program_id TEXT NOT NULL, due_date TEXT NOT NULL, status TEXT);
+    CREATE INDEX idx_probe ON payroll_reports (program_id, status, due_date);
+    INSERT INTO payroll_reports VALUES ('P', '2026-07-01', 'pending'), ('P', '2026-09-01', 'overdue');
+    ANALYZE;
+    UPDATE sqlite_stat1 SET stat = '100000 14 8 1';
+    ANALYZE sqlite_schema;
+"""
+
+
+def _program_stats_triggers(refresh: str) -> List[str]:
+    """Build the triggers that add, move and drop a program's program_stats row."""
+    return [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_programs_stats_insert AFTER INSERT ON programs
+        BEGIN
+            INSERT OR REPLACE INTO program_stats (program_id) VALUES (NEW.id);
+            """ + refresh.format(program='NEW.id') + """
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_programs_stats_update AFTER UPDATE OF id ON programs
+        WHEN OLD.id IS NOT NEW.id
+        BEGIN
+            DELETE FROM program_stats WHERE program_id = OLD.id;
+            """ + refresh.format(program='NEW.id') + """
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_programs_stats_delete AFTER DELETE ON programs
+        BEGIN
+            DELETE FROM program_stats WHERE program_id = OLD.id;
+        END
+        """,
+    ]
+
+
+def _stats_triggers(table: str, columns: str, refresh: str) -> List[str]:
+    """Build the triggers that refresh program_stats when a doc or report row changes.
+
+    Updates only fire when a column the stats depend on changes.
+    """
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_insert AFTER INSERT ON {table}
+        BEGIN
+            {refresh.format(program='NEW.program_id')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_update AFTER UPDATE OF {columns} ON {table}
+        BEGIN
+            {refresh.format(program='NEW.program_id')}
+            {refresh.format(program='OLD.program_id').replace('WHERE p.id = OLD.program_id',
+                                                                      'WHERE p.id = OLD.program_id AND OLD.program_id IS NOT NEW.program_id')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_stats_delete AFTER DELETE ON {table}
+        BEGIN
+            {refresh.format(program='OLD.program_id')}
+        END
+        """,
+    ]
+
+
+# (version, description, statements). Never edit an applied migration;
+# append a new one instead.
+MIGRATIONS = [
+    (1, "Base wrap-up schema", [
+        """
+        CREATE TABLE IF NOT EXISTS programs (
+            id TEXT PRIMARY KEY,
+            project_name TEXT NOT NULL,
+            project_address TEXT,
+            program_type TEXT DEFAULT 'OCIP',
+            enrollment_status TEXT DEFAULT 'pending',
+            bid_deduct_pct REAL DEFAULT 0,
+            contract_value REAL DEFAULT 0,
+            estimated_completion TEXT,
+            contact_name TEXT,
+            contact_email TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS payroll_reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            program_id TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            payroll_amount REAL,
+            submitted_date TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS enrollment_docs (
+            program_id TEXT NOT NULL,
+            document_type TEXT NOT NULL,
+            status TEXT DEFAULT 'not_started',
+            submitted_date TEXT
+        )
+        """,
+    ]),
+    (2, "Unique enrollment doc per program and document type", [
+        # Keep the most recently inserted copy of each duplicated doc
+        """
+        DELETE FROM enrollment_docs
+        WHERE rowid NOT IN (
+            SELECT MAX(rowid) FROM enrollment_docs GROUP BY program_id, document_type
+        )
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_enrollment_docs_program_type
+        ON enrollment_docs (program_id, document_type)
+        """,
+    ]),
+    (3, "Indexes for compliance scoring and deadline checks", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_payroll_reports_program_status_due
+        ON payroll_reports (program_id, status, due_date)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_payroll_reports_status_due
+        ON payroll_reports (status, due_date)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_enrollment_docs_program_status
+        ON enrollment_docs (program_id, status)
+        """,
+    ]),
+    (4, "Change capture log, per-program change times and sync cursors", [
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            program_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS program_changes (
+            program_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            changed_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sync_cursor (
+            name TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_change_log_program_changes AFTER INSERT ON change_log
+        BEGIN
+            INSERT INTO program_changes (program_id, last_seq, changed_at)
+            VALUES (NEW.program_id, NEW.seq, NEW.changed_at)
+            ON CONFLICT(program_id) DO UPDATE SET
+                last_seq = excluded.last_seq,
+                changed_at = excluded.changed_at;
+        END
+        """,
+        *_change_triggers("programs", "id"),
+        *_change_triggers("payroll_reports", "program_id"),
+        *_change_triggers("enrollment_docs", "program_id"),
+        # Existing programs start with a baseline change at migration time
+        """
+        INSERT INTO change_log (table_name, program_id, op)
+        SELECT 'programs', id, 'baseline' FROM programs
+        """,
+    ]),
+    (5, "Name index so programs stream in display order without a sort", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_programs_project_name
+        ON programs (project_name)
+        """,
+    ]),
+    (6, "Alert state remembered between alert engine runs", [
+        """
+        CREATE TABLE IF NOT EXISTS alert_state (
+            consumer TEXT NOT NULL,
+            alert_key TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            program_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            first_seen TEXT NOT NULL,
+            last_changed TEXT NOT NULL,
+            PRIMARY KEY (consumer, alert_key)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (7, "Trigger-maintained program_stats for single-row compliance scores", [
+        """
+        CREATE TABLE IF NOT EXISTS program_stats (
+            program_id TEXT PRIMARY KEY,
+            total_docs INTEGER NOT NULL DEFAULT 0,
+            completed_docs INTEGER NOT NULL DEFAULT 0,
+            overdue_reports INTEGER NOT NULL DEFAULT 0,
+            next_pending_due TEXT,
+            next_deadline TEXT NOT NULL DEFAULT ''
+        ) WITHOUT ROWID
+        """,
+        *_program_stats_triggers(_STATS_REFRESH),
+        *_stats_triggers("enrollment_docs", "program_id, status", _STATS_REFRESH),
+        *_stats_triggers("payroll_reports", "program_id, status, due_date", _STATS_REFRESH),
+        "INSERT INTO program_stats " + PROGRAM_STATS_REBUILD_SQL,
+    ]),
+    (8, "Cached rollup dimensions parsed from program addresses", [
+        """
+        CREATE TABLE IF NOT EXISTS program_dimensions (
+            program_id TEXT PRIMARY KEY,
+            state TEXT,
+            parsed INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_program_dimensions_unparsed ON program_dimensions (program_id) WHERE parsed = 0",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_programs_dimensions_insert AFTER INSERT ON programs
+        BEGIN
+            INSERT OR REPLACE INTO program_dimensions (program_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_programs_dimensions_update AFTER UPDATE OF id, project_address ON programs
+        WHEN OLD.id IS NOT NEW.id OR OLD.project_address IS NOT NEW.project_address
+        BEGIN
+            DELETE FROM program_dimensions WHERE program_id = OLD.id;
+            INSERT OR REPLACE INTO program_dimensions (program_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_programs_dimensions_delete AFTER DELETE ON programs
+        BEGIN
+            DELETE FROM program_dimensions WHERE program_id = OLD.id;
+        END
+        """,
+        "INSERT OR REPLACE INTO program_dimensions (program_id) SELECT id FROM programs",
+    ]),
+    (9, "Month-partitioned compliance snapshot history", [
+        """
+        CREATE TABLE IF NOT EXISTS history_frames (
+            month TEXT NOT NULL,
+            resolution TEXT NOT NULL CHECK (resolution IN ('daily', 'weekly', 'monthly')),
+            period TEXT NOT NULL,
+            taken_at TEXT NOT NULL,
+            samples INTEGER NOT NULL DEFAULT 1,
+            programs INTEGER NOT NULL,
+            avg_compliance REAL NOT NULL,
+            total_savings INTEGER NOT NULL,
+            total_overdue INTEGER NOT NULL,
+            programs_overdue INTEGER NOT NULL,
+            low_compliance INTEGER NOT NULL,
+            program_ids BLOB,
+            scores BLOB NOT NULL,
+            savings BLOB NOT NULL,
+            overdue BLOB NOT NULL,
+            PRIMARY KEY (month, resolution, period)
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (10, "Recreate the program_stats triggers with the corrected next_deadline refresh", [
+        *[f"DROP TRIGGER IF EXISTS trg_{table}_stats_{op}"
+          for table in ("programs", "enrollment_docs", "payroll_reports") for op in ("insert", "update", "delete")],
+        *_program_stats_triggers(_STATS_REFRESH_FIXED),
+        *_stats_triggers("enrollment_docs", "program_id, status", _STATS_REFRESH_FIXED),
+        *_stats_triggers("payroll_reports", "program_id, status, due_date", _STATS_REFRESH_FIXED),
+        "DELETE FROM program_stats",
+        "INSERT INTO program_stats " + PROGRAM_STATS_REBUILD_SQL,
+    ]),
+    (11, "Resumable bulk import progress", [
+        """
+        CREATE TABLE IF NOT EXISTS import_progress (
+            source TEXT PRIMARY KEY,
+            target TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            byte_offset INTEGER NOT NULL DEFAULT 0,
+            line INTEGER NOT NULL DEFAULT 0,
+            rows_read INTEGER NOT NULL DEFAULT 0,
+            rows_written INTEGER NOT NULL DEFAULT 0,
+            rows_rejected INTEGER NOT NULL DEFAULT 0,
+            started_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            completed_at TEXT
+        )
+        """,
+    ]),
+    (12, "Shared bond store for the pending bonds tracker", [
+        """
+        CREATE TABLE IF NOT EXISTS bonds (
+            id TEXT PRIMARY KEY,
+            bond_type TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Pending',
+            project_name TEXT,
+            obligee TEXT,
+            bond_amount REAL,
+            contract_amount REAL,
+            principal TEXT,
+            project_state TEXT,
+            requestor_name TEXT,
+            requestor_email TEXT,
+            urgency TEXT,
+            notes TEXT,
+            date_submitted TEXT,
+            date_modified TEXT
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_bonds_submitted ON bonds (date_submitted DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_bonds_status_submitted ON bonds (status, date_submitted DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_bonds_type_submitted ON bonds (bond_type, date_submitted DESC, id DESC)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Hot queries and the indexes their plans must use
+HOT_QUERIES = [
+    ("portfolio_stats", STATS_SQL, {}, [
+        "SEARCH s USING PRIMARY KEY",
+        "idx_payroll_reports_program_status_due",
+    ]),
+    ("program_stats", PROGRAM_STATS_SQL, {"program_id": ""}, [
+        "SEARCH s USING PRIMARY KEY",
+        "idx_payroll_reports_program_status_due",
+    ]),
+    ("upcoming_deadlines", UPCOMING_DEADLINES_SQL, {}, [
+        "idx_payroll_reports_status_due",
+    ]),
+    ("program_stream", STREAM_SQL, {}, [
+        "idx_programs_project_name",
+        "SEARCH s USING PRIMARY KEY",
+        "idx_payroll_reports_program_status_due",
+    ]),
+    ("unparsed_dimensions", UNPARSED_DIMENSIONS_SQL, {}, [
+        "idx_program_dimensions_unparsed",
+    ]),
+]
+
+
+def current_version(db: WrapupDatabase) -> int:
+    """Return the highest applied migration version (0 for a fresh database)."""
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT NOT NULL
+        )
+    """)
+    row = db.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database is behind LATEST_VERSION and migrating it was not asked for."""
+
+
+def applied_version(db: WrapupDatabase) -> int:
+    """Return the highest applied migration version without creating schema_version."""
+    exists = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'").fetchone()
+    if exists is None:
+        return 0
+    return db.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+
+
+def require_schema(db: WrapupDatabase, apply: bool = False) -> List[int]:
+    """Make sure db is at LATEST_VERSION; return the migrations applied.
+
+    Readers and syncs of an external database call this instead of
+    migrate(): without apply, a database that is behind raises
+    SchemaOutOfDate and is left untouched, since some migrations rewrite
+    rows (version 2 drops duplicate enrollment docs).
+    """
+    version = applied_version(db)
+    if version >= LATEST_VERSION:
+        return []
+    if not apply:
+        raise SchemaOutOfDate(f"{db.db_path} is at schema version {version}, these tools need {LATEST_VERSION} - "
+                              f"run 'python3 migrations.py --db-path {db.db_path}' or pass --migrate")
+    return migrate(db)
+
+
+def migrate(db: WrapupDatabase, target: int = LATEST_VERSION) -> List[int]:
+    """Apply pending migrations up to target, each in its own transaction."""
+    applied = []
+    version = current_version(db)
+
+    for number, description, statements in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+
+        with db.transaction() as conn:
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (number, description, datetime.utcnow().isoformat() + 'Z')
+            )
+        applied.append(number)
+
+    if applied:
+        db.execute("PRAGMA optimize")
+
+    return applied
+
+
+def next_deadline_probe() -> bool:
+    """Run NEXT_DEADLINE_PROBE in memory; True when this SQLite returns migration 7's wrong next_deadline."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.executescript(NEXT_DEADLINE_PROBE)
+        due = conn.execute("SELECT MIN(due_date) FROM payroll_reports "
+                           "WHERE program_id = 'P' AND status IN ('pending', 'overdue')").fetchone()[0]
+    finally:
+        conn.close()
+    return due != '2026-07-01'
+
+
+def check_query_plans(db: WrapupDatabase) -> List[Dict]:
+    """Run EXPLAIN QUERY PLAN on the hot queries and confirm their indexes are used."""
+    results = []
+    for name, sql, params, indexes in HOT_QUERIES:
+        plan = [row[3] for row in db.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+        plan_text = "\n".join(plan)
+        missing = [index for index in indexes if index not in plan_text]
+        results.append({
+            'query': name,
+            'plan': plan,
+            'missing_indexes': missing,
+            'ok': not missing
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Schema Migrations')
+    parser.add_argument('--db-path', required=True, help='Path to wrap-up manager database')
+    parser.add_argument('--status', action='store_true', help='Show the applied schema version only')
+    parser.add_argument('--explain', action='store_true', help='Check that hot queries use their indexes')
+    parser.add_argument('--check-stats', action='store_true', help='Rebuild program_stats from scratch and diff it against the maintained table')
+    parser.add_argument('--rebuild-stats', action='store_true', help='Replace program_stats with a from-scratch rebuild')
+
+    args = parser.parse_args()
+    db = get_database(args.db_path)
+
+    if args.status:
+        print(f"Schema version: {applied_version(db)} (latest {LATEST_VERSION})")
+        return
+
+    applied = migrate(db)
+    if applied:
+        print(f"✅ Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print(f"✅ Schema is up to date (version {LATEST_VERSION})")
+
+    if args.explain:
+        results = check_query_plans(db)
+        print("\n🔍 QUERY PLANS")
+        print("=" * 40)
+        for result in results:
+            icon = '✅' if result['ok'] else '❌'
+            print(f"{icon} {result['query']}")
+            for line in result['plan']:
+                print(f"     {line}")
+            if result['missing_indexes']:
+                print(f"     missing: {', '.join(result['missing_indexes'])}")
+        if not all(result['ok'] for result in results):
+            sys.exit(1)
+
+    if args.check_stats:
+        with db.snapshot() as conn:
+            differences = check_program_stats(conn)
+        print("\n🔍 PROGRAM STATS CHECK")
+        print("=" * 40)
+        if next_deadline_probe():
+            print(f"ℹ️  SQLite {sqlite3.sqlite_version} returns the wrong status IN next_deadline minimum "
+                  f"(migration 10 works around it)")
+        if differences:
+            for difference in differences[:20]:
+                print(f"❌ {difference['program_id']}")
+                print(f"     maintained: {difference['maintained']}")
+                print(f"     rebuilt:    {difference['rebuilt']}")
+            if len(differences) > 20:
+                print(f"   ... and {len(differences) - 20} more")
+            print(f"❌ {len(differences)} programs differ - run --rebuild-stats")
+            sys.exit(1)
+        print("✅ program_stats matches a from-scratch rebuild")
+
+    if args.rebuild_stats:
+        count = rebuild_program_stats(db)
+        print(f"✅ Rebuilt program_stats ({count} programs)")
+
+
+if __name__ == '__main__':
+    main()
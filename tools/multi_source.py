@@ -0,0 +1,135 @@
+"""
+Multi-Database Sources for Fan-Out Syncs
+========================================
+Names, namespaces and merges the per-region wrap-up databases that
+data-sync.py --sources reads side by side.
+
+A source is one wrap-up database with a short name. resolve_sources()
+expands paths, shell-style globs and explicit name=path pairs; a
+database's name defaults to its file stem, or to its directory for the
+usual <region>/wrapup.db layout. Program ids are only unique within a
+database, so merged output carries them as "<source>:<id>" and keeps the
+source name on every row.
+
+Each source is read and scored on its own (data-sync.py does that in a
+process pool) and comes back as a SourceResult whose programs are already
+in project name order. merge_programs() interleaves those lists into the
+order a single database would have produced, so alerts and summaries
+computed over the merge are the same as for one combined database.
+"""
+
+import glob
+import heapq
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+NAMESPACE_SEPARATOR = ':'
+
+# Source names end up in program ids and detail file paths
+SOURCE_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+
+
+@dataclass(frozen=True)
+class Source:
+    """One wrap-up database in a fan-out sync."""
+    name: str
+    db_path: str
+
+
+@dataclass
+class SourceResult:
+    """What a worker read from one source: scored program rows and how it went."""
+    source: Source
+    programs: List[Dict[str, Any]] = field(default_factory=list)
+    detail_errors: Dict[str, str] = field(default_factory=dict)
+    synced_at: Optional[str] = None
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    def provenance(self) -> Dict[str, Any]:
+        """The source's entry in the merged dashboard's "sources" list."""
+        entry = {
+            'name': self.source.name,
+            'db_path': self.source.db_path,
+            'programs': len(self.programs),
+            'detail_errors': len(self.detail_errors),
+            'synced_at': self.synced_at,
+            'seconds': round(self.seconds, 3),
+        }
+        if self.error:
+            entry['error'] = self.error
+        return entry
+
+
+def _default_name(path: Path) -> str:
+    if path.stem == 'wrapup' and path.parent.name:
+        return path.parent.name
+    return path.stem
+
+
+def resolve_sources(specs: Sequence[str]) -> List[Source]:
+    """Expand database paths, globs and name=path pairs into uniquely named sources.
+
+    Raises ValueError for a pattern that matches nothing, a missing file,
+    an invalid name or two sources with the same name.
+    """
+    sources = []
+    seen_paths = set()
+    for spec in specs:
+        name, separator, pattern = spec.partition('=')
+        if not separator:
+            name, pattern = None, spec
+        pattern = os.path.expanduser(pattern)
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise ValueError(f"no databases match {pattern}")
+        if name and len(matches) > 1:
+            raise ValueError(f"{spec}: a named source must be a single database")
+
+        for match in matches:
+            path = Path(match)
+            if not path.is_file():
+                raise ValueError(f"database not found: {match}")
+            if path.resolve() in seen_paths:
+                continue
+            seen_paths.add(path.resolve())
+            sources.append(Source(name or _default_name(path), str(path)))
+
+    names = [source.name for source in sources]
+    for source in sources:
+        if not SOURCE_NAME.match(source.name):
+            raise ValueError(f"invalid source name {source.name!r} for {source.db_path} "
+                             "(letters, digits, '.', '_' and '-'; use name=path)")
+        if names.count(source.name) > 1:
+            raise ValueError(f"two databases are named {source.name!r}; name them with name=path")
+    return sources
+
+
+def namespace_id(source: str, program_id: str) -> str:
+    """The merged, globally unique id of a program from source."""
+    return f"{source}{NAMESPACE_SEPARATOR}{program_id}"
+
+
+def split_id(namespaced_id: str) -> Tuple[str, str]:
+    """(source, program id) for a merged program id."""
+    source, _, program_id = namespaced_id.partition(NAMESPACE_SEPARATOR)
+    return source, program_id
+
+
+def namespace_program(source: str, program: Dict[str, Any]) -> Dict[str, Any]:
+    """Tag a program row (or detail document) with its source and namespaced id, in place."""
+    program['id'] = namespace_id(source, program['id'])
+    program['source'] = source
+    return program
+
+
+def merge_programs(results: Sequence[SourceResult]) -> List[Dict[str, Any]]:
+    """Interleave per-source programs, each in project name order, into one list in that order.
+
+    Equal names keep source order, so the merge is deterministic.
+    """
+    return list(heapq.merge(*(result.programs for result in results),
+                            key=lambda program: program['project_name'] or ''))
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Synthetic Portfolio Generator
+=============================
+Builds seeded wrap-up databases at portfolio scale for benchmarking.
+
+Features:
+- 1k, 10k and 100k program presets (or any program count)
+- Same seed and as-of date produce the same database, row for row
+- Monthly payroll reports over each program's life, submitted, late or upcoming
+- Enrollment documents whose completion tracks the program's enrollment status
+- Addresses in the states the rate tables cover
+- Rows go through the normal schema, indexes and triggers via migrations.py
+
+Usage:
+    python3 portfolio_generator.py --programs 10k --out /tmp/wrapup_10k.db
+    python3 portfolio_generator.py --programs 100k --seed 7 --as-of 2026-06-01 --out /tmp/wrapup_100k.db
+"""
+
+import argparse
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from migrations import migrate
+from wrapup_db import WrapupDatabase
+
+# Bump when the generated rows change so cached benchmark databases are rebuilt
+GENERATOR_VERSION = 1
+
+SIZES = {'1k': 1000, '10k': 10000, '100k': 100000}
+BATCH_PROGRAMS = 1000
+
+STATUS_WEIGHTS = [('active', 45), ('enrolled', 25), ('pending', 20), ('completed', 10)]
+TYPE_WEIGHTS = [('OCIP', 65), ('CCIP', 35)]
+DOCUMENT_TYPES = ['enrollment_form', 'insurance_verification', 'loss_history', 'waiver_request', 'certificate_of_insurance']
+
+# Share of documents completed, by enrollment status
+DOC_COMPLETION = {'active': 0.9, 'enrolled': 0.8, 'pending': 0.3, 'completed': 1.0}
+
+PLACES = [
+    ('Dallas', 'TX'), ('Houston', 'TX'), ('Austin', 'TX'), ('Phoenix', 'AZ'), ('Tucson', 'AZ'),
+    ('Los Angeles', 'CA'), ('San Diego', 'CA'), ('Sacramento', 'CA'), ('Denver', 'CO'), ('Miami', 'FL'),
+    ('Orlando', 'FL'), ('Atlanta', 'GA'), ('Chicago', 'IL'), ('Indianapolis', 'IN'), ('Louisville', 'KY'),
+    ('New Orleans', 'LA'), ('Boston', 'MA'), ('Baltimore', 'MD'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+    ('Kansas City', 'MO'), ('Charlotte', 'NC'), ('Omaha', 'NE'), ('Newark', 'NJ'), ('Albuquerque', 'NM'),
+    ('Las Vegas', 'NV'), ('New York', 'NY'), ('Oklahoma City', 'OK'), ('Portland', 'OR'), ('Philadelphia', 'PA'),
+    ('Nashville', 'TN'), ('Salt Lake City', 'UT'), ('Richmond', 'VA'), ('Charleston', 'WV'), ('Boise', 'ID'),
+]
+NAME_PREFIXES = ['Riverside', 'Metro', 'Lakeshore', 'Summit', 'Harbor', 'Cedar Ridge', 'Northgate', 'Union Station',
+                 'Westfield', 'Pinecrest', 'Canyon View', 'Eastport', 'Heritage', 'Parkview', 'Bayfront', 'Granite']
+NAME_KINDS = ['Office Complex', 'Medical Center', 'Healthcare Campus', 'Industrial Park Expansion', 'Transit Hub',
+              'Mixed-Use Development', 'Distribution Center', 'High School', 'University Housing', 'Data Center',
+              'Airport Terminal', 'Civic Center', 'Senior Living', 'Hotel Tower', 'Water Treatment Plant']
+PHASES = ['', '', '', ' Phase II', ' Phase III', ' Expansion']
+STREETS = ['Main St', 'Oak Ave', 'Industrial Way', 'Commerce Blvd', 'Medical Center Dr', 'Riverside Dr',
+           'Market St', 'Airport Rd', 'Park Ave', 'Lake Dr']
+FIRST_NAMES = ['Sarah', 'Mike', 'Jennifer', 'David', 'Maria', 'James', 'Priya', 'Robert', 'Linda', 'Carlos']
+LAST_NAMES = ['Chen', 'Rodriguez', 'Walsh', 'Kumar', 'Johnson', 'Nguyen', 'Patel', 'Okafor', 'Miller', 'Garcia']
+
+
+@dataclass
+class GeneratedCounts:
+    programs: int = 0
+    payroll_reports: int = 0
+    enrollment_docs: int = 0
+    seconds: float = 0.0
+
+
+def parse_size(value: str) -> int:
+    """A preset name (1k, 10k, 100k) or a plain program count."""
+    if value in SIZES:
+        return SIZES[value]
+    count = int(value)
+    if count < 1:
+        raise ValueError("program count must be at least 1")
+    return count
+
+
+def _weighted(rng: random.Random, weights: List[Tuple[str, int]]) -> str:
+    return rng.choices([value for value, _ in weights], [weight for _, weight in weights])[0]
+
+
+def _month_shift(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, min(day.day, 28))
+
+
+def _program_rows(rng: random.Random, index: int, as_of: date) -> Tuple[Tuple, List[Tuple], List[Tuple]]:
+    """One program with its payroll reports and enrollment documents."""
+    program_id = f"WU-{as_of.year}-{index + 1:06d}"
+    status = _weighted(rng, STATUS_WEIGHTS)
+    city, state = rng.choice(PLACES)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    contract_value = round(min(max(rng.lognormvariate(14.8, 0.6), 250000), 40000000), -3)
+
+    # Pending programs have not started; completed ones finished in the past
+    if status == 'pending':
+        started_months_ago = -rng.randint(0, 3)
+    elif status == 'completed':
+        started_months_ago = rng.randint(12, 36)
+    else:
+        started_months_ago = rng.randint(1, 24)
+    duration_months = rng.randint(8, 30) if status != 'completed' else rng.randint(6, started_months_ago - 1)
+    start = _month_shift(as_of.replace(day=1), -started_months_ago)
+    completion = _month_shift(start, duration_months) + timedelta(days=rng.randint(0, 27))
+
+    program = (
+        program_id,
+        f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_KINDS)}{rng.choice(PHASES)} {index + 1}",
+        f"{rng.randint(100, 9999)} {rng.choice(STREETS)}, {city} {state}",
+        _weighted(rng, TYPE_WEIGHTS),
+        status,
+        round(rng.uniform(2.5, 5.0), 1),
+        contract_value,
+        completion.isoformat(),
+        f"{first} {last}",
+        f"{first[0].lower()}.{last.lower()}@example.com",
+    )
+
+    # Monthly payroll reports from the start through the next month (or completion)
+    reports = []
+    due_day = rng.choice([1, 10, 15, 20])
+    last_month = _month_shift(as_of.replace(day=1), 1) if status != 'completed' else completion
+    due = start.replace(day=due_day)
+    monthly_payroll = contract_value * rng.uniform(0.002, 0.01)
+    while due <= last_month and status != 'pending':
+        if due > as_of:
+            reports.append((program_id, due.isoformat(), 'pending', 0, None))
+        else:
+            roll = rng.random()
+            amount = round(monthly_payroll * rng.uniform(0.6, 1.4))
+            if roll < 0.85 or (as_of - due).days > 120:
+                submitted = due + timedelta(days=rng.randint(-7, 10))
+                reports.append((program_id, due.isoformat(), 'submitted', amount, submitted.isoformat()))
+            elif roll < 0.93:
+                reports.append((program_id, due.isoformat(), 'overdue', amount, None))
+            else:
+                reports.append((program_id, due.isoformat(), 'pending', amount, None))
+        due = _month_shift(due, 1)
+
+    docs = []
+    completion_rate = DOC_COMPLETION[status]
+    for document_type in DOCUMENT_TYPES[:rng.randint(2, len(DOCUMENT_TYPES))]:
+        if rng.random() < completion_rate:
+            submitted = start - timedelta(days=rng.randint(5, 60))
+            docs.append((program_id, document_type, 'completed', submitted.isoformat()))
+        else:
+            docs.append((program_id, document_type, rng.choice(['pending', 'not_started']), None))
+
+    return program, reports, docs
+
+
+def iter_portfolio(programs: int, seed: int = 42,
+                   as_of: Optional[date] = None) -> Iterator[Tuple[Tuple, List[Tuple], List[Tuple]]]:
+    """Yield (program, payroll reports, documents) for a seeded portfolio."""
+    rng = random.Random(f"{seed}:{GENERATOR_VERSION}")
+    as_of = as_of or date.today()
+    for index in range(programs):
+        yield _program_rows(rng, index, as_of)
+
+
+def generate_portfolio(db_path: str, programs: int, seed: int = 42, as_of: Optional[date] = None) -> GeneratedCounts:
+    """Create a database at db_path holding a generated portfolio.
+
+    The file must not already exist. Rows are inserted in batches of
+    BATCH_PROGRAMS programs per transaction, after the migrations, so the
+    change log and program_stats triggers fill in as they would for live
+    writes.
+    """
+    if Path(db_path).exists():
+        raise FileExistsError(f"{db_path} already exists")
+
+    start = time.perf_counter()
+    counts = GeneratedCounts()
+    db = WrapupDatabase(db_path)
+    try:
+        migrate(db)
+        batch = []
+        for rows in iter_portfolio(programs, seed, as_of):
+            batch.append(rows)
+            if len(batch) == BATCH_PROGRAMS:
+                _insert_batch(db, batch, counts)
+                batch = []
+        if batch:
+            _insert_batch(db, batch, counts)
+        db.execute("ANALYZE")
+    finally:
+        db.close()
+    counts.seconds = time.perf_counter() - start
+    return counts
+
+
+def _insert_batch(db: WrapupDatabase, batch: List, counts: GeneratedCounts):
+    with db.transaction() as conn:
+        conn.executemany("""
+            INSERT INTO programs
+            (id, project_name, project_address, program_type, enrollment_status, bid_deduct_pct, contract_value,
+             estimated_completion, contact_name, contact_email)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [program for program, _, _ in batch])
+        conn.executemany("""
+            INSERT INTO payroll_reports (program_id, due_date, status, payroll_amount, submitted_date)
+            VALUES (?, ?, ?, ?, ?)
+        """, [report for _, reports, _ in batch for report in reports])
+        conn.executemany("""
+            INSERT INTO enrollment_docs (program_id, document_type, status, submitted_date)
+            VALUES (?, ?, ?, ?)
+        """, [doc for _, _, docs in batch for doc in docs])
+    counts.programs += len(batch)
+    counts.payroll_reports += sum(len(reports) for _, reports, _ in batch)
+    counts.enrollment_docs += sum(len(docs) for _, _, docs in batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Synthetic Portfolio Generator')
+    parser.add_argument('--programs', default='1k', help='Program count or preset: ' + ', '.join(SIZES))
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--as-of', help='Date the portfolio is generated around (YYYY-MM-DD, default today)')
+    parser.add_argument('--out', required=True, help='Database file to create')
+
+    args = parser.parse_args()
+
+    try:
+        programs = parse_size(args.programs)
+        as_of = date.fromisoformat(args.as_of) if args.as_of else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        counts = generate_portfolio(args.out, programs, args.seed, as_of)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ Generated {counts.programs:,} programs, {counts.payroll_reports:,} payroll reports and "
+          f"{counts.enrollment_docs:,} enrollment docs in {counts.seconds:.1f}s")
+    print(f"   Database: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
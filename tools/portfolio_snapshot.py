@@ -0,0 +1,343 @@
+"""
+Portfolio Snapshot for OCIP/CCIP Tools
+======================================
+Computes per-program compliance inputs for the whole portfolio at once.
+
+Both data-sync.py and compliance-reporter.py need the same figures for every
+program: enrollment doc totals, completed docs, overdue payroll reports,
+pending reports that are past due, and the next open deadline. Triggers
+keep those figures in the program_stats table (migrations.py, version 7),
+so load_program_stats() reads one row per program instead of aggregating
+the doc and report tables. iter_program_rows() streams the same figures row
+by row for pipelines that must not hold the portfolio.
+
+Only "pending and past due" depends on today's date, so it cannot be
+materialized. program_stats keeps the earliest pending due date instead;
+when that date has not passed the count is zero, and otherwise it is one
+range seek on the payroll report index. For the same reason every row also
+carries score_changes_on, the day the next pending report falls past due,
+so caches know when a score goes stale without any row changing (see
+score_cache.py). check_program_stats() rebuilds the
+table from scratch and diffs it against the maintained copy.
+
+PortfolioSnapshot reads all of it once, in one read transaction, for a
+process that runs several reports and sync outputs (wrapup.py): every
+consumer then shares the same rows instead of querying again.
+"""
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from change_capture import latest_seq
+from instrumentation import metrics
+from wrapup_db import WrapupDatabase, fetch_rows
+
+
+@dataclass(frozen=True)
+class ProgramStats:
+    """Compliance inputs for a single program."""
+    total_docs: int = 0
+    completed_docs: int = 0
+    overdue_reports: int = 0
+    actually_overdue: int = 0
+    next_deadline: str = ""
+    score_changes_on: str = ""  # UTC date a pending report next becomes past due ('' if none)
+
+
+EMPTY_STATS = ProgramStats()
+
+
+# Pending reports past due for a program whose earliest pending due date
+# has passed; every other program has none without touching payroll_reports.
+_ACTUALLY_OVERDUE = """
+    CASE WHEN s.next_pending_due < date('now') THEN
+        (SELECT COUNT(*) FROM payroll_reports
+         WHERE program_id = s.program_id AND status = 'pending'
+         AND due_date < date('now'))
+    ELSE 0 END
+"""
+
+# The day after the first pending due date that has not yet passed, when
+# _ACTUALLY_OVERDUE next changes on its own
+_SCORE_CHANGES_ON = """
+    date(CASE WHEN s.next_pending_due IS NULL THEN NULL
+              WHEN s.next_pending_due >= date('now') THEN s.next_pending_due
+              ELSE (SELECT MIN(due_date) FROM payroll_reports
+                    WHERE program_id = s.program_id AND status = 'pending'
+                    AND due_date >= date('now'))
+         END, '+1 day')
+"""
+
+STATS_SQL = f"""
+    SELECT p.id AS program_id,
+           COALESCE(s.total_docs, 0) AS total_docs,
+           COALESCE(s.completed_docs, 0) AS completed_docs,
+           COALESCE(s.overdue_reports, 0) AS overdue_reports,
+           COALESCE({_ACTUALLY_OVERDUE}, 0) AS actually_overdue,
+           COALESCE(s.next_deadline, '') AS next_deadline,
+           COALESCE({_SCORE_CHANGES_ON}, '') AS score_changes_on
+    FROM programs p
+    LEFT JOIN program_stats s ON s.program_id = p.id
+"""
+
+# One program's stats: a primary key fetch on program_stats
+PROGRAM_STATS_SQL = f"""
+    SELECT :program_id AS program_id,
+           COALESCE(s.total_docs, 0) AS total_docs,
+           COALESCE(s.completed_docs, 0) AS completed_docs,
+           COALESCE(s.overdue_reports, 0) AS overdue_reports,
+           COALESCE({_ACTUALLY_OVERDUE}, 0) AS actually_overdue,
+           COALESCE(s.next_deadline, '') AS next_deadline,
+           COALESCE({_SCORE_CHANGES_ON}, '') AS score_changes_on
+    FROM (SELECT :program_id AS id) p
+    LEFT JOIN program_stats s ON s.program_id = p.id
+"""
+
+# One row per program in name order with its stats (and last change time
+# from program_changes), so SQLite streams rows off the name index.
+STREAM_SQL = f"""
+    SELECT p.*,
+           COALESCE(s.total_docs, 0) AS _stat_total_docs,
+           COALESCE(s.completed_docs, 0) AS _stat_completed_docs,
+           COALESCE(s.overdue_reports, 0) AS _stat_overdue_reports,
+           COALESCE({_ACTUALLY_OVERDUE}, 0) AS _stat_actually_overdue,
+           COALESCE(s.next_deadline, '') AS _stat_next_deadline,
+           COALESCE({_SCORE_CHANGES_ON}, '') AS _stat_score_changes_on,
+           pc.changed_at AS _stat_changed_at
+    FROM programs p
+    LEFT JOIN program_stats s ON s.program_id = p.id
+    LEFT JOIN program_changes pc ON pc.program_id = p.id
+    ORDER BY p.project_name
+"""
+
+PROGRAM_STATS_COLUMNS = ('total_docs', 'completed_docs', 'overdue_reports', 'next_pending_due', 'next_deadline')
+
+# program_stats computed from scratch with grouped scans, independent of the
+# triggers; used to backfill the table and to check the maintained copy.
+PROGRAM_STATS_REBUILD_SQL = """
+    SELECT p.id AS program_id,
+           COALESCE(d.total_docs, 0) AS total_docs,
+           COALESCE(d.completed_docs, 0) AS completed_docs,
+           COALESCE(r.overdue_reports, 0) AS overdue_reports,
+           r.next_pending_due AS next_pending_due,
+           COALESCE(r.next_deadline, '') AS next_deadline
+    FROM programs p
+    LEFT JOIN (
+        SELECT program_id,
+               COUNT(*) AS total_docs,
+               SUM(status = 'completed') AS completed_docs
+        FROM enrollment_docs
+        GROUP BY program_id
+    ) d ON d.program_id = p.id
+    LEFT JOIN (
+        SELECT program_id,
+               SUM(status = 'overdue') AS overdue_reports,
+               MIN(CASE WHEN status = 'pending' THEN due_date END) AS next_pending_due,
+               MIN(CASE WHEN status IN ('pending', 'overdue') THEN due_date END) AS next_deadline
+        FROM payroll_reports
+        GROUP BY program_id
+    ) r ON r.program_id = p.id
+"""
+
+# Open payroll reports due in the next 14 days. Comparing the raw ISO
+# due_date (rather than date(due_date)) keeps the predicate sargable.
+UPCOMING_DEADLINES_SQL = """
+    SELECT pr.*, p.project_name, p.program_type 
+    FROM payroll_reports pr
+    JOIN programs p ON pr.program_id = p.id
+    WHERE pr.status IN ('pending', 'overdue')
+    AND pr.due_date >= date('now') AND pr.due_date < date('now', '+15 days')
+    ORDER BY pr.due_date, pr.id
+"""
+
+# The earliest open payroll report due after that window; its deadline
+# alert appears 14 days before it is due. One MIN per status, so each is
+# the first entry of idx_payroll_reports_status_due past the window.
+NEXT_WINDOW_DUE_SQL = """
+    SELECT MIN(due) FROM (
+        SELECT MIN(due_date) AS due FROM payroll_reports
+        WHERE status = 'pending' AND due_date >= date('now', '+15 days')
+        UNION ALL
+        SELECT MIN(due_date) FROM payroll_reports
+        WHERE status = 'overdue' AND due_date >= date('now', '+15 days')
+    )
+"""
+
+
+def load_program_stats(conn: sqlite3.Connection, program_id: Optional[str] = None) -> Dict[str, ProgramStats]:
+    """Load compliance inputs for every program (or just one) keyed by program id."""
+    if program_id is None:
+        rows = conn.execute(STATS_SQL).fetchall()
+    else:
+        rows = conn.execute(PROGRAM_STATS_SQL, {"program_id": program_id}).fetchall()
+
+    return {
+        row[0]: ProgramStats(
+            total_docs=row[1],
+            completed_docs=row[2],
+            overdue_reports=row[3],
+            actually_overdue=row[4],
+            next_deadline=row[5],
+            score_changes_on=row[6],
+        )
+        for row in rows
+    }
+
+
+def iter_program_rows(conn: sqlite3.Connection) -> Iterator[Tuple[Dict, ProgramStats, Optional[str]]]:
+    """Yield (program columns, stats, last change time) for every program in name order."""
+    cursor = conn.execute(STREAM_SQL)
+    columns = [column[0] for column in cursor.description]
+    program_columns = [i for i, name in enumerate(columns) if not name.startswith('_stat_')]
+    stat_start = len(program_columns)
+
+    for row in fetch_rows(cursor):
+        program = {columns[i]: row[i] for i in program_columns}
+        stats = ProgramStats(
+            total_docs=row[stat_start],
+            completed_docs=row[stat_start + 1],
+            overdue_reports=row[stat_start + 2],
+            actually_overdue=row[stat_start + 3],
+            next_deadline=row[stat_start + 4],
+            score_changes_on=row[stat_start + 5],
+        )
+        yield program, stats, row[stat_start + 6]
+
+
+class PortfolioSnapshot:
+    """Every program row, its stats and the upcoming deadlines, loaded once on first use.
+
+    rows() is what iter_program_rows() yields, as a list in name order;
+    upcoming_deadlines() is UPCOMING_DEADLINES_SQL and next_window_due()
+    NEXT_WINDOW_DUE_SQL. All of them come from the same read transaction,
+    and synced_seq is the change log position it saw. Scores are left to each consumer: data-sync.py and
+    compliance-reporter.py count past-due reports differently.
+    Consumers must copy a row before changing it.
+    """
+
+    def __init__(self, db: WrapupDatabase):
+        self.db = db
+        self.synced_seq: Optional[int] = None
+        self._rows: Optional[List[Tuple[Dict, ProgramStats, Optional[str]]]] = None
+        self._deadlines: Optional[List[Dict]] = None
+        self._next_window_due: Optional[str] = None
+        self._by_id: Optional[Dict[str, Tuple[Dict, ProgramStats]]] = None
+
+    def _load(self):
+        with self.db.snapshot() as conn, metrics.span("snapshot.load"):
+            self._rows = list(iter_program_rows(conn))
+            self._deadlines = [dict(row) for row in conn.execute(UPCOMING_DEADLINES_SQL)]
+            self._next_window_due = conn.execute(NEXT_WINDOW_DUE_SQL).fetchone()[0]
+            self.synced_seq = latest_seq(conn)
+        metrics.count("snapshot.programs", len(self._rows))
+
+    @property
+    def loaded(self) -> bool:
+        return self._rows is not None
+
+    def rows(self) -> List[Tuple[Dict, ProgramStats, Optional[str]]]:
+        """(program columns, stats, last change time) for every program in name order."""
+        if self._rows is None:
+            self._load()
+        return self._rows
+
+    def upcoming_deadlines(self) -> List[Dict]:
+        """Open payroll reports due in the next 14 days, with program name and type."""
+        if self._rows is None:
+            self._load()
+        return self._deadlines
+
+    def next_window_due(self) -> Optional[str]:
+        """Due date of the first open payroll report after the 14-day window, or None."""
+        if self._rows is None:
+            self._load()
+        return self._next_window_due
+
+    def program(self, program_id: str) -> Optional[Tuple[Dict, ProgramStats]]:
+        """(program columns, stats) for one program, or None."""
+        if self._by_id is None:
+            self._by_id = {program['id']: (program, stats) for program, stats, _ in self.rows()}
+        return self._by_id.get(program_id)
+
+
+def programs_past_due_since(conn: sqlite3.Connection, since: str) -> Set[str]:
+    """Programs with a pending report that fell past due after since (an ISO timestamp).
+
+    A report due on D counts as past due from midnight UTC starting D + 1,
+    so these are exactly the programs whose score changed on its own since then.
+    """
+    rows = conn.execute("""
+        SELECT DISTINCT program_id FROM payroll_reports
+        WHERE status = 'pending' AND due_date >= date(?) AND due_date < date('now')
+    """, (since,)).fetchall()
+    return {row[0] for row in rows}
+
+
+def check_program_stats(conn: sqlite3.Connection) -> List[Dict]:
+    """Rebuild program_stats from scratch and diff it against the maintained table.
+
+    Returns one entry per disagreeing program with the maintained and
+    rebuilt values (None for a missing row); an empty list means the
+    triggers kept the table exact.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.program_stats_rebuilt")
+    conn.execute("CREATE TEMP TABLE program_stats_rebuilt AS " + PROGRAM_STATS_REBUILD_SQL)
+    try:
+        width = len(PROGRAM_STATS_COLUMNS)
+        rebuilt = ", ".join(f"r.{column}" for column in PROGRAM_STATS_COLUMNS)
+        maintained = ", ".join(f"m.{column}" for column in PROGRAM_STATS_COLUMNS)
+        differs = " OR ".join(f"r.{column} IS NOT m.{column}" for column in PROGRAM_STATS_COLUMNS)
+        rows = conn.execute(f"""
+            SELECT r.program_id, m.program_id IS NOT NULL, 1, {maintained}, {rebuilt}
+            FROM temp.program_stats_rebuilt r
+            LEFT JOIN main.program_stats m ON m.program_id = r.program_id
+            WHERE m.program_id IS NULL OR {differs}
+            UNION ALL
+            SELECT m.program_id, 1, 0, {maintained}, {rebuilt}
+            FROM main.program_stats m
+            LEFT JOIN temp.program_stats_rebuilt r ON r.program_id = m.program_id
+            WHERE r.program_id IS NULL
+            ORDER BY 1
+        """).fetchall()
+
+        return [
+            {
+                "program_id": row[0],
+                "maintained": dict(zip(PROGRAM_STATS_COLUMNS, row[3:3 + width])) if row[1] else None,
+                "rebuilt": dict(zip(PROGRAM_STATS_COLUMNS, row[3 + width:])) if row[2] else None,
+            }
+            for row in rows
+        ]
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.program_stats_rebuilt")
+
+
+def rebuild_program_stats(db: WrapupDatabase) -> int:
+    """Replace program_stats with a from-scratch rebuild; return the row count."""
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM program_stats")
+        conn.execute(f"INSERT INTO program_stats (program_id, {', '.join(PROGRAM_STATS_COLUMNS)}) "
+                     + PROGRAM_STATS_REBUILD_SQL)
+        return conn.execute("SELECT COUNT(*) FROM program_stats").fetchone()[0]
+
+
+def compliance_score(stats: ProgramStats, include_past_due: bool = True) -> int:
+    """Calculate the 0-100 compliance score from a program's stats.
+
+    data-sync.py also penalizes pending reports whose due date has passed;
+    compliance-reporter.py only counts reports already marked overdue.
+    """
+    if stats.total_docs == 0:
+        doc_score = 50  # No docs required yet
+    else:
+        doc_score = (stats.completed_docs / stats.total_docs) * 70
+
+    overdue = stats.overdue_reports
+    if include_past_due:
+        overdue += stats.actually_overdue
+
+    penalty = overdue * 15  # 15 points per overdue report
+    score = max(0, min(100, doc_score + 30 - penalty))
+
+    return int(score)
@@ -0,0 +1,358 @@
+"""
+Atomic JSON Publisher for the Web Portal
+========================================
+Writes api/ JSON files so the portal never serves a half-written file.
+
+Each file is written to a temporary sibling, fsynced and renamed into
+place. Optional minified output, plus precompressed .gz (and .br when the
+brotli package is installed) siblings for the static host. A manifest of
+content hashes lets unchanged files be skipped without rewriting them.
+publish_stream() serializes a document piece by piece, so arrays of any
+length can be written without building them in memory first. One
+publisher may be shared by several threads. Serialization, compression
+and writes are timed as the publish.* stages of the run's metrics.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from instrumentation import metrics
+
+try:
+    import brotli
+except ImportError:  # Optional: .br siblings are skipped without it
+    brotli = None
+
+MANIFEST_NAME = ".publish-manifest.json"
+
+
+@dataclass
+class PublishResult:
+    """Outcome of publishing one file."""
+    path: str
+    content_hash: str
+    bytes_written: int = 0
+    gzip_bytes: int = 0
+    brotli_bytes: int = 0
+    seconds: float = 0.0
+    skipped: bool = False
+
+
+class JsonArray:
+    """Marks a publish_stream() field whose elements are written one at a time."""
+
+    def __init__(self, items: Iterable[Any]):
+        self.items = items
+
+
+def _temp_path(path: Path) -> str:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    os.close(fd)
+    return tmp_path
+
+
+def _replace(tmp_path: str, path: Path):
+    """Move a finished, fsynced temp file over path."""
+    # mkstemp creates 0600 files; keep the existing mode or use a world-readable one
+    mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+    os.chmod(tmp_path, mode)
+    os.replace(tmp_path, path)
+
+
+def _atomic_write(path: Path, payload: bytes):
+    """Write payload to path via fsynced temp file + rename."""
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class _StreamSink:
+    """Writes chunks to temp files for a JSON file and its compressed siblings."""
+
+    def __init__(self, path: Path, compress: bool):
+        self.targets: List[Tuple[str, Path]] = [(_temp_path(path), path)]
+        self.file = open(self.targets[0][0], 'wb')
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.gzip = self.gzip_file = self.brotli = self.brotli_file = None
+
+        if compress:
+            gz_path = path.with_name(path.name + '.gz')
+            self.targets.append((_temp_path(gz_path), gz_path))
+            self.gzip_file = open(self.targets[-1][0], 'wb')
+            self.gzip = gzip.GzipFile(filename='', mode='wb', compresslevel=9,
+                                      fileobj=self.gzip_file, mtime=0)
+            if brotli is not None:
+                br_path = path.with_name(path.name + '.br')
+                self.targets.append((_temp_path(br_path), br_path))
+                self.brotli_file = open(self.targets[-1][0], 'wb')
+                self.brotli = brotli.Compressor(quality=11)
+
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self.file.write(data)
+        self.hash.update(data)
+        self.size += len(data)
+        if self.gzip:
+            self.gzip.write(data)
+        if self.brotli:
+            self.brotli_file.write(self.brotli.process(data))
+
+    def close(self) -> Dict[str, int]:
+        """Flush and fsync every temp file; return the byte size of each."""
+        if self.gzip:
+            self.gzip.close()
+        if self.brotli:
+            self.brotli_file.write(self.brotli.finish())
+
+        sizes = {}
+        for (tmp_path, _), f, name in zip(self.targets, (self.file, self.gzip_file, self.brotli_file),
+                                          ('bytes', 'gzip_bytes', 'brotli_bytes')):
+            f.flush()
+            os.fsync(f.fileno())
+            sizes[name] = f.tell()
+            f.close()
+        return sizes
+
+    def commit(self):
+        for tmp_path, path in self.targets:
+            _replace(tmp_path, path)
+
+    def discard(self):
+        for f in (self.file, self.gzip_file, self.brotli_file):
+            if f is not None and not f.closed:
+                f.close()
+        for tmp_path, _ in self.targets:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+def _fsync_dir(directory: Path):
+    """Persist renames in a directory (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JsonPublisher:
+    """Publishes JSON documents under a root directory."""
+
+    def __init__(self, root: Path, minify: bool = False, compress: bool = True, track_files: bool = True):
+        self.root = Path(root)
+        self.minify = minify
+        self.compress = compress
+        self.track_files = track_files  # Keep per-file results, not just totals
+        self.results: List[PublishResult] = []
+        self._reset_totals()
+        self._manifest_path = self.root / MANIFEST_NAME
+        self._manifest = self._load_manifest()
+        self._dirty_dirs = set()
+        self._lock = threading.Lock()  # Guards totals, results, manifest and dirty dirs
+
+    def _reset_totals(self):
+        self._totals = {'files_written': 0, 'files_skipped': 0, 'bytes_written': 0, 'seconds': 0.0}
+
+    def _record(self, result: PublishResult):
+        with self._lock:
+            if result.skipped:
+                self._totals['files_skipped'] += 1
+            else:
+                self._totals['files_written'] += 1
+                self._totals['bytes_written'] += result.bytes_written + result.gzip_bytes + result.brotli_bytes
+            self._totals['seconds'] += result.seconds
+            if self.track_files:
+                self.results.append(result)
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def serialize(self, data: Any) -> bytes:
+        """Encode data as JSON bytes in the configured style."""
+        if self.minify:
+            return json.dumps(data, separators=(',', ':')).encode('utf-8')
+        return json.dumps(data, indent=2).encode('utf-8')
+
+    def publish(self, path: Path, data: Any) -> PublishResult:
+        """Publish data to path unless an identical file is already there."""
+        start = time.perf_counter()
+        path = Path(path)
+        key = path.relative_to(self.root).as_posix()
+
+        with metrics.span("publish.serialize"):
+            payload = self.serialize(data)
+            content_hash = hashlib.sha256(payload).hexdigest()
+
+        entry = self._manifest.get(key)
+        if entry and entry.get('sha256') == content_hash and path.exists():
+            result = PublishResult(key, content_hash, skipped=True,
+                                   seconds=time.perf_counter() - start)
+            self._record(result)
+            return result
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with metrics.span("publish.write"):
+            _atomic_write(path, payload)
+        result = PublishResult(key, content_hash, bytes_written=len(payload))
+
+        if self.compress:
+            with metrics.span("publish.compress"):
+                gz = gzip.compress(payload, compresslevel=9, mtime=0)
+                br = brotli.compress(payload, quality=11) if brotli is not None else None
+            with metrics.span("publish.write"):
+                _atomic_write(path.with_name(path.name + '.gz'), gz)
+                result.gzip_bytes = len(gz)
+                br_path = path.with_name(path.name + '.br')
+                if br is not None:
+                    _atomic_write(br_path, br)
+                    result.brotli_bytes = len(br)
+                elif br_path.exists():
+                    br_path.unlink()  # Never leave a stale .br next to fresh JSON
+
+        self._mark_published(key, path, result)
+
+        result.seconds = time.perf_counter() - start
+        self._record(result)
+        return result
+
+    def _mark_published(self, key: str, path: Path, result: PublishResult):
+        with self._lock:
+            self._dirty_dirs.add(path.parent)
+            self._manifest[key] = {
+                'sha256': result.content_hash,
+                'bytes': result.bytes_written,
+                'gzip_bytes': result.gzip_bytes,
+                'brotli_bytes': result.brotli_bytes,
+            }
+
+    def publish_stream(self, path: Path, fields: Iterable[Tuple[str, Any]]) -> PublishResult:
+        """Publish a JSON object field by field, byte-identical to publish().
+
+        A field value may be a JsonArray, whose items are serialized as they
+        are produced, or a callable evaluated only when the field is reached.
+        """
+        start = time.perf_counter()
+        path = Path(path)
+        key = path.relative_to(self.root).as_posix()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        sink = _StreamSink(path, self.compress)
+        try:
+            for chunk in self._iter_object(fields):
+                sink.write(chunk)
+            sizes = sink.close()
+        except BaseException:
+            sink.discard()
+            raise
+
+        content_hash = sink.hash.hexdigest()
+        entry = self._manifest.get(key)
+        if entry and entry.get('sha256') == content_hash and path.exists():
+            sink.discard()
+            result = PublishResult(key, content_hash, skipped=True)
+        else:
+            sink.commit()
+            if self.compress and brotli is None:
+                br_path = path.with_name(path.name + '.br')
+                if br_path.exists():
+                    br_path.unlink()  # Never leave a stale .br next to fresh JSON
+            result = PublishResult(key, content_hash, bytes_written=sizes['bytes'],
+                                   gzip_bytes=sizes.get('gzip_bytes', 0),
+                                   brotli_bytes=sizes.get('brotli_bytes', 0))
+            self._mark_published(key, path, result)
+
+        result.seconds = time.perf_counter() - start
+        metrics.observe("publish.stream", result.seconds)
+        self._record(result)
+        return result
+
+    def _iter_object(self, fields: Iterable[Tuple[str, Any]]) -> Iterator[str]:
+        """Yield the text of a top-level object exactly as serialize() would format it."""
+        if self.minify:
+            separator, key_separator, opening, closing = ',', ':', '{', '}'
+        else:
+            separator, key_separator, opening, closing = ',\n  ', ': ', '{\n  ', '\n}'
+
+        yield opening
+        for i, (name, value) in enumerate(fields):
+            if i:
+                yield separator
+            yield json.dumps(name) + key_separator
+            if callable(value):
+                value = value()
+            if isinstance(value, JsonArray):
+                yield from self._iter_array(value.items)
+            else:
+                yield self._nested(value, '  ')
+        yield closing
+
+    def _iter_array(self, items: Iterable[Any]) -> Iterator[str]:
+        """Yield a second-level array one element at a time."""
+        empty = True
+        for item in items:
+            if self.minify:
+                yield ('[' if empty else ',') + self._nested(item, '')
+            else:
+                yield ('[\n    ' if empty else ',\n    ') + self._nested(item, '    ')
+            empty = False
+
+        if empty:
+            yield '[]'
+        else:
+            yield ']' if self.minify else '\n  ]'
+
+    def _nested(self, value: Any, indent: str) -> str:
+        """Serialize a value that starts on a line already indented by indent."""
+        return self.serialize(value).decode('utf-8').replace('\n', '\n' + indent)
+
+    def remove(self, path: Path):
+        """Delete a published file and its compressed siblings."""
+        path = Path(path)
+        for candidate in (path, path.with_name(path.name + '.gz'), path.with_name(path.name + '.br')):
+            if candidate.exists():
+                candidate.unlink()
+        with self._lock:
+            self._manifest.pop(path.relative_to(self.root).as_posix(), None)
+            self._dirty_dirs.add(path.parent)
+
+    def finish(self) -> Dict[str, Any]:
+        """Persist the manifest, fsync touched directories and return this batch's totals."""
+        with self._lock:
+            if self._dirty_dirs:
+                manifest = json.dumps(self._manifest, indent=2, sort_keys=True).encode('utf-8')
+                _atomic_write(self._manifest_path, manifest)
+                self._dirty_dirs.add(self.root)
+                for directory in self._dirty_dirs:
+                    _fsync_dir(directory)
+                self._dirty_dirs = set()
+
+            totals = dict(self._totals, files=self.results)
+            self.results = []
+            self._reset_totals()
+            return totals
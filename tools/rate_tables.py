@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Compiled Rate Tables for Bid Deduct Pricing
+===========================================
+Builds api/rates.json from the canonical rate source and loads it back.
+
+Features:
+- rate_source.json is the one place WC, LDF, EMR, GL and umbrella rates are edited
+- Validation of the source before anything is written
+- Effective WC rates (base x EMR x (1 - LDF)) precomputed per state and class code
+- Compact, versioned artifact read by calculator.html and bid_deduct.py
+- The same table embedded in calculator.html so it prices offline and from file://
+- formulas_and_rates.md regenerated from the same source
+- --check mode that fails when the committed artifacts are stale
+
+Usage:
+    python3 rate_tables.py --build
+    python3 rate_tables.py --check
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ARTIFACT_FORMAT = 1
+SOURCE_PATH = Path(__file__).parent / "rate_source.json"
+WEB_ROOT = Path(__file__).parent.parent
+ARTIFACT_PATH = WEB_ROOT / "api" / "rates.json"
+REFERENCE_PATH = WEB_ROOT / "formulas_and_rates.md"
+CALCULATOR_PATH = WEB_ROOT / "calculator.html"
+EMBEDDED_PREFIX = "const EMBEDDED_RATES = "
+
+
+@dataclass(frozen=True)
+class WcRate:
+    """The WC rate breakdown shown in the calculator's rate box."""
+    class_code: str
+    base_rate: float
+    emr: float
+    ld_factor: float
+    effective_rate: float
+
+
+def validate_source(source: Dict) -> List[str]:
+    """Return a list of problems with a rate source (empty when it is usable)."""
+    errors = []
+    for key in ('version', 'gl_rate', 'umbrella_rate', 'op_rate', 'supply_only_class_code', 'class_codes', 'states'):
+        if key not in source:
+            errors.append(f"missing top-level key: {key}")
+    if errors:
+        return errors
+
+    for key in ('gl_rate', 'umbrella_rate', 'op_rate'):
+        if not isinstance(source[key], (int, float)) or source[key] < 0:
+            errors.append(f"{key} must be a non-negative number")
+
+    for state, entry in source['states'].items():
+        if len(state) != 2 or not state.isupper():
+            errors.append(f"{state}: state must be a two-letter code")
+        if not entry.get('name'):
+            errors.append(f"{state}: missing name")
+        ldf = entry.get('ldf', 0)
+        if not isinstance(ldf, (int, float)) or not 0 <= ldf < 1:
+            errors.append(f"{state}: ldf must be a credit between 0 and 1")
+        emr = entry.get('emr', 1.0)
+        if not isinstance(emr, (int, float)) or emr <= 0:
+            errors.append(f"{state}: emr must be positive")
+        for code, rate in entry.get('wc_rates', {}).items():
+            if code not in source['class_codes']:
+                errors.append(f"{state}: class code {code} has no label in class_codes")
+            if not isinstance(rate, (int, float)) or rate <= 0:
+                errors.append(f"{state}: rate for class code {code} must be positive")
+    return errors
+
+
+def compile_rates(source: Dict) -> Dict:
+    """Compile a validated rate source into the lookup artifact.
+
+    Each state lists its class codes in the calculator's option order
+    (installation codes first, supply only last) with parallel base and
+    effective rate arrays, so a lookup is one index into each.
+    """
+    payload = json.dumps(source, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    supply_only = source['supply_only_class_code']
+
+    states = {}
+    for state in sorted(source['states']):
+        entry = source['states'][state]
+        # Same fallbacks as the calculator: no LDF is no credit, no EMR is 1.0
+        ldf = entry.get('ldf') or 0
+        emr = entry.get('emr') or 1.0
+        wc_rates = entry.get('wc_rates', {})
+        codes = [code for code in wc_rates if code != supply_only]
+        if supply_only in wc_rates:
+            codes.append(supply_only)
+
+        states[state] = {
+            "name": entry['name'],
+            "ldf": ldf,
+            "emr": emr,
+            "codes": codes,
+            "base": [wc_rates[code] for code in codes],
+            "effective": [wc_rates[code] * emr * (1 - ldf) for code in codes],
+        }
+
+    return {
+        "format": ARTIFACT_FORMAT,
+        "version": source['version'],
+        "source": source.get('source', ''),
+        "source_sha256": hashlib.sha256(payload).hexdigest()[:16],
+        "gl_rate": source['gl_rate'],
+        "umbrella_rate": source['umbrella_rate'],
+        "op_rate": source['op_rate'],
+        "supply_only_class_code": supply_only,
+        "class_codes": source['class_codes'],
+        "states": states,
+    }
+
+
+def serialize_artifact(artifact: Dict) -> str:
+    """Minified JSON, one line, as committed to api/rates.json."""
+    return json.dumps(artifact, separators=(',', ':')) + "\n"
+
+
+def embed_in_calculator(html: str, artifact: Dict) -> str:
+    """Replace the EMBEDDED_RATES line in calculator.html with the compiled table."""
+    lines = html.split("\n")
+    matches = [i for i, line in enumerate(lines) if line.lstrip().startswith(EMBEDDED_PREFIX)]
+    if len(matches) != 1:
+        raise ValueError(f"{CALCULATOR_PATH.name} must contain exactly one '{EMBEDDED_PREFIX}...;' line")
+
+    index = matches[0]
+    indent = lines[index][:len(lines[index]) - len(lines[index].lstrip())]
+    # "</" would end the inline <script> early
+    table = json.dumps(artifact, separators=(',', ':')).replace("</", "<\\/")
+    lines[index] = f"{indent}{EMBEDDED_PREFIX}{table};"
+    return "\n".join(lines)
+
+
+def render_reference(source: Dict, artifact: Dict) -> str:
+    """Render formulas_and_rates.md from the source and compiled artifact."""
+    lines = [
+        "<!-- Generated by tools/rate_tables.py from tools/rate_source.json - edit the source, then run --build. -->",
+        "",
+        "# Bid Deduct Formulas and Rates",
+        "",
+        f"Rate table version **{artifact['version']}** (source hash `{artifact['source_sha256']}`).",
+        f"Source: {artifact['source']}",
+        "",
+        "## Formulas",
+        "",
+        "All lines are rounded to whole dollars (halves round up) before they are added.",
+        "",
+        "| Line | Formula |",
+        "|------|---------|",
+        "| Effective WC rate | base rate x EMR x (1 - LDF) |",
+        "| Workers' comp | payroll / 100 x effective WC rate (self-performed labor only) |",
+        f"| General liability | contract value / 1,000 x {artifact['gl_rate']} |",
+        f"| Umbrella / excess | contract value / 1,000 x {artifact['umbrella_rate']} |",
+        "| Subtotal | WC + GL + umbrella |",
+        f"| O&P (optional) | subtotal x {artifact['op_rate']:g} |",
+        "| Total | subtotal + O&P |",
+        "",
+        "## WC Rates by State and Class Code",
+        "",
+        "Rates are per $100 of payroll.",
+        "",
+        "| State | Class code | Description | Base rate | EMR | LDF | Effective rate |",
+        "|-------|------------|-------------|-----------|-----|-----|----------------|",
+    ]
+    for state, entry in artifact['states'].items():
+        for code, base, effective in zip(entry['codes'], entry['base'], entry['effective']):
+            lines.append(f"| {state} | {code} | {artifact['class_codes'][code]} | {base:.3f} | "
+                         f"{entry['emr']:.3f} | {entry['ldf']:.4f} | {effective:.4f} |")
+
+    lines += [
+        "",
+        "## EMR and Large Deductible Factors by State",
+        "",
+        "| State | Name | EMR | LDF | Notes |",
+        "|-------|------|-----|-----|-------|",
+    ]
+    for state, entry in artifact['states'].items():
+        note = source['states'][state].get('note', '')
+        lines.append(f"| {state} | {entry['name']} | {entry['emr']:.3f} | {entry['ldf']:.4f} | {note} |")
+    return "\n".join(lines) + "\n"
+
+
+def build(check: bool = False) -> List[Path]:
+    """Write (or, with check, compare) the artifact and reference page; return stale paths."""
+    with open(SOURCE_PATH) as f:
+        source = json.load(f)
+    errors = validate_source(source)
+    if errors:
+        raise ValueError("invalid rate source:\n  " + "\n  ".join(errors))
+
+    artifact = compile_rates(source)
+    outputs = {
+        ARTIFACT_PATH: serialize_artifact(artifact),
+        REFERENCE_PATH: render_reference(source, artifact),
+        CALCULATOR_PATH: embed_in_calculator(CALCULATOR_PATH.read_text(), artifact),
+    }
+
+    stale = []
+    for path, content in outputs.items():
+        current = path.read_text() if path.exists() else None
+        if current == content:
+            continue
+        stale.append(path)
+        if not check:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_text(content)
+            tmp_path.replace(path)
+    return stale
+
+
+class RateTable:
+    """Lookups over a compiled rate artifact."""
+
+    def __init__(self, artifact: Dict):
+        if artifact.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"unsupported rate artifact format {artifact.get('format')!r}")
+        self.version = artifact['version']
+        self.source_sha256 = artifact['source_sha256']
+        self.gl_rate = artifact['gl_rate']
+        self.umbrella_rate = artifact['umbrella_rate']
+        self.op_rate = artifact['op_rate']
+        self.supply_only_class_code = artifact['supply_only_class_code']
+        self.class_codes = artifact['class_codes']
+        self.states = artifact['states']
+        self._rates = {
+            (state, code): WcRate(code, base, entry['emr'], entry['ldf'], effective)
+            for state, entry in self.states.items()
+            for code, base, effective in zip(entry['codes'], entry['base'], entry['effective'])
+        }
+
+    def class_code_options(self, state: str) -> List[str]:
+        """Class codes the calculator offers for a state, default first."""
+        entry = self.states.get(state)
+        return list(entry['codes']) if entry else []
+
+    def lookup(self, state: str, class_code: str) -> Optional[WcRate]:
+        return self._rates.get((state, class_code))
+
+
+@lru_cache(maxsize=None)
+def load_rate_table(path: Optional[str] = None) -> RateTable:
+    """Load a compiled artifact once per path (default: the portal's api/rates.json)."""
+    artifact_path = Path(path) if path else ARTIFACT_PATH
+    try:
+        with open(artifact_path) as f:
+            return RateTable(json.load(f))
+    except FileNotFoundError:
+        raise FileNotFoundError(f"{artifact_path} not found - run 'python3 rate_tables.py --build'") from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Rate Table Builder')
+    parser.add_argument('--build', action='store_true', help='Compile rate_source.json into api/rates.json, formulas_and_rates.md and calculator.html')
+    parser.add_argument('--check', action='store_true', help='Exit 1 if the compiled artifacts are out of date')
+
+    args = parser.parse_args()
+
+    if not args.build and not args.check:
+        parser.print_help()
+        return
+
+    try:
+        stale = build(check=args.check)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.check:
+        if stale:
+            for path in stale:
+                print(f"❌ {path} is out of date - run 'python3 rate_tables.py --build'")
+            sys.exit(1)
+        print("✅ Rate artifacts are up to date")
+    elif stale:
+        for path in stale:
+            print(f"✅ Wrote {path}")
+    else:
+        print("✅ Rate artifacts already up to date")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+"""
+Streaming Report Renderers for compliance-reporter.py
+=====================================================
+Writes reports as JSON, NDJSON, CSV or HTML while they are produced.
+
+A Report is a name, a title and an iterable of Sections. A section's
+value is any JSON value, a callable evaluated only when the section is
+reached (for totals known once earlier rows have gone by), or Rows: an
+iterator of row dicts rendered one row at a time. Row sources read their
+cursor a fetchmany() batch at a time (wrapup_db.fetch_rows) and park
+secondary lists in a RowSpool on disk, so a report over any portfolio
+size renders in constant memory.
+
+JSON output is exactly json.dumps(collect(report), indent=2). NDJSON has
+one object per row, record or list item, tagged with its section. CSV
+writes one table per section, each headed by a row that starts with
+"section" and separated by a blank line. HTML templates are compiled
+once per process and cached, and so are the row formats per column count.
+"""
+
+import csv
+import html
+import json
+import tempfile
+from functools import lru_cache
+from string import Template
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, TextIO
+
+FORMATS = ['json', 'ndjson', 'csv', 'html']
+
+
+class Rows:
+    """A section of row dicts rendered as they are produced.
+
+    Columns default to the keys of the first row.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]], columns: Optional[Sequence[str]] = None):
+        self._items = iter(items)
+        self._first = None
+        self.columns = list(columns) if columns else None
+        if self.columns is None:
+            self._first = next(self._items, None)
+            self.columns = list(self._first) if self._first else []
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._first is not None:
+            first, self._first = self._first, None
+            yield first
+        yield from self._items
+
+
+class RowSpool:
+    """Rows parked in a temporary file until their section is reached."""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile('w+')
+        self.count = 0
+
+    def write(self, row: Dict[str, Any]):
+        self._file.write(json.dumps(row) + "\n")
+        self.count += 1
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        self._file.seek(0)
+        for line in self._file:
+            yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> 'RowSpool':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Section(NamedTuple):
+    name: str
+    value: Any  # JSON value, Rows, or a callable returning either
+    key: str = 'key'  # Column name for the keys of a dict of records in flat formats
+    flat: Optional[Callable[[Any], Rows]] = None  # Table form of a nested value for flat formats
+
+
+class Report(NamedTuple):
+    name: str
+    title: str
+    sections: Iterable[Section]
+
+
+def report_from_dict(name: str, title: str, data: Dict[str, Any], rows: Sequence[str] = (),
+                     keys: Optional[Dict[str, str]] = None,
+                     flat: Optional[Dict[str, Callable[[Any], Rows]]] = None) -> Report:
+    """A Report over an already built report dict; rows names the list sections."""
+    keys = keys or {}
+    flat = flat or {}
+    return Report(name, title, [
+        Section(field, Rows(value) if field in rows else value, keys.get(field, 'key'), flat.get(field))
+        for field, value in data.items()
+    ])
+
+
+def _resolve(section: Section) -> Any:
+    return section.value() if callable(section.value) else section.value
+
+
+def collect(report: Report) -> Dict[str, Any]:
+    """The report as a plain dict, with every Rows section read into a list."""
+    result = {}
+    for section in report.sections:
+        value = _resolve(section)
+        result[section.name] = list(value) if isinstance(value, Rows) else value
+    return result
+
+
+def _is_records(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and all(isinstance(item, dict) for item in value.values())
+
+
+def _table(section: Section, value: Any) -> Optional[Rows]:
+    """Rows for a section value in flat formats, or None for a scalar."""
+    if isinstance(value, Rows):
+        return value
+    if section.flat is not None and value is not None:
+        return section.flat(value)
+    if _is_records(value):
+        return Rows({section.key: key, **item} for key, item in value.items())
+    if isinstance(value, dict):
+        return Rows(({'field': field, 'value': item} for field, item in value.items()), ['field', 'value'])
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            return Rows(value)
+        return Rows(({'value': item} for item in value), ['value'])
+    return None
+
+
+class Renderer:
+    """Writes a report to a text stream section by section."""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def render(self, report: Report):
+        self.begin(report)
+        count = 0
+        for section in report.sections:
+            self.section(count, section, _resolve(section))
+            count += 1
+        self.end(report, count)
+        self.out.flush()
+
+    def begin(self, report: Report):
+        pass
+
+    def section(self, index: int, section: Section, value: Any):
+        raise NotImplementedError
+
+    def end(self, report: Report, count: int):
+        pass
+
+
+def _nested(value: Any, indent: str) -> str:
+    """Serialize a value that starts on a line already indented by indent."""
+    return json.dumps(value, indent=2).replace('\n', '\n' + indent)
+
+
+class JsonRenderer(Renderer):
+    """One JSON object, formatted exactly as json.dumps(collect(report), indent=2)."""
+
+    def begin(self, report: Report):
+        self.out.write('{')
+
+    def section(self, index: int, section: Section, value: Any):
+        write = self.out.write
+        write((',\n  ' if index else '\n  ') + json.dumps(section.name) + ': ')
+        if not isinstance(value, Rows):
+            write(_nested(value, '  '))
+            return
+        empty = True
+        for row in value:
+            write(('[\n    ' if empty else ',\n    ') + _nested(row, '    '))
+            empty = False
+        write('[]' if empty else '\n  ]')
+
+    def end(self, report: Report, count: int):
+        self.out.write('\n}\n' if count else '}\n')
+
+
+class NdjsonRenderer(Renderer):
+    """One JSON object per line: each row, record or list item, tagged with its section."""
+
+    def section(self, index: int, section: Section, value: Any):
+        write = self.out.write
+        if isinstance(value, Rows) or (isinstance(value, list) and all(isinstance(item, dict) for item in value)):
+            for row in value:
+                write(json.dumps({'section': section.name, **row}) + '\n')
+        elif _is_records(value):
+            for key, item in value.items():
+                write(json.dumps({'section': section.name, section.key: key, **item}) + '\n')
+        elif isinstance(value, dict):
+            write(json.dumps({'section': section.name, **value}) + '\n')
+        elif isinstance(value, list):
+            for item in value:
+                write(json.dumps({'section': section.name, 'value': item}) + '\n')
+        else:
+            write(json.dumps({'section': section.name, 'value': value}) + '\n')
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return '' if value is None else value
+
+
+class CsvRenderer(Renderer):
+    """One table per section with a leading section column, tables separated by a blank line."""
+
+    def __init__(self, out: TextIO):
+        super().__init__(out)
+        self.writer = csv.writer(out, lineterminator='\n')
+
+    def section(self, index: int, section: Section, value: Any):
+        if index:
+            self.out.write('\n')
+        rows = _table(section, value)
+        if rows is None:
+            self.writer.writerow(['section', 'value'])
+            self.writer.writerow([section.name, _csv_cell(value)])
+            return
+        columns = rows.columns
+        self.writer.writerow(['section'] + columns)
+        name = section.name
+        self.writer.writerows([name] + [_csv_cell(row.get(column)) for column in columns] for row in rows)
+
+
+_HTML_TEMPLATES = {
+    'page_start': """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>$title</title>
+<style>
+body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 2rem; color: #1f2937; }
+h1 { color: #1e3a5f; }
+h2 { color: #1e3a5f; border-bottom: 2px solid #e5e7eb; padding-bottom: 0.25rem; margin-top: 2rem; }
+table { border-collapse: collapse; font-size: 0.9rem; }
+th, td { border: 1px solid #e5e7eb; padding: 0.35rem 0.6rem; text-align: left; }
+th { background: #f3f4f6; }
+td.num { text-align: right; font-variant-numeric: tabular-nums; }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+""",
+    'section_start': '<section id="$id">\n<h2>$heading</h2>\n',
+    'section_end': '</section>\n',
+    'table_start': '<table>\n<thead><tr>$headers</tr></thead>\n<tbody>\n',
+    'table_end': '</tbody>\n</table>\n',
+    'value': '<p>$value</p>\n',
+    'page_end': '</body>\n</html>\n',
+}
+
+
+@lru_cache(maxsize=None)
+def html_template(name: str) -> Template:
+    """A compiled page template, built once per process."""
+    return Template(_HTML_TEMPLATES[name])
+
+
+@lru_cache(maxsize=64)
+def _row_format(columns: int) -> str:
+    """str.format pattern for a table row of columns cells."""
+    return '<tr>' + '<td{}>{}</td>' * columns + '</tr>\n'
+
+
+def _html_cell(value: Any) -> tuple:
+    """(class attribute, escaped text) for one table cell."""
+    if isinstance(value, bool) or value is None:
+        return '', '' if value is None else str(value)
+    if isinstance(value, int):
+        return ' class="num"', f"{value:,}"
+    if isinstance(value, float):
+        return ' class="num"', f"{value:,.2f}"
+    if isinstance(value, (dict, list)):
+        return '', html.escape(json.dumps(value))
+    return '', html.escape(str(value))
+
+
+class HtmlRenderer(Renderer):
+    """A standalone HTML page with one table per section."""
+
+    def begin(self, report: Report):
+        self.out.write(html_template('page_start').substitute(title=html.escape(report.title)))
+
+    def section(self, index: int, section: Section, value: Any):
+        write = self.out.write
+        write(html_template('section_start').substitute(
+            id=html.escape(section.name), heading=html.escape(section.name.replace('_', ' ').title())))
+        rows = _table(section, value)
+        if rows is None:
+            write(html_template('value').substitute(value=_html_cell(value)[1]))
+        else:
+            columns = rows.columns
+            headers = ''.join(f"<th>{html.escape(column.replace('_', ' '))}</th>" for column in columns)
+            write(html_template('table_start').substitute(headers=headers))
+            row_format = _row_format(len(columns))
+            for row in rows:
+                write(row_format.format(*[part for column in columns for part in _html_cell(row.get(column))]))
+            write(html_template('table_end').substitute())
+        write(html_template('section_end').substitute())
+
+    def end(self, report: Report, count: int):
+        self.out.write(html_template('page_end').substitute())
+
+
+RENDERERS = {
+    'json': JsonRenderer,
+    'ndjson': NdjsonRenderer,
+    'csv': CsvRenderer,
+    'html': HtmlRenderer,
+}
+
+
+def render(report: Report, output_format: str, out: TextIO):
+    """Write report to out in output_format (one of FORMATS)."""
+    RENDERERS[output_format](out).render(report)
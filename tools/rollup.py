@@ -0,0 +1,273 @@
+"""
+Portfolio Rollups for OCIP/CCIP Financial Views
+===============================================
+GROUP BY aggregation pushed down to SQLite over configurable dimensions.
+
+rollup() runs a single grouped query at the finest requested level -
+program count, contract value, estimated savings and the bid deduct
+total per group - and folds the few resulting rows into a tree with a
+subtotal at every level, so a summary over any portfolio size moves a
+handful of rows into Python instead of every program. Groups sort by
+value, or with order='dashboard' by first appearance in dashboard (project
+name) order, as a grouping loop over the dashboard's program list would
+leave them.
+
+Dimensions are SQL expressions over programs p and program_dimensions d:
+program_type, status (enrollment status), completion_quarter (from
+estimated_completion) and state. The state is parsed from
+project_address in Python and cached in program_dimensions (migrations.py,
+version 8), whose triggers mark a row unparsed when its program is added
+or its address changes; refresh_dimensions() parses only those rows.
+
+top_programs() finds the k programs with the largest estimated savings,
+overall or per group, with a bounded heap over one narrow scan in
+dashboard order, so ties come out exactly as a stable sort would leave them.
+"""
+
+import heapq
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from wrapup_db import WrapupDatabase
+
+US_STATES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California', 'CO': 'Colorado',
+    'CT': 'Connecticut', 'DE': 'Delaware', 'DC': 'District of Columbia', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa', 'KS': 'Kansas',
+    'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland', 'MA': 'Massachusetts',
+    'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri', 'MT': 'Montana',
+    'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey', 'NM': 'New Mexico',
+    'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio', 'OK': 'Oklahoma',
+    'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina', 'SD': 'South Dakota',
+    'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont', 'VA': 'Virginia', 'WA': 'Washington',
+    'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+}
+_STATE_CODES = {name.lower(): code for code, name in US_STATES.items()}
+
+_ZIP_CODE = re.compile(r'\s+\d{5}(?:-\d{4})?$')
+
+_SAVINGS = "COALESCE(p.contract_value, 0) * COALESCE(p.bid_deduct_pct, 0) / 100.0"
+
+# Dimension name -> SQL expression; state needs the program_dimensions join
+DIMENSIONS = {
+    'program_type': "p.program_type",
+    'status': "p.enrollment_status",
+    'completion_quarter': ("strftime('%Y', p.estimated_completion) || '-Q' || "
+                           "((CAST(strftime('%m', p.estimated_completion) AS INTEGER) + 2) / 3)"),
+    'state': "d.state",
+}
+
+# CROSS JOIN keeps program_dimensions outermost, so only the unparsed rows are visited
+UNPARSED_DIMENSIONS_SQL = """
+    SELECT d.program_id, p.project_address
+    FROM program_dimensions d
+    CROSS JOIN programs p ON p.id = d.program_id
+    WHERE d.parsed = 0
+"""
+
+
+@lru_cache(maxsize=65536)
+def parse_state(address: Optional[str]) -> Optional[str]:
+    """The state at the end of an address, as a two-letter code, or None.
+
+    Accepts "..., Dallas TX", "..., Dallas, TX 75201" and "..., Dallas, Texas".
+    """
+    if not address:
+        return None
+    words = _ZIP_CODE.sub('', address.strip().rstrip('.')).replace(',', ' ').split()
+    if words and len(words[-1]) == 2 and words[-1].upper() in US_STATES:
+        return words[-1].upper()
+    for size in (3, 2, 1):
+        code = _STATE_CODES.get(" ".join(words[-size:]).lower())
+        if code:
+            return code
+    return None
+
+
+def refresh_dimensions(db: WrapupDatabase) -> int:
+    """Parse the state of every program whose address is new or changed; return how many.
+
+    Legacy programs tables without project_address leave every state unknown.
+    """
+    with db.transaction() as conn:
+        sql = UNPARSED_DIMENSIONS_SQL
+        if not any(column[1] == 'project_address' for column in conn.execute("PRAGMA table_info(programs)")):
+            sql = sql.replace("p.project_address", "NULL AS project_address")
+        rows = conn.execute(sql).fetchall()
+        conn.executemany("UPDATE program_dimensions SET state = ?, parsed = 1 WHERE program_id = ?",
+                         [(parse_state(address), program_id) for program_id, address in rows])
+    return len(rows)
+
+
+@dataclass
+class RollupGroup:
+    """One group of a rollup and its subtotals; the root holds the portfolio totals."""
+    dimension: Optional[str] = None
+    value: Any = None
+    programs: int = 0
+    contract_value: float = 0.0
+    estimated_savings: float = 0.0
+    bid_deduct_total: float = 0.0
+    first_project: Optional[str] = None  # earliest project name in the group, for dashboard order
+    groups: List['RollupGroup'] = field(default_factory=list)
+
+    @property
+    def avg_bid_deduct(self) -> float:
+        return self.bid_deduct_total / self.programs if self.programs else 0
+
+    @property
+    def savings_percentage(self) -> float:
+        return self.estimated_savings / self.contract_value * 100 if self.contract_value > 0 else 0
+
+    def measures(self) -> Dict[str, Any]:
+        return {
+            'count': self.programs,
+            'contract_value': self.contract_value,
+            'estimated_savings': self.estimated_savings,
+            'avg_bid_deduct': self.avg_bid_deduct,
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The group with its subgroups nested under 'groups'."""
+        result = {self.dimension: self.value} if self.dimension else {}
+        result.update(self.measures())
+        if self.groups:
+            result['groups'] = [group.as_dict() for group in self.groups]
+        return result
+
+    def walk(self, path: Tuple = ()):
+        """Yield (path of values, group) for this group and every subtotal below it, depth first."""
+        yield path, self
+        for group in self.groups:
+            yield from group.walk(path + (group.value,))
+
+
+def _value_order(value: Any) -> Tuple:
+    """Sort groups by value with missing values last."""
+    return (value is None, '' if value is None else value)
+
+
+GROUP_ORDERS = {
+    'value': lambda group: _value_order(group.value),
+    'dashboard': lambda group: _value_order(group.first_project),
+}
+
+
+def _check_dimensions(dimensions: Sequence[str]):
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"unknown rollup dimensions: {', '.join(unknown)} (choose from {', '.join(DIMENSIONS)})")
+    if len(set(dimensions)) != len(dimensions):
+        raise ValueError("rollup dimensions must not repeat")
+
+
+def _from_clause(dimensions: Sequence[str]) -> str:
+    if 'state' in dimensions:
+        return "programs p LEFT JOIN program_dimensions d ON d.program_id = p.id"
+    return "programs p"
+
+
+def rollup_sql(dimensions: Sequence[str]) -> str:
+    """The grouped query at the finest level of dimensions."""
+    _check_dimensions(dimensions)
+    columns = [f"{DIMENSIONS[name]} AS {name}" for name in dimensions]
+    sql = f"""
+        SELECT {', '.join(columns + [''])}
+               COUNT(*) AS programs,
+               TOTAL(p.contract_value) AS contract_value,
+               TOTAL({_SAVINGS}) AS estimated_savings,
+               TOTAL(p.bid_deduct_pct) AS bid_deduct_total,
+               MIN(p.project_name) AS first_project
+        FROM {_from_clause(dimensions)}
+    """
+    if dimensions:
+        sql += f"GROUP BY {', '.join(str(i) for i in range(1, len(dimensions) + 1))}"
+    return sql
+
+
+def rollup(conn, dimensions: Sequence[str] = (), order: str = 'value') -> RollupGroup:
+    """Aggregate programs by dimensions, outermost first, with a subtotal at every level.
+
+    order is 'value' or 'dashboard' (see GROUP_ORDERS). A state rollup
+    reads the cached states, so call refresh_dimensions() first on a
+    writable database.
+    """
+    if order not in GROUP_ORDERS:
+        raise ValueError(f"unknown rollup order: {order} (choose from {', '.join(GROUP_ORDERS)})")
+    root = RollupGroup()
+    depth = len(dimensions)
+    groups: Dict[Tuple, RollupGroup] = {(): root}
+    for row in conn.execute(rollup_sql(dimensions)):
+        programs, contract_value, savings, bid_deduct, first_project = row[depth:]
+        if not programs:
+            continue
+        # Add the leaf row to its group and to the subtotal at every level above it
+        for level in range(depth + 1):
+            path = tuple(row[:level])
+            group = groups.get(path)
+            if group is None:
+                group = groups[path] = RollupGroup(dimensions[level - 1], path[-1])
+                groups[path[:-1]].groups.append(group)
+            group.programs += programs
+            group.contract_value += contract_value
+            group.estimated_savings += savings
+            group.bid_deduct_total += bid_deduct
+            if group.first_project is None or (first_project is not None and first_project < group.first_project):
+                group.first_project = first_project
+
+    for _, group in root.walk():
+        group.groups.sort(key=GROUP_ORDERS[order])
+    return root
+
+
+def rollup_rows(tree: Dict[str, Any], dimensions: Sequence[str], path: Tuple = ()) -> Iterator[Dict[str, Any]]:
+    """Flatten RollupGroup.as_dict() output to one row per subtotal, depth first.
+
+    level is 0 for the portfolio total; dimensions below a row's level are None.
+    """
+    row = {'level': len(path)}
+    row.update({name: path[i] if i < len(path) else None for i, name in enumerate(dimensions)})
+    row.update({name: tree[name] for name in ('count', 'contract_value', 'estimated_savings', 'avg_bid_deduct')})
+    yield row
+    for group in tree.get('groups', []):
+        yield from rollup_rows(group, dimensions, path + (group[dimensions[len(path)]],))
+
+
+def top_programs(conn, k: int = 5,
+                 dimension: Optional[str] = None) -> Union[List[str], Dict[Any, List[str]]]:
+    """Ids of the k programs with the largest estimated savings, overall or per dimension value.
+
+    Equal savings keep dashboard (project name) order, as
+    sorted(..., reverse=True)[:k] over that order would.
+    """
+    if k <= 0:
+        return {} if dimension else []
+    if dimension:
+        _check_dimensions([dimension])
+    group_column = DIMENSIONS[dimension] if dimension else "NULL"
+    rows = conn.execute(f"""
+        SELECT p.id, {_SAVINGS}, {group_column}
+        FROM {_from_clause([dimension] if dimension else [])}
+        ORDER BY p.project_name
+    """)
+
+    # Min-heaps of (savings, -position, id): the root is the entry to evict,
+    # and of two equal savings the later program is evicted first
+    heaps: Dict[Any, List[Tuple[float, int, str]]] = {}
+    for position, (program_id, savings, group) in enumerate(rows):
+        heap = heaps.get(group)
+        if heap is None:
+            heap = heaps[group] = []
+        entry = (savings, -position, program_id)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    ranked = {group: [program_id for _, _, program_id in sorted(heap, reverse=True)]
+              for group, heap in heaps.items()}
+    if dimension:
+        return {group: ranked[group] for group in sorted(ranked, key=_value_order)}
+    return ranked.get(None, [])
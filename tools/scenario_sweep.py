@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Scenario Sweep for Bid Deduct Sensitivity Analysis
+==================================================
+Prices every combination of a parameter grid with the bid deduct engine.
+
+Features:
+- Grids over states x class codes x labor scope x payroll x contract value x O&P
+- Grid split into index ranges and evaluated across a process pool
+- Vectorized chunk math with NumPy when installed, identical pure-Python fallback
+- Compact columnar output (dictionary-encoded, deflated binary columns in one zip)
+- Summary pivots: by state, state x payroll and state x contract value
+- Grid points per second reported for every run
+
+Usage:
+    python3 scenario_sweep.py --payroll 100000:2000000:100000 --contract 1000000:10000000:500000 --op both
+    python3 scenario_sweep.py --states CT,MA,NY --class-codes all --labor-scope self,none --workers 4
+"""
+
+import argparse
+import array
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from bid_deduct import LABOR_SCOPES, calculate, js_round, js_round_array, np, resolve_rate
+from rate_tables import load_rate_table
+
+SWEEP_FORMAT = 1
+DEFAULT_CHUNK_SIZE = 250000
+
+# (name, array typecode, numpy dtype) of every output column, in file order
+COLUMNS = [
+    ('state', 'B', 'u1'),
+    ('class_code', 'B', 'u1'),
+    ('labor_scope', 'B', 'u1'),
+    ('payroll', 'd', 'f8'),
+    ('contract_value', 'd', 'f8'),
+    ('include_op', 'B', 'u1'),
+    ('wc', 'q', 'i8'),
+    ('gl', 'q', 'i8'),
+    ('umbrella', 'q', 'i8'),
+    ('op', 'q', 'i8'),
+    ('total', 'q', 'i8'),
+]
+DICTIONARY_COLUMNS = ('state', 'class_code', 'labor_scope')
+
+
+def parse_values(spec: str) -> List[float]:
+    """Parse 'start:stop:step' (stop included) or a comma-separated list of amounts."""
+    if ':' in spec:
+        try:
+            start, stop, step = (float(part.replace(',', '')) for part in spec.split(':'))
+        except ValueError:
+            raise ValueError(f"range must be start:stop:step, got {spec!r}")
+        if step <= 0 or stop < start:
+            raise ValueError(f"range {spec!r} must have step > 0 and stop >= start")
+        count = int(round((stop - start) / step)) + 1
+        return [start + i * step for i in range(count)]
+    return [float(part) for part in spec.split(',') if part.strip()]
+
+
+class SweepGrid:
+    """A parameter grid flattened to point indexes 0..size-1.
+
+    Points are ordered scenario-major: each (state, class code, labor
+    scope) scenario, then payroll, contract value and O&P flag.
+    """
+
+    def __init__(self, states: Sequence[str], class_codes: str, labor_scopes: Sequence[str],
+                 payrolls: Sequence[float], contract_values: Sequence[float], op_flags: Sequence[bool],
+                 rates_path: Optional[str] = None):
+        rates = load_rate_table(rates_path)
+        unknown = [state for state in states if state not in rates.states]
+        if unknown:
+            raise ValueError(f"unknown state: {', '.join(unknown)} (not in rate table {rates.version})")
+        self.rates_path = rates_path
+        self.rates_version = rates.version
+        self.payrolls = list(payrolls)
+        self.contract_values = list(contract_values)
+        self.op_flags = list(op_flags)
+
+        requested = None
+        if class_codes not in ('default', 'all'):
+            requested = [code.strip() for code in class_codes.split(',') if code.strip()]
+            offered = {code for state in states for code in rates.class_code_options(state)}
+            unknown = [code for code in requested if code not in offered]
+            if unknown:
+                raise ValueError(f"unknown class code: {', '.join(unknown)} (not offered in {', '.join(states)})")
+
+        # Scenarios: one per class code for self-performed labor, one per state otherwise.
+        # A state without WC rates keeps one '' scenario, priced as no_rates; a state
+        # that offers none of the requested class codes has no self-performed scenario.
+        self.scenarios: List[Tuple[str, str, str]] = []
+        for state, labor_scope in product(states, labor_scopes):
+            if labor_scope != 'self':
+                self.scenarios.append((state, '', labor_scope))
+                continue
+            options = rates.class_code_options(state)
+            if not options:
+                codes = ['']
+            elif requested is not None:
+                codes = [code for code in requested if code in options]
+            else:
+                codes = options[:1] if class_codes == 'default' else options
+            for code in codes:
+                self.scenarios.append((state, code, labor_scope))
+
+        self.states = list(dict.fromkeys(state for state, _, _ in self.scenarios))
+        self.class_codes = list(dict.fromkeys(code for _, code, _ in self.scenarios))
+        self.labor_scopes = list(dict.fromkeys(scope for _, _, scope in self.scenarios))
+        self.shape = (len(self.scenarios), len(self.payrolls), len(self.contract_values), len(self.op_flags))
+        self.size = self.shape[0] * self.shape[1] * self.shape[2] * self.shape[3]
+
+    def describe(self) -> Dict:
+        return {
+            "rates_version": self.rates_version,
+            "scenarios": len(self.scenarios),
+            "states": self.states,
+            "class_codes": self.class_codes,
+            "labor_scopes": self.labor_scopes,
+            "payrolls": self.payrolls,
+            "contract_values": self.contract_values,
+            "op_flags": self.op_flags,
+            "points": self.size,
+        }
+
+
+class _ChunkEvaluator:
+    """Per-process lookup tables; each chunk is a slice of the flattened grid.
+
+    WC depends only on (scenario, payroll) and GL/umbrella only on the
+    contract value, so those lines are priced once per grid value and then
+    gathered for every point.
+    """
+
+    def __init__(self, grid: SweepGrid):
+        self.grid = grid
+        rates = load_rate_table(grid.rates_path)
+        self.op_rate = rates.op_rate
+
+        # wc[scenario][payroll], with the same float operations as calculate()
+        self.wc = []
+        for state, code, labor_scope in grid.scenarios:
+            _, rate = resolve_rate(state, labor_scope, code, rates)
+            self.wc.append([js_round((payroll / 100) * rate.effective_rate) if rate else 0
+                            for payroll in grid.payrolls])
+        self.gl = [js_round((value / 1000) * rates.gl_rate) for value in grid.contract_values]
+        self.umbrella = [js_round((value / 1000) * rates.umbrella_rate) for value in grid.contract_values]
+
+        self.state_of = [grid.states.index(state) for state, _, _ in grid.scenarios]
+        self.code_of = [grid.class_codes.index(code) for _, code, _ in grid.scenarios]
+        self.scope_of = [grid.labor_scopes.index(scope) for _, _, scope in grid.scenarios]
+
+    def evaluate(self, start: int, stop: int) -> Tuple[Dict[str, bytes], Dict]:
+        """Price points [start, stop); return column bytes and partial pivots."""
+        if np is not None:
+            return self._evaluate_numpy(start, stop)
+        return self._evaluate_python(start, stop)
+
+    def _evaluate_numpy(self, start, stop):
+        grid = self.grid
+        scenario, payroll, contract, op_flag = np.unravel_index(np.arange(start, stop), grid.shape)
+
+        wc = np.asarray(self.wc, dtype=np.int64).reshape(grid.shape[0], grid.shape[1])[scenario, payroll]
+        gl = np.asarray(self.gl, dtype=np.int64)[contract]
+        umbrella = np.asarray(self.umbrella, dtype=np.int64)[contract]
+        subtotal = wc + gl + umbrella
+        include_op = np.asarray(grid.op_flags, dtype=bool)[op_flag]
+        op = np.where(include_op, js_round_array(subtotal * self.op_rate), 0)
+        total = subtotal + op
+
+        state = np.asarray(self.state_of, dtype=np.int64)[scenario]
+        columns = {
+            'state': state,
+            'class_code': np.asarray(self.code_of, dtype=np.uint8)[scenario],
+            'labor_scope': np.asarray(self.scope_of, dtype=np.uint8)[scenario],
+            'payroll': np.asarray(grid.payrolls, dtype=np.float64)[payroll],
+            'contract_value': np.asarray(grid.contract_values, dtype=np.float64)[contract],
+            'include_op': include_op.astype(np.uint8),
+            'wc': wc, 'gl': gl, 'umbrella': umbrella, 'op': op, 'total': total,
+        }
+
+        states, payrolls, contracts = len(grid.states), grid.shape[1], grid.shape[2]
+        by_state_min = np.full(states, np.iinfo(np.int64).max, dtype=np.int64)
+        by_state_max = np.full(states, np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(by_state_min, state, total)
+        np.maximum.at(by_state_max, state, total)
+        pivots = {
+            'count': np.bincount(state, minlength=states).tolist(),
+            'sum': np.bincount(state, weights=total, minlength=states).tolist(),
+            'sum_wc': np.bincount(state, weights=wc, minlength=states).tolist(),
+            'min': by_state_min.tolist(),
+            'max': by_state_max.tolist(),
+            'payroll_sum': np.bincount(state * payrolls + payroll, weights=total,
+                                       minlength=states * payrolls).tolist(),
+            'payroll_count': np.bincount(state * payrolls + payroll, minlength=states * payrolls).tolist(),
+            'contract_sum': np.bincount(state * contracts + contract, weights=total,
+                                        minlength=states * contracts).tolist(),
+            'contract_count': np.bincount(state * contracts + contract, minlength=states * contracts).tolist(),
+        }
+        return {name: columns[name].astype(dtype, copy=False).tobytes() for name, _, dtype in COLUMNS}, pivots
+
+    def _evaluate_python(self, start, stop):
+        grid = self.grid
+        _, payrolls, contracts, ops = grid.shape
+        states = len(grid.states)
+        columns = {name: array.array(typecode) for name, typecode, _ in COLUMNS}
+        pivots = {
+            'count': [0] * states, 'sum': [0] * states, 'sum_wc': [0] * states,
+            'min': [sys.maxsize] * states, 'max': [-sys.maxsize] * states,
+            'payroll_sum': [0] * (states * payrolls), 'payroll_count': [0] * (states * payrolls),
+            'contract_sum': [0] * (states * contracts), 'contract_count': [0] * (states * contracts),
+        }
+
+        for index in range(start, stop):
+            rest, op_index = divmod(index, ops)
+            rest, contract = divmod(rest, contracts)
+            scenario, payroll = divmod(rest, payrolls)
+
+            wc = self.wc[scenario][payroll]
+            gl = self.gl[contract]
+            umbrella = self.umbrella[contract]
+            subtotal = wc + gl + umbrella
+            include_op = grid.op_flags[op_index]
+            op = js_round(subtotal * self.op_rate) if include_op else 0
+            total = subtotal + op
+            state = self.state_of[scenario]
+
+            for name, value in (('state', state), ('class_code', self.code_of[scenario]),
+                                ('labor_scope', self.scope_of[scenario]), ('payroll', grid.payrolls[payroll]),
+                                ('contract_value', grid.contract_values[contract]), ('include_op', int(include_op)),
+                                ('wc', wc), ('gl', gl), ('umbrella', umbrella), ('op', op), ('total', total)):
+                columns[name].append(value)
+
+            pivots['count'][state] += 1
+            pivots['sum'][state] += total
+            pivots['sum_wc'][state] += wc
+            pivots['min'][state] = min(pivots['min'][state], total)
+            pivots['max'][state] = max(pivots['max'][state], total)
+            pivots['payroll_sum'][state * payrolls + payroll] += total
+            pivots['payroll_count'][state * payrolls + payroll] += 1
+            pivots['contract_sum'][state * contracts + contract] += total
+            pivots['contract_count'][state * contracts + contract] += 1
+
+        if sys.byteorder != 'little':
+            for column in columns.values():
+                column.byteswap()
+        return {name: column.tobytes() for name, column in columns.items()}, pivots
+
+
+_evaluator: Optional[_ChunkEvaluator] = None
+
+
+def _init_worker(grid: SweepGrid):
+    global _evaluator
+    _evaluator = _ChunkEvaluator(grid)
+
+
+def _evaluate_chunk(bounds: Tuple[int, int]):
+    return _evaluator.evaluate(*bounds)
+
+
+def _merge_pivots(total: Optional[Dict], part: Dict) -> Dict:
+    if total is None:
+        return part
+    for name, values in part.items():
+        if name == 'min':
+            total[name] = [min(a, b) for a, b in zip(total[name], values)]
+        elif name == 'max':
+            total[name] = [max(a, b) for a, b in zip(total[name], values)]
+        else:
+            total[name] = [a + b for a, b in zip(total[name], values)]
+    return total
+
+
+def _finish_pivots(grid: SweepGrid, raw: Dict) -> Dict:
+    """Turn merged sums and counts into the summary pivots stored with the sweep."""
+    payrolls, contracts = len(grid.payrolls), len(grid.contract_values)
+
+    def mean(total, count):
+        return round(total / count, 2) if count else None
+
+    by_state = {}
+    payroll_pivot = {}
+    contract_pivot = {}
+    for i, state in enumerate(grid.states):
+        count = raw['count'][i]
+        by_state[state] = {
+            "points": count,
+            "min_total": raw['min'][i] if count else None,
+            "mean_total": mean(raw['sum'][i], count),
+            "max_total": raw['max'][i] if count else None,
+            "wc_share": round(raw['sum_wc'][i] / raw['sum'][i], 4) if raw['sum'][i] else 0,
+        }
+        payroll_pivot[state] = [mean(raw['payroll_sum'][i * payrolls + j], raw['payroll_count'][i * payrolls + j])
+                                for j in range(payrolls)]
+        contract_pivot[state] = [mean(raw['contract_sum'][i * contracts + j], raw['contract_count'][i * contracts + j])
+                                 for j in range(contracts)]
+
+    return {
+        "by_state": by_state,
+        "mean_total_by_state_and_payroll": {"payrolls": grid.payrolls, "rows": payroll_pivot},
+        "mean_total_by_state_and_contract_value": {"contract_values": grid.contract_values, "rows": contract_pivot},
+    }
+
+
+def run_sweep(grid: SweepGrid, output: Path, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """Evaluate the grid across a process pool and write the columnar sweep file."""
+    chunks = [(start, min(start + chunk_size, grid.size)) for start in range(0, grid.size, chunk_size)]
+    raw_pivots = None
+    start_time = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        column_files = {name: open(Path(scratch) / f"{name}.bin", 'wb') for name, _, _ in COLUMNS}
+        try:
+            if workers > 1 and len(chunks) > 1:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(grid,)) as pool:
+                    results = pool.map(_evaluate_chunk, chunks)
+                    # Results arrive in chunk order, so the file is the same for any worker count
+                    for columns, pivots in results:
+                        for name, data in columns.items():
+                            column_files[name].write(data)
+                        raw_pivots = _merge_pivots(raw_pivots, pivots)
+            else:
+                evaluator = _ChunkEvaluator(grid)
+                for bounds in chunks:
+                    columns, pivots = evaluator.evaluate(*bounds)
+                    for name, data in columns.items():
+                        column_files[name].write(data)
+                    raw_pivots = _merge_pivots(raw_pivots, pivots)
+        finally:
+            for f in column_files.values():
+                f.close()
+        compute_seconds = time.perf_counter() - start_time
+
+        pivots = _finish_pivots(grid, raw_pivots)
+        schema = {
+            "format": SWEEP_FORMAT,
+            "byte_order": "little",
+            "rows": grid.size,
+            "grid": grid.describe(),
+            "columns": [{"name": name, "dtype": dtype} for name, _, dtype in COLUMNS],
+            "dictionaries": {
+                "state": grid.states,
+                "class_code": grid.class_codes,
+                "labor_scope": grid.labor_scopes,
+            },
+        }
+
+        tmp_output = output.with_name(output.name + ".tmp")
+        with zipfile.ZipFile(tmp_output, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+            archive.writestr("schema.json", json.dumps(schema, indent=2))
+            archive.writestr("pivots.json", json.dumps(pivots, indent=2))
+            for name, _, _ in COLUMNS:
+                archive.write(Path(scratch) / f"{name}.bin", f"columns/{name}.bin")
+        tmp_output.replace(output)
+
+    total_seconds = time.perf_counter() - start_time
+    return {
+        "points": grid.size,
+        "chunks": len(chunks),
+        "workers": workers,
+        "compute_seconds": compute_seconds,
+        "total_seconds": total_seconds,
+        "points_per_second": grid.size / compute_seconds if compute_seconds else 0,
+        "output_bytes": output.stat().st_size,
+        "pivots": pivots,
+    }
+
+
+def read_sweep(path: Path) -> Dict:
+    """Load a sweep file: schema, pivots and columns (NumPy arrays when available)."""
+    with zipfile.ZipFile(path) as archive:
+        schema = json.loads(archive.read("schema.json"))
+        if schema.get('format') != SWEEP_FORMAT:
+            raise ValueError(f"unsupported sweep format {schema.get('format')!r}")
+        pivots = json.loads(archive.read("pivots.json"))
+        typecodes = {name: typecode for name, typecode, _ in COLUMNS}
+        columns = {}
+        for column in schema['columns']:
+            data = archive.read(f"columns/{column['name']}.bin")
+            if np is not None:
+                columns[column['name']] = np.frombuffer(data, dtype='<' + column['dtype'])
+            else:
+                values = array.array(typecodes[column['name']])
+                values.frombytes(data)
+                if sys.byteorder != 'little':
+                    values.byteswap()
+                columns[column['name']] = values
+    return {"schema": schema, "pivots": pivots, "columns": columns}
+
+
+def verify_sweep(path: Path, samples: int = 1000, seed: int = 7, rates_path: Optional[str] = None) -> int:
+    """Re-price random points with calculate(); return how many disagree."""
+    sweep = read_sweep(path)
+    columns, dictionaries = sweep['columns'], sweep['schema']['dictionaries']
+    rows = sweep['schema']['rows']
+    rates = load_rate_table(rates_path)
+    rng = random.Random(seed)
+
+    mismatches = 0
+    for index in (rng.randrange(rows) for _ in range(min(samples, rows))):
+        quote = calculate(
+            dictionaries['state'][int(columns['state'][index])],
+            float(columns['contract_value'][index]),
+            dictionaries['labor_scope'][int(columns['labor_scope'][index])],
+            float(columns['payroll'][index]),
+            dictionaries['class_code'][int(columns['class_code'][index])],
+            bool(columns['include_op'][index]),
+            rates,
+        )
+        expected = (quote.wc, quote.gl, quote.umbrella, quote.op, quote.total)
+        actual = tuple(int(columns[name][index]) for name in ('wc', 'gl', 'umbrella', 'op', 'total'))
+        mismatches += expected != actual
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Bid Deduct Scenario Sweep')
+    parser.add_argument('--states', default='rated',
+                        help="Comma-separated states, 'rated' (states with WC rates) or 'all'")
+    parser.add_argument('--class-codes', default='default',
+                        help="'default' (calculator default per state), 'all' or a comma-separated list; "
+                             "states price only the listed codes they offer")
+    parser.add_argument('--labor-scope', default='self', help=f"Comma-separated scopes from {', '.join(LABOR_SCOPES)}")
+    parser.add_argument('--payroll', default='100000:2000000:100000', help='start:stop:step or a comma-separated list')
+    parser.add_argument('--contract', default='1000000:10000000:500000', help='start:stop:step or a comma-separated list')
+    parser.add_argument('--op', choices=['both', 'yes', 'no'], default='both', help='Price with and/or without O&P')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Grid points per task')
+    parser.add_argument('--rates', help='Compiled rate artifact (default: api/rates.json)')
+    parser.add_argument('--output', default='sweep.zip', help='Columnar sweep file to write')
+    parser.add_argument('--verify', type=int, default=0, metavar='N',
+                        help='Re-price N random points with calculate() and compare')
+
+    args = parser.parse_args()
+
+    rates = load_rate_table(args.rates)
+    if args.states == 'rated':
+        states = [state for state in rates.states if rates.class_code_options(state)]
+    elif args.states == 'all':
+        states = list(rates.states)
+    else:
+        states = [state.strip().upper() for state in args.states.split(',') if state.strip()]
+        unknown = [state for state in states if state not in rates.states]
+        if unknown:
+            parser.error(f"unknown state: {', '.join(unknown)} (rate table {rates.version} has "
+                         f"{', '.join(rates.states)})")
+
+    labor_scopes = [scope.strip() for scope in args.labor_scope.split(',')]
+    unknown = [scope for scope in labor_scopes if scope not in LABOR_SCOPES]
+    if unknown:
+        parser.error(f"unknown labor scope: {', '.join(unknown)}")
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+
+    try:
+        payrolls = parse_values(args.payroll)
+        contract_values = parse_values(args.contract)
+    except ValueError as e:
+        parser.error(str(e))
+    op_flags = {'both': [False, True], 'yes': [True], 'no': [False]}[args.op]
+
+    try:
+        grid = SweepGrid(states, args.class_codes, labor_scopes, payrolls, contract_values, op_flags, args.rates)
+    except ValueError as e:
+        parser.error(str(e))
+    if not grid.size:
+        parser.error("the grid is empty - check --states, --class-codes, --payroll and --contract")
+    print(f"🧮 Sweeping {grid.size:,} grid points: {len(grid.scenarios)} scenarios x {len(payrolls)} payrolls "
+          f"x {len(contract_values)} contract values x {len(op_flags)} O&P "
+          f"({args.workers} workers, {'NumPy' if np is not None else 'pure Python'})")
+
+    output = Path(args.output)
+    result = run_sweep(grid, output, args.workers, args.chunk_size)
+
+    print(f"✅ Wrote {output} ({result['output_bytes']:,} bytes) in {result['total_seconds']:.2f} s")
+    print(f"   ⚡ {result['points_per_second']:,.0f} grid points/s over {result['chunks']} chunks")
+
+    print(f"\n📊 TOTAL DEDUCT BY STATE")
+    print(f"{'State':<6} {'Points':>10} {'Min':>10} {'Mean':>12} {'Max':>10} {'WC share':>9}")
+    for state, stats in result['pivots']['by_state'].items():
+        if not stats['points']:
+            continue
+        print(f"{state:<6} {stats['points']:>10,} {stats['min_total']:>10,} {stats['mean_total']:>12,.0f} "
+              f"{stats['max_total']:>10,} {stats['wc_share']:>8.1%}")
+
+    if args.verify:
+        mismatches = verify_sweep(output, args.verify, rates_path=args.rates)
+        if mismatches:
+            print(f"\n❌ {mismatches} of {args.verify} sampled points disagree with calculate()")
+            sys.exit(1)
+        print(f"\n✅ {args.verify} sampled points match calculate()")
+
+
+if __name__ == '__main__':
+    main()
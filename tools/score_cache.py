@@ -0,0 +1,101 @@
+"""
+Score Cache for Date-Dependent Compliance Scores
+================================================
+Keeps built program rows until the data or the calendar makes them stale.
+
+A compliance score counts pending reports whose due date has passed, so a
+program's score can change at midnight UTC with no row changing. Each
+cached row therefore carries the instant it stops being valid: midnight
+UTC on its stats' score_changes_on date (see portfolio_snapshot.py). A
+heap orders those instants, so expire() touches only the programs whose
+boundary has passed, and next_boundary() tells a scheduler exactly when
+to wake instead of polling the clock.
+"""
+
+import heapq
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+def score_boundary(score_changes_on: str) -> Optional[datetime]:
+    """Midnight UTC at the start of score_changes_on, or None when the score has no boundary."""
+    if not score_changes_on:
+        return None
+    return datetime.combine(date.fromisoformat(score_changes_on), time.min, tzinfo=timezone.utc)
+
+
+def next_local_midnight(now: Optional[datetime] = None) -> datetime:
+    """The next local midnight, when alert day counts roll over."""
+    now = (now or datetime.now(timezone.utc)).astimezone()
+    return datetime.combine(now.date() + timedelta(days=1), time.min).astimezone()
+
+
+class ScoreCache:
+    """Program rows keyed by id, each valid until its score boundary."""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Dict, Optional[datetime]]] = {}
+        self._boundaries: List[Tuple[datetime, str]] = []
+        self.loaded = False  # holds every program, not just the ones put since
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, rows: Iterable[Tuple[Dict, Optional[datetime]]]):
+        """Replace the cache with (row, valid_until) for every program."""
+        self._entries = {row['id']: (row, valid_until) for row, valid_until in rows}
+        self._boundaries = [(valid_until, program_id)
+                            for program_id, (_, valid_until) in self._entries.items() if valid_until]
+        heapq.heapify(self._boundaries)
+        self.loaded = True
+
+    def put(self, row: Dict, valid_until: Optional[datetime]):
+        """Cache one freshly built row."""
+        self._entries[row['id']] = (row, valid_until)
+        if valid_until:
+            heapq.heappush(self._boundaries, (valid_until, row['id']))
+        if len(self._boundaries) > 2 * len(self._entries) + 64:
+            # Mostly superseded entries; rebuild from the live rows
+            self._boundaries = [(until, program_id) for program_id, (_, until) in self._entries.items() if until]
+            heapq.heapify(self._boundaries)
+
+    def get(self, program_id: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        """The cached row, or None if it is missing or past its boundary."""
+        entry = self._entries.get(program_id)
+        if entry is None or (entry[1] and entry[1] <= (now or datetime.now(timezone.utc))):
+            return None
+        return entry[0]
+
+    def invalidate(self, program_ids: Iterable[str]):
+        for program_id in program_ids:
+            self._entries.pop(program_id, None)
+
+    def clear(self):
+        self._entries = {}
+        self._boundaries = []
+        self.loaded = False
+
+    def rows(self) -> List[Dict]:
+        return [row for row, _ in self._entries.values()]
+
+    def _is_current(self, valid_until: datetime, program_id: str) -> bool:
+        """Heap entries left behind by put() or invalidate() are skipped lazily."""
+        entry = self._entries.get(program_id)
+        return entry is not None and entry[1] == valid_until
+
+    def expire(self, now: Optional[datetime] = None) -> Set[str]:
+        """Drop and return the programs whose boundary has passed."""
+        now = now or datetime.now(timezone.utc)
+        expired = set()
+        while self._boundaries and self._boundaries[0][0] <= now:
+            valid_until, program_id = heapq.heappop(self._boundaries)
+            if self._is_current(valid_until, program_id):
+                del self._entries[program_id]
+                expired.add(program_id)
+        return expired
+
+    def next_boundary(self) -> Optional[datetime]:
+        """The earliest instant a cached score goes stale."""
+        while self._boundaries and not self._is_current(*self._boundaries[0]):
+            heapq.heappop(self._boundaries)
+        return self._boundaries[0][0] if self._boundaries else None
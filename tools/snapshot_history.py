@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Compliance Snapshot History
+===========================
+Keeps per-program compliance score, savings and overdue counts over time.
+
+Features:
+- One frame per day: every data-sync run replaces the current day's frame
+- Column arrays (score, savings, overdue count per program), zlib-packed
+- Frames partitioned by month; each stored as a delta from its partition's key frame
+- Portfolio aggregates stored beside the arrays, so portfolio trends never decode them
+- Downsampling by whole months: daily -> weekly -> monthly, then retention
+- Range queries for the portfolio or a single program, and a precomputed api/trends.json
+
+Usage:
+    python3 snapshot_history.py --db-path /tmp/wrapup_demo.db --series
+    python3 snapshot_history.py --db-path /tmp/wrapup_demo.db --series --since 2026-01-01 --resolution weekly
+    python3 snapshot_history.py --db-path /tmp/wrapup_demo.db --program WU-2026-001
+    python3 snapshot_history.py --db-path /tmp/wrapup_demo.db --compact
+"""
+
+import argparse
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent))
+
+from wrapup_db import WrapupDatabase, get_database
+
+RESOLUTIONS = ['daily', 'weekly', 'monthly']
+COARSER = {'daily': 'weekly', 'weekly': 'monthly'}
+
+
+@dataclass(frozen=True)
+class Retention:
+    """How long frames stay at each resolution before being folded or dropped.
+
+    A month is folded (or dropped) only once all of it is older than the limit.
+    """
+    daily_days: int = 92
+    weekly_days: int = 730
+    monthly_months: Optional[int] = None  # None keeps monthly frames forever
+
+
+DEFAULT_RETENTION = Retention()
+
+# Array columns: name -> typecode for raw values and key frame deltas
+COLUMNS = {'scores': 'h', 'savings': 'q', 'overdue': 'i'}
+
+# Reports counted as overdue per program, as in the data-sync compliance
+# score: marked overdue, plus pending reports already past due
+OVERDUE_SQL = """
+    SELECT program_id, SUM(reports) FROM (
+        SELECT program_id, overdue_reports AS reports FROM program_stats WHERE overdue_reports > 0
+        UNION ALL
+        SELECT program_id, COUNT(*) FROM payroll_reports
+        WHERE status = 'pending' AND due_date < date('now')
+        GROUP BY program_id
+    ) GROUP BY program_id
+"""
+
+# Program values per column, as returned by range queries
+VALUE_FIELDS = ['compliance_score', 'estimated_savings', 'overdue_reports']
+
+AGGREGATE_COLUMNS = ['programs', 'avg_compliance', 'total_savings', 'total_overdue', 'programs_overdue',
+                     'low_compliance']
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return zlib.compress(values.tobytes(), 6)
+
+
+def _unpack(typecode: str, blob: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(zlib.decompress(blob))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _pack_ids(program_ids: List[str]) -> bytes:
+    return zlib.compress("\n".join(program_ids).encode('utf-8'), 6)
+
+
+def _unpack_ids(blob: bytes) -> List[str]:
+    text = zlib.decompress(blob).decode('utf-8')
+    return text.split("\n") if text else []
+
+
+def _position(program_ids: List[str], program_id: str) -> Optional[int]:
+    """Index of program_id in a frame's sorted id list, or None."""
+    index = bisect_left(program_ids, program_id)
+    return index if index < len(program_ids) and program_ids[index] == program_id else None
+
+
+def period_start(day: date, resolution: str) -> date:
+    """First day of the daily, weekly (Monday) or monthly period holding day."""
+    if resolution == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'monthly':
+        return day.replace(day=1)
+    return day
+
+
+def _month_start(month: str) -> date:
+    return date.fromisoformat(month + "-01")
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+@dataclass
+class Frame:
+    """Every program's score, savings and overdue count at one point in time."""
+    resolution: str
+    period: str
+    taken_at: str
+    samples: int = 1
+    program_ids: List[str] = field(default_factory=list)
+    scores: array = field(default_factory=lambda: array('h'))
+    savings: array = field(default_factory=lambda: array('q'))
+    overdue: array = field(default_factory=lambda: array('i'))
+
+    @property
+    def month(self) -> str:
+        return self.period[:7]
+
+    def aggregates(self) -> Dict[str, Any]:
+        """Portfolio totals, averaging compliance over scored programs as the dashboard summary does."""
+        scored = [score for score in self.scores if score > 0]
+        return {
+            'programs': len(self.program_ids),
+            'avg_compliance': round(sum(scored) / len(scored), 1) if scored else 0,
+            'total_savings': sum(self.savings),
+            'total_overdue': sum(self.overdue),
+            'programs_overdue': sum(1 for count in self.overdue if count),
+            'low_compliance': sum(1 for score in self.scores if score < 60),
+        }
+
+    def values(self, program_id: str) -> Optional[Dict[str, int]]:
+        """One program's values in this frame, or None if it was not in the portfolio."""
+        index = _position(self.program_ids, program_id)
+        if index is None:
+            return None
+        return dict(zip(VALUE_FIELDS, (getattr(self, name)[index] for name in COLUMNS)))
+
+
+def history_row(program: Dict) -> Tuple[str, int, int]:
+    """The (id, compliance score, estimated savings) a frame keeps from a dashboard program row."""
+    return program['id'], program['compliance_score'], int(program['estimated_savings'] or 0)
+
+
+def build_frame(rows: Iterable[Tuple[str, int, int]], overdue: Dict[str, int], taken_at: datetime) -> Frame:
+    """A daily frame from history_row() tuples, ordered by program id."""
+    rows = sorted(rows)
+    return Frame(
+        resolution='daily',
+        period=taken_at.date().isoformat(),
+        taken_at=taken_at.isoformat() + 'Z',
+        program_ids=[row[0] for row in rows],
+        scores=array('h', [row[1] for row in rows]),
+        savings=array('q', [row[2] for row in rows]),
+        overdue=array('i', [overdue.get(row[0], 0) for row in rows]),
+    )
+
+
+class HistoryStore:
+    """Snapshot history kept in the wrap-up database (history_frames, migrations.py version 9)."""
+
+    def __init__(self, db: WrapupDatabase, retention: Retention = DEFAULT_RETENTION):
+        self.db = db
+        self.retention = retention
+        self._key_frames: Dict[Tuple[str, str], Frame] = {}  # Decoded key frame per (month, resolution)
+
+    # Writing
+
+    def record(self, rows: Iterable[Tuple[str, int, int]], taken_at: Optional[datetime] = None) -> Frame:
+        """Store the current day's frame from history_row() tuples, then fold any month past retention.
+
+        Call it outside a read snapshot: it writes, and a snapshot that
+        another connection has written past cannot be upgraded to a write.
+        """
+        taken_at = taken_at or datetime.utcnow()
+        with self.db.transaction() as conn:
+            overdue = dict(conn.execute(OVERDUE_SQL).fetchall())
+            frame = build_frame(rows, overdue, taken_at)
+            previous = conn.execute("""
+                SELECT samples FROM history_frames WHERE month = ? AND resolution = 'daily' AND period = ?
+            """, (frame.month, frame.period)).fetchone()
+            if previous:
+                frame.samples += previous[0]
+            self._put(conn, frame)
+            self.compact(taken_at.date())
+        return frame
+
+    def _put(self, conn, frame: Frame):
+        """Insert or replace a frame, re-encoding its partition when the key frame changes."""
+        key = self._key_frame(conn, frame.month, frame.resolution)
+        if key is not None and key.period < frame.period:
+            self._write(conn, frame, key)
+            return
+
+        # The new frame becomes the partition's key frame
+        frames = [old for old in self._partition(conn, frame.month, frame.resolution) if old.period != frame.period]
+        self._write(conn, frame, None)
+        for later in frames:
+            self._write(conn, later, frame)
+        self._key_frames[(frame.month, frame.resolution)] = frame
+
+    def _write(self, conn, frame: Frame, key: Optional[Frame]):
+        """Store frame whole, or as deltas from key when both cover the same programs."""
+        if key is not None and key.program_ids == frame.program_ids:
+            program_ids = None
+            columns = [array(typecode, [value - base for value, base in zip(getattr(frame, name), getattr(key, name))])
+                       for name, typecode in COLUMNS.items()]
+        else:
+            program_ids = _pack_ids(frame.program_ids)
+            columns = [getattr(frame, name) for name in COLUMNS]
+        aggregates = frame.aggregates()
+        conn.execute(f"""
+            INSERT OR REPLACE INTO history_frames
+            (month, resolution, period, taken_at, samples, {', '.join(AGGREGATE_COLUMNS)},
+             program_ids, {', '.join(COLUMNS)})
+            VALUES ({', '.join('?' * (5 + len(AGGREGATE_COLUMNS) + 1 + len(COLUMNS)))})
+        """, (frame.month, frame.resolution, frame.period, frame.taken_at, frame.samples,
+              *[aggregates[name] for name in AGGREGATE_COLUMNS],
+              program_ids, *[_pack(values) for values in columns]))
+
+    def compact(self, today: Optional[date] = None) -> Dict[str, int]:
+        """Fold months past retention into the next resolution and drop expired monthly frames.
+
+        Returns the number of frames folded from each resolution (and 'dropped').
+        """
+        today = today or datetime.utcnow().date()
+        limits = {'daily': today - timedelta(days=self.retention.daily_days),
+                  'weekly': today - timedelta(days=self.retention.weekly_days)}
+        counts = {}
+        with self.db.transaction() as conn:
+            for resolution, coarser in COARSER.items():
+                cutoff = limits[resolution]
+                # Months that ended before the cutoff
+                months = [row[0] for row in conn.execute("""
+                    SELECT DISTINCT month FROM history_frames WHERE resolution = ? AND month < ?
+                """, (resolution, cutoff.strftime('%Y-%m')))
+                          if _next_month(_month_start(row[0])) <= cutoff]
+                for month in months:
+                    counts[resolution] = counts.get(resolution, 0) + self._fold(conn, month, resolution, coarser)
+
+            if self.retention.monthly_months is not None:
+                oldest = today.replace(day=1)
+                for _ in range(self.retention.monthly_months):
+                    oldest = (oldest - timedelta(days=1)).replace(day=1)
+                dropped = conn.execute("""
+                    DELETE FROM history_frames WHERE resolution = 'monthly' AND month < ?
+                """, (oldest.strftime('%Y-%m'),)).rowcount
+                if dropped:
+                    counts['dropped'] = dropped
+                    self._key_frames.clear()
+        return counts
+
+    def _fold(self, conn, month: str, resolution: str, coarser: str) -> int:
+        """Replace one month of frames with the last frame of each coarser period."""
+        frames = self._partition(conn, month, resolution)
+        latest: Dict[str, Frame] = {}
+        for frame in frames:
+            # By when the frame was taken: a week starting in one month may end in the next
+            start = period_start(date.fromisoformat(frame.taken_at[:10]), coarser).isoformat()
+            current = latest.get(start)
+            samples = frame.samples + (current.samples if current else 0)
+            if current is None or frame.taken_at >= current.taken_at:
+                latest[start] = frame
+            latest[start].samples = samples
+
+        for start, frame in latest.items():
+            existing = self._get(conn, start[:7], coarser, start)
+            if existing and existing.taken_at > frame.taken_at:
+                existing.samples += frame.samples
+                folded = existing
+            else:
+                folded = Frame(coarser, start, frame.taken_at, frame.samples + (existing.samples if existing else 0),
+                               frame.program_ids, frame.scores, frame.savings, frame.overdue)
+            self._put(conn, folded)
+
+        conn.execute("DELETE FROM history_frames WHERE month = ? AND resolution = ?", (month, resolution))
+        self._key_frames.pop((month, resolution), None)
+        return len(frames)
+
+    # Reading
+
+    def _decode(self, row, key: Optional[Frame]) -> Frame:
+        resolution, period, taken_at, samples, program_ids = row[:5]
+        blobs = row[5:]
+        frame = Frame(resolution, period, taken_at, samples)
+        if program_ids is not None:
+            frame.program_ids = _unpack_ids(program_ids)
+            for (name, typecode), blob in zip(COLUMNS.items(), blobs):
+                setattr(frame, name, _unpack(typecode, blob))
+        else:
+            frame.program_ids = key.program_ids
+            for (name, typecode), blob in zip(COLUMNS.items(), blobs):
+                deltas = _unpack(typecode, blob)
+                setattr(frame, name, array(typecode, [base + delta for base, delta in zip(getattr(key, name), deltas)]))
+        return frame
+
+    _FRAME_COLUMNS = f"resolution, period, taken_at, samples, program_ids, {', '.join(COLUMNS)}"
+
+    def _partition(self, conn, month: str, resolution: str) -> List[Frame]:
+        """Every frame of one partition, decoded, in period order."""
+        frames = []
+        for row in conn.execute(f"""
+            SELECT {self._FRAME_COLUMNS} FROM history_frames
+            WHERE month = ? AND resolution = ? ORDER BY period
+        """, (month, resolution)):
+            frames.append(self._decode(row, frames[0] if frames else None))
+        return frames
+
+    def _key_frame(self, conn, month: str, resolution: str) -> Optional[Frame]:
+        """The partition's first frame, decoded once and reused while it is unchanged."""
+        partition = (month, resolution)
+        first = conn.execute("""
+            SELECT period, taken_at FROM history_frames
+            WHERE month = ? AND resolution = ? ORDER BY period LIMIT 1
+        """, partition).fetchone()
+        if first is None:
+            self._key_frames.pop(partition, None)
+            return None
+        key = self._key_frames.get(partition)
+        if key is None or (key.period, key.taken_at) != tuple(first):
+            row = conn.execute(f"""
+                SELECT {self._FRAME_COLUMNS} FROM history_frames
+                WHERE month = ? AND resolution = ? AND period = ?
+            """, (month, resolution, first[0])).fetchone()
+            key = self._key_frames[partition] = self._decode(row, None)
+        return key
+
+    def _get(self, conn, month: str, resolution: str, period: str) -> Optional[Frame]:
+        row = conn.execute(f"""
+            SELECT {self._FRAME_COLUMNS} FROM history_frames
+            WHERE month = ? AND resolution = ? AND period = ?
+        """, (month, resolution, period)).fetchone()
+        if row is None:
+            return None
+        return self._decode(row, None if row[4] is not None else self._key_frame(conn, month, resolution))
+
+    def portfolio_series(self, start: Optional[str] = None, end: Optional[str] = None,
+                         resolution: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Portfolio aggregates for every frame with start <= period <= end, oldest first.
+
+        Reads only the aggregate columns. Without a resolution, coarser
+        frames cover the older part of the range.
+        """
+        sql = f"""
+            SELECT period, resolution, taken_at, samples, {', '.join(AGGREGATE_COLUMNS)}
+            FROM history_frames WHERE month >= ? AND month <= ? AND period >= ? AND period <= ?
+        """
+        params = [(start or '0000')[:7], (end or '9999')[:7], start or '0000', end or '9999']
+        if resolution:
+            sql += " AND resolution = ?"
+            params.append(resolution)
+        sql += " ORDER BY period, resolution"
+        with self.db.snapshot() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+
+    def program_series(self, program_id: str, start: Optional[str] = None,
+                       end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One program's values in every frame with start <= period <= end that includes it, oldest first.
+
+        Delta frames are not rebuilt: the program's element is added to its key frame value.
+        """
+        points = []
+        with self.db.snapshot() as conn:
+            rows = conn.execute(f"""
+                SELECT month, {self._FRAME_COLUMNS} FROM history_frames
+                WHERE month >= ? AND month <= ? AND period >= ? AND period <= ?
+            """, ((start or '0000')[:7], (end or '9999')[:7], start or '0000', end or '9999')).fetchall()
+            positions: Dict[Tuple[str, str], Optional[int]] = {}
+            for month, resolution, period, taken_at, samples, program_ids, *blobs in rows:
+                if program_ids is not None:
+                    index = _position(_unpack_ids(program_ids), program_id)
+                    base = [0] * len(COLUMNS)
+                else:
+                    partition = (month, resolution)
+                    key = self._key_frame(conn, *partition)
+                    if partition not in positions:
+                        positions[partition] = _position(key.program_ids, program_id)
+                    index = positions[partition]
+                    if index is not None:
+                        base = [getattr(key, name)[index] for name in COLUMNS]
+                if index is None:
+                    continue
+                values = [value + _unpack(typecode, blob)[index]
+                          for value, typecode, blob in zip(base, COLUMNS.values(), blobs)]
+                points.append({'period': period, 'resolution': resolution, 'taken_at': taken_at,
+                               **dict(zip(VALUE_FIELDS, values))})
+        points.sort(key=lambda point: (point['period'], RESOLUTIONS.index(point['resolution'])))
+        return points
+
+    def trends(self) -> Dict[str, Any]:
+        """The api/trends.json document: portfolio series at every resolution plus the latest frame."""
+        series = self.portfolio_series()
+        by_resolution = {resolution: [] for resolution in RESOLUTIONS}
+        for point in series:
+            by_resolution[point['resolution']].append(
+                {name: point[name] for name in ['period', 'taken_at'] + AGGREGATE_COLUMNS})
+        daily = by_resolution['daily']
+        return {
+            'latest': daily[-1] if daily else None,
+            **by_resolution,
+            'generated_at': datetime.utcnow().isoformat() + 'Z',
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP Compliance Snapshot History')
+    parser.add_argument('--db-path', required=True, help='Path to wrap-up manager database')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending schema migrations instead of refusing an out-of-date database')
+    parser.add_argument('--series', action='store_true', help='Print the portfolio series')
+    parser.add_argument('--program', help='Print one program\'s series')
+    parser.add_argument('--since', help='First period to include (YYYY-MM-DD)')
+    parser.add_argument('--until', help='Last period to include (YYYY-MM-DD)')
+    parser.add_argument('--resolution', choices=RESOLUTIONS, help='With --series, one resolution only')
+    parser.add_argument('--compact', action='store_true', help='Fold months past retention now')
+
+    args = parser.parse_args()
+
+    if not any([args.series, args.program, args.compact]):
+        parser.print_help()
+        return
+
+    if not Path(args.db_path).is_file():
+        parser.error(f"database not found: {args.db_path}")
+
+    from migrations import SchemaOutOfDate, require_schema
+    db = get_database(args.db_path)
+    try:
+        require_schema(db, apply=args.migrate)
+    except SchemaOutOfDate as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    store = HistoryStore(db)
+
+    if args.compact:
+        counts = store.compact()
+        print(f"✅ Compacted history: {counts or 'nothing to fold'}")
+
+    if args.series:
+        points = store.portfolio_series(args.since, args.until, args.resolution)
+        print(f"\n📈 PORTFOLIO HISTORY ({len(points)} frames)")
+        print("=" * 84)
+        print(f"{'Period':<12}{'Res':<9}{'Programs':>9}{'Avg':>7}{'Savings':>18}{'Overdue':>9}{'Prog. OD':>10}{'Low':>8}")
+        for point in points:
+            print(f"{point['period']:<12}{point['resolution']:<9}{point['programs']:>9,}{point['avg_compliance']:>7.1f}"
+                  f"{point['total_savings']:>18,}{point['total_overdue']:>9,}{point['programs_overdue']:>10,}"
+                  f"{point['low_compliance']:>8,}")
+
+    if args.program:
+        points = store.program_series(args.program, args.since, args.until)
+        print(f"\n📈 {args.program} ({len(points)} frames)")
+        print("=" * 60)
+        for point in points:
+            print(f"{point['period']:<12}{point['resolution']:<9}{point['compliance_score']:>5}%"
+                  f"{point['estimated_savings']:>16,}{point['overdue_reports']:>5} overdue")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Sync Pipeline Stages for data-sync.py
+=====================================
+Incremental building blocks shared by the batch and streaming syncs.
+
+Each stage consumes programs one at a time, so a sync can push the
+portfolio through scoring, alerts, summary and page emission in a single
+pass without holding every program in memory.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from publisher import JsonPublisher
+
+# Paged dashboard API (api/dashboard/)
+PAGE_SIZE = 100
+INDEX_ALERT_LIMIT = 50
+STATUS_ORDER = ['active', 'pending']
+BAND_ORDER = ['low', 'medium', 'high']
+PRIORITY_ORDER = {'high': 0, 'medium': 1, 'low': 2}
+
+
+def compliance_band(score: int) -> str:
+    """Bucket a compliance score the same way dashboard.html colors it."""
+    if score >= 80:
+        return 'high'
+    if score >= 60:
+        return 'medium'
+    return 'low'
+
+
+class SummaryAccumulator:
+    """Builds the dashboard summary metrics one program at a time."""
+
+    def __init__(self, today=None):
+        self.today = today or datetime.now().date()
+        self.total_programs = 0
+        self.active_programs = 0
+        self.pending_enrollment = 0
+        self.upcoming_deadlines = 0
+        self.total_contract_value = 0
+        self.estimated_total_savings = 0
+        self.compliance_total = 0
+        self.compliance_count = 0
+
+    def add(self, program: Dict):
+        self.total_programs += 1
+        if program['status'] == 'active':
+            self.active_programs += 1
+        if program['enrollment_status'] == 'pending':
+            self.pending_enrollment += 1
+
+        self.total_contract_value += program.get('contract_value', 0)
+        self.estimated_total_savings += program.get('estimated_savings', 0)
+
+        if program['compliance_score'] > 0:
+            self.compliance_total += program['compliance_score']
+            self.compliance_count += 1
+
+        # Count upcoming deadlines
+        if program.get('payroll_due'):
+            try:
+                due_date = datetime.strptime(program['payroll_due'], '%Y-%m-%d').date()
+                if (due_date - self.today).days <= 14:
+                    self.upcoming_deadlines += 1
+            except ValueError:
+                pass
+
+    def result(self) -> Dict:
+        avg_compliance_score = self.compliance_total / self.compliance_count if self.compliance_count else 0
+        return {
+            "total_programs": self.total_programs,
+            "active_programs": self.active_programs,
+            "pending_enrollment": self.pending_enrollment,
+            "upcoming_deadlines": self.upcoming_deadlines,
+            "total_contract_value": int(self.total_contract_value),
+            "estimated_total_savings": int(self.estimated_total_savings),
+            "avg_compliance_score": int(avg_compliance_score)
+        }
+
+
+class DashboardPager:
+    """Writes the paged dashboard API: a small index plus fixed-size program pages.
+
+    Programs are sharded by status and compliance band (attention-needing
+    bands first) and keep their arrival order inside each shard. Only one
+    partial page per shard and the top alerts are held in memory.
+    """
+
+    def __init__(self, publisher: JsonPublisher, api_dir: Path, prune: bool = True):
+        self.publisher = publisher
+        self.api_dir = Path(api_dir)
+        self.prune = prune  # Remove stale page files from api_dir on finish()
+        self.dashboard_dir = self.api_dir / "dashboard"
+        self.shards: Dict[tuple, Dict] = {}
+        self.published = set()
+        self.total_programs = 0
+        self.alert_count = 0
+        self.top_alerts: Dict[str, List[Dict]] = {}
+
+    def add(self, program: Dict):
+        self.total_programs += 1
+        key = (program['status'], compliance_band(program['compliance_score']))
+        shard = self.shards.setdefault(key, {'count': 0, 'pages': [], 'buffer': []})
+        shard['count'] += 1
+        shard['buffer'].append(program)
+        if len(shard['buffer']) == PAGE_SIZE:
+            self._flush(key, shard)
+
+    def add_alerts(self, alerts: List[Dict]):
+        """Keep the first INDEX_ALERT_LIMIT alerts of each priority."""
+        self.alert_count += len(alerts)
+        for alert in alerts:
+            kept = self.top_alerts.setdefault(alert['priority'], [])
+            if len(kept) < INDEX_ALERT_LIMIT:
+                kept.append(alert)
+
+    def _flush(self, key: tuple, shard: Dict):
+        status, band = key
+        shard_key = f"{status}-{band}"
+        page_number = len(shard['pages']) + 1
+        page_path = f"dashboard/{shard_key}/page-{page_number}.json"
+        self.publisher.publish(self.api_dir / page_path, {
+            "shard": shard_key,
+            "page": page_number,
+            "programs": shard['buffer']
+        })
+        self.published.add(page_path)
+        shard['pages'].append(page_path)
+        shard['buffer'] = []
+
+    def finish(self, summary: Dict, last_sync: str):
+        """Flush partial pages, write index.json and drop stale pages."""
+        def shard_order(key):
+            status, band = key
+            status_rank = STATUS_ORDER.index(status) if status in STATUS_ORDER else len(STATUS_ORDER)
+            return (status_rank, str(status), BAND_ORDER.index(band))
+
+        shard_index = []
+        for key in sorted(self.shards, key=shard_order):
+            shard = self.shards[key]
+            if shard['buffer']:
+                self._flush(key, shard)
+            status, band = key
+            shard_index.append({
+                "key": f"{status}-{band}",
+                "status": status,
+                "band": band,
+                "count": shard['count'],
+                "pages": shard['pages']
+            })
+
+        alerts = []
+        for priority in sorted(self.top_alerts, key=lambda p: PRIORITY_ORDER.get(p, len(PRIORITY_ORDER))):
+            alerts.extend(self.top_alerts[priority])
+
+        self.publisher.publish(self.dashboard_dir / "index.json", {
+            "summary": summary,
+            "alerts": alerts[:INDEX_ALERT_LIMIT],
+            "alert_count": self.alert_count,
+            "total_programs": self.total_programs,
+            "page_size": PAGE_SIZE,
+            "shards": shard_index,
+            "last_sync": last_sync
+        })
+
+        # Drop pages left over from shards that shrank or emptied
+        if self.prune and self.dashboard_dir.exists():
+            for page_file in self.dashboard_dir.glob("*/page-*.json"):
+                if page_file.relative_to(self.api_dir).as_posix() not in self.published:
+                    self.publisher.remove(page_file)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Wrap-up Job Runner
+==================
+Runs data-sync outputs and compliance reports in one process over one portfolio snapshot.
+
+Features:
+- One command for the sync and report jobs: dashboard, full-sync, incremental, weekly, deadlines, financial
+- nightly runs the full sync and every report
+- Programs, their compliance stats and upcoming deadlines are read once per invocation and shared by every job
+- Job modules are imported only when a job needs them, so --help and single jobs start fast
+- Console output as data-sync.py and compliance-reporter.py print it, or every report rendered to files (--output)
+- Per-job timings and counters, --profile and JSON/Prometheus run metrics
+
+Usage:
+    python3 wrapup.py nightly --db-path /workspace/output/wrapup.db
+    python3 wrapup.py full-sync weekly --db-path /workspace/output/wrapup.db --web-root /srv/portal
+    python3 wrapup.py weekly deadlines financial --db-path /workspace/output/wrapup.db --by program_type,state
+    python3 wrapup.py nightly --db-path /workspace/output/wrapup.db --output html --out-dir /srv/portal/reports
+"""
+
+import argparse
+import importlib.util
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from instrumentation import add_arguments as add_instrumentation_arguments, instrumented_run, metrics
+from report_renderer import FORMATS
+
+
+def load_script(filename: str):
+    """Import a hyphenated tool script (data-sync.py, compliance-reporter.py) once per process."""
+    name = filename[:-3].replace('-', '_')
+    module = sys.modules.get(name)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(name, Path(__file__).parent / filename)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+class JobRun:
+    """What the jobs of one invocation share, each part built when a job first needs it."""
+
+    def __init__(self, args):
+        self.args = args
+        self._portfolio = None
+        self._sync = None
+        self._reporter = None
+
+    @property
+    def portfolio(self):
+        """The invocation's PortfolioSnapshot; nothing is read until a job asks for programs."""
+        if self._portfolio is None:
+            from migrations import require_schema
+            from portfolio_snapshot import PortfolioSnapshot
+            from wrapup_db import get_database
+
+            db = get_database(self.args.db_path)
+            require_schema(db, apply=self.args.migrate)
+            self._portfolio = PortfolioSnapshot(db)
+        return self._portfolio
+
+    @property
+    def sync(self):
+        if self._sync is None:
+            args = self.args
+            self._sync = load_script('data-sync.py').DataSync(
+                args.web_root, args.db_path, minify=args.minify, publish_stats=args.publish_stats,
+                workers=args.workers, history=not args.no_history, portfolio=self.portfolio,
+                apply_migrations=args.migrate)
+        return self._sync
+
+    @property
+    def reporter(self):
+        if self._reporter is None:
+            self._reporter = load_script('compliance-reporter.py').ComplianceReporter(
+                self.args.db_path, portfolio=self.portfolio, apply_migrations=self.args.migrate)
+        return self._reporter
+
+    @property
+    def console(self) -> bool:
+        return self.args.output == 'console'
+
+    def write_report(self, report):
+        """Render a report_renderer Report to <out-dir>/<report name>.<format>."""
+        from report_renderer import render
+
+        path = Path(self.args.out_dir) / f"{report.name}.{self.args.output}"
+        with metrics.span("report.render"), open(path, 'w', encoding='utf-8', newline='') as out:
+            render(report, self.args.output, out)
+        print(f"✅ {report.title} written to {path}")
+
+    @property
+    def detail_errors(self):
+        return self._sync.detail_errors if self._sync is not None else {}
+
+    @property
+    def shared_programs(self):
+        """Programs in the shared snapshot, or None if no job read it."""
+        if self._portfolio is None or not self._portfolio.loaded:
+            return None
+        return len(self._portfolio.rows())
+
+
+def run_dashboard(run: JobRun):
+    run.sync.sync_dashboard_data()
+
+
+def run_full_sync(run: JobRun):
+    run.sync.full_sync()
+
+
+def run_incremental(run: JobRun):
+    run.sync.incremental_sync()
+
+
+def run_weekly(run: JobRun):
+    if run.console:
+        load_script('compliance-reporter.py').print_weekly_report(run.reporter.generate_weekly_report())
+    else:
+        run.write_report(run.reporter.weekly_report())
+
+
+def run_deadlines(run: JobRun):
+    if run.console:
+        load_script('compliance-reporter.py').print_deadline_check(run.reporter, run.args.all_alerts)
+    else:
+        run.write_report(run.reporter.deadline_report())
+
+
+def run_financial(run: JobRun):
+    reporter_module = load_script('compliance-reporter.py')
+    dimensions, top = run.args.dimensions, run.args.top
+    if run.console:
+        reporter_module.print_financial_summary(run.reporter.financial_summary(dimensions, top), dimensions, top)
+    else:
+        run.write_report(reporter_module.financial_report(run.reporter, dimensions, top))
+
+
+# Job name -> (runner, help)
+JOBS = {
+    'dashboard': (run_dashboard, 'publish wrapup-status.json and the dashboard pages (data-sync.py --sync-dashboard)'),
+    'full-sync': (run_full_sync, 'dashboard plus every program detail file (data-sync.py --full-sync)'),
+    'incremental': (run_incremental, 'rebuild only changed programs (data-sync.py --incremental)'),
+    'weekly': (run_weekly, 'weekly compliance report (compliance-reporter.py --weekly-report)'),
+    'deadlines': (run_deadlines, 'deadline check and alerts (compliance-reporter.py --deadline-check)'),
+    'financial': (run_financial, 'financial summary (compliance-reporter.py --financial-summary)'),
+}
+NIGHTLY = ['full-sync', 'weekly', 'deadlines', 'financial']
+
+
+def main():
+    job_help = "\n".join(f"  {name:<12} {help_text}" for name, (_, help_text) in JOBS.items())
+    parser = argparse.ArgumentParser(
+        description='OCIP/CCIP Wrap-up Job Runner',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"jobs:\n{job_help}\n  {'nightly':<12} {' '.join(NIGHTLY)}")
+    parser.add_argument('jobs', nargs='+', metavar='JOB', choices=list(JOBS) + ['nightly'],
+                        help='Jobs to run, in order, over one portfolio snapshot')
+    parser.add_argument('--db-path', required=True, help='Path to wrap-up manager database')
+    parser.add_argument('--web-root', help='Web portal root directory')
+    parser.add_argument('--minify', action='store_true', help='Write minified JSON')
+    parser.add_argument('--publish-stats', action='store_true', help='Report bytes written and time for every published file')
+    parser.add_argument('--workers', type=int, default=1, help='Threads generating program detail files in full-sync')
+    parser.add_argument('--migrate', action='store_true', help='Apply pending schema migrations instead of refusing an out-of-date database')
+    parser.add_argument('--no-history', action='store_true', help='Do not record this run in the snapshot history')
+    parser.add_argument('--all-alerts', action='store_true', help='With deadlines, list every alert, not just new or changed ones')
+    parser.add_argument('--by', help='With financial, subtotal by these dimensions, outermost first (comma-separated)')
+    parser.add_argument('--top', type=int, default=5, help='With financial, how many top programs by savings to list')
+    parser.add_argument('--output', default='console', choices=['console'] + FORMATS,
+                        help='Report format; anything but console writes each report to --out-dir')
+    parser.add_argument('--out-dir', default='.', help='With --output, directory for the report files')
+    add_instrumentation_arguments(parser)
+
+    args = parser.parse_args()
+
+    if not Path(args.db_path).is_file():
+        parser.error(f"database not found: {args.db_path}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.output != 'console' and not Path(args.out_dir).is_dir():
+        parser.error(f"--out-dir {args.out_dir} is not a directory")
+
+    args.dimensions = [name.strip() for name in args.by.split(',') if name.strip()] if args.by else []
+    if args.dimensions:
+        from rollup import DIMENSIONS
+        unknown = [name for name in args.dimensions if name not in DIMENSIONS]
+        if unknown:
+            parser.error(f"unknown --by dimensions: {', '.join(unknown)} (choose from {', '.join(DIMENSIONS)})")
+
+    jobs = []
+    for name in args.jobs:
+        for job in NIGHTLY if name == 'nightly' else [name]:
+            if job not in jobs:
+                jobs.append(job)
+
+    from migrations import SchemaOutOfDate
+
+    with instrumented_run('wrapup', args):
+        run = JobRun(args)
+        try:
+            for name in jobs:
+                with metrics.span(f"job.{name.replace('-', '_')}"):
+                    JOBS[name][0](run)
+        except SchemaOutOfDate as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        if run.shared_programs is not None:
+            print(f"\n🗂️  {len(jobs)} jobs shared one snapshot of {run.shared_programs} programs")
+        if run.detail_errors:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+SQLite Connection Manager for OCIP/CCIP Tools
+=============================================
+Shared, long-lived connections to the wrap-up manager database.
+
+Features:
+- One connection per process (and per thread) for each database path
+- Read-only instances for worker threads that must never write
+- Tuned pragmas: WAL, busy timeout, mmap, page cache, in-memory temp store
+- Read snapshots so a whole sync or report sees one consistent state
+- Retry with exponential backoff when the database is busy
+
+Usage:
+    python3 wrapup_db.py --benchmark --db-path /tmp/wrapup_demo.db
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+PRAGMAS = {
+    "busy_timeout": 5000,          # milliseconds SQLite waits on a lock itself
+    "mmap_size": 268435456,        # 256 MB of memory-mapped I/O
+    "cache_size": -65536,          # 64 MB page cache (negative = KiB)
+    "temp_store": "MEMORY",
+    "synchronous": "NORMAL",       # safe with WAL, far fewer fsyncs
+}
+
+BUSY_RETRIES = 6
+FETCH_SIZE = 500  # rows per fetchmany() batch when streaming a large result
+BUSY_BASE_DELAY = 0.05  # seconds, doubled on every retry
+
+# Class of new connections; instrumentation.SqlProfile swaps in a timing subclass
+_connection_factory = sqlite3.Connection
+
+SQLITE_BUSY = getattr(sqlite3, "SQLITE_BUSY", 5)
+SQLITE_LOCKED = getattr(sqlite3, "SQLITE_LOCKED", 6)
+
+
+def is_busy_error(error: Exception) -> bool:
+    """Return True if the error means another connection holds the lock."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def retry_on_busy(func: Callable[[], Any], retries: int = BUSY_RETRIES,
+                  base_delay: float = BUSY_BASE_DELAY) -> Any:
+    """Call func(), retrying with jittered exponential backoff on SQLITE_BUSY."""
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy_error(e):
+                raise
+            delay = base_delay * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+
+
+def fetch_rows(cursor: sqlite3.Cursor, size: int = FETCH_SIZE) -> Iterator[Any]:
+    """Iterate over a cursor's rows one fetchmany() batch at a time."""
+    while True:
+        batch = cursor.fetchmany(size)
+        if not batch:
+            return
+        yield from batch
+
+
+def set_connection_factory(factory: type) -> type:
+    """Use factory (a sqlite3.Connection subclass) for connections opened from now on; return the previous one."""
+    global _connection_factory
+    previous, _connection_factory = _connection_factory, factory
+    return previous
+
+
+def open_connection(db_path: str, readonly: bool = False) -> sqlite3.Connection:
+    """Open a connection with the tuned pragmas applied."""
+    if readonly:
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, isolation_level=None, factory=_connection_factory)
+    else:
+        conn = sqlite3.connect(db_path, isolation_level=None, factory=_connection_factory)
+    conn.row_factory = sqlite3.Row
+
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+    if not readonly:
+        try:
+            retry_on_busy(lambda: conn.execute("PRAGMA journal_mode = WAL").fetchone())
+        except sqlite3.OperationalError:
+            pass  # Read-only file or filesystem without shared memory support
+
+    return conn
+
+
+class WrapupDatabase:
+    """Long-lived connection plus transaction helpers for one database file."""
+
+    def __init__(self, db_path: str, readonly: bool = False):
+        self.db_path = str(db_path)
+        self.readonly = readonly
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, reopened after a fork."""
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = open_connection(self.db_path, readonly=self.readonly)
+            local.pid = os.getpid()
+            local.depth = 0
+        return local.conn
+
+    def execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        """Execute a statement, retrying while the database is busy."""
+        conn = self.connection
+        return retry_on_busy(lambda: conn.execute(sql, params))
+
+    def executemany(self, sql: str, rows) -> sqlite3.Cursor:
+        """Execute a statement for every row, retrying while the database is busy."""
+        rows = list(rows)
+        conn = self.connection
+        return retry_on_busy(lambda: conn.executemany(sql, rows))
+
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """Hold one read transaction so every query sees the same database state.
+
+        Nested calls reuse the outer snapshot.
+        """
+        conn = self.connection
+        if self._local.depth or conn.in_transaction:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        retry_on_busy(lambda: conn.execute("BEGIN"))
+        self._local.depth = 1
+        try:
+            # WAL pins the snapshot at the first read, so take it now.
+            retry_on_busy(lambda: conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall())
+            yield conn
+        finally:
+            self._local.depth = 0
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of writes in one IMMEDIATE transaction."""
+        conn = self.connection
+        if conn.in_transaction:
+            yield conn
+            return
+
+        retry_on_busy(lambda: conn.execute("BEGIN IMMEDIATE"))
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            retry_on_busy(lambda: conn.execute("COMMIT"))
+
+    def close(self):
+        """Close the calling thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_databases: Dict[str, WrapupDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path: str) -> WrapupDatabase:
+    """Return the process-wide WrapupDatabase for a path."""
+    key = os.path.abspath(os.path.expanduser(str(db_path)))
+    with _databases_lock:
+        db = _databases.get(key)
+        if db is None:
+            db = _databases[key] = WrapupDatabase(key)
+        return db
+
+
+def benchmark(db_path: str, rounds: int = 5) -> Dict[str, float]:
+    """Compare connect-per-call lookups with a pooled snapshot connection."""
+    program_ids = [row[0] for row in sqlite3.connect(db_path).execute("SELECT id FROM programs")]
+    queries = [
+        "SELECT COUNT(*) FROM enrollment_docs WHERE program_id = ?",
+        "SELECT COUNT(*) FROM enrollment_docs WHERE program_id = ? AND status = 'completed'",
+        "SELECT COUNT(*) FROM payroll_reports WHERE program_id = ? AND status = 'overdue'",
+        "SELECT due_date FROM payroll_reports WHERE program_id = ? "
+        "AND status IN ('pending', 'overdue') ORDER BY due_date LIMIT 1",
+    ]
+
+    def connect_per_call():
+        for program_id in program_ids:
+            for sql in queries:
+                conn = sqlite3.connect(db_path)
+                conn.execute(sql, (program_id,)).fetchone()
+                conn.close()
+
+    db = get_database(db_path)
+
+    def pooled():
+        with db.snapshot() as conn:
+            for program_id in program_ids:
+                for sql in queries:
+                    conn.execute(sql, (program_id,)).fetchone()
+
+    results = {}
+    for name, func in (("connect_per_call", connect_per_call), ("pooled", pooled)):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        results[name] = min(timings)
+
+    results["programs"] = len(program_ids)
+    results["speedup"] = results["connect_per_call"] / results["pooled"] if results["pooled"] else 0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCIP/CCIP SQLite Connection Manager')
+    parser.add_argument('--benchmark', action='store_true', help='Compare connect-per-call with pooled connections')
+    parser.add_argument('--rounds', type=int, default=5, help='Benchmark rounds (best time is reported)')
+    parser.add_argument('--db-path', help='Path to wrap-up manager database')
+
+    args = parser.parse_args()
+
+    if not args.benchmark or not args.db_path:
+        parser.print_help()
+        return
+
+    results = benchmark(args.db_path, args.rounds)
+    print(f"\n⏱️  CONNECTION BENCHMARK - {results['programs']} programs, best of {args.rounds}")
+    print("=" * 50)
+    print(f"Connect per call: {results['connect_per_call'] * 1000:,.1f} ms")
+    print(f"Pooled snapshot:  {results['pooled'] * 1000:,.1f} ms")
+    print(f"Speedup:          {results['speedup']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()